@@ -4,6 +4,8 @@ import java.net.DatagramSocket;
 import java.net.DatagramPacket;
 import java.net.SocketException;
 import java.io.IOException;
+import java.nio.ByteBuffer;
+import java.nio.ByteOrder;
 
 //these are variables you should leave alone
 int index = 0; //starts at zero-ith trial
@@ -225,8 +227,12 @@ float inchToPix(float inch)
 
 // ----- UDP Receiver Thread -----
 // This thread listens on the specified UDP port for incoming command strings.
+// It also understands the binary events from decision.py (14 bytes, little-endian:
+// marker 0xC5, uint32 sequence number, float64 send time in seconds, key), which are used
+// to drop duplicates and print the end-to-end latency.
 class UDPReceiver extends Thread {
   DatagramSocket socket;
+  long lastSequence = -1;
   
   UDPReceiver(int port) {
     try {
@@ -243,8 +249,25 @@ class UDPReceiver extends Thread {
       DatagramPacket packet = new DatagramPacket(buffer, buffer.length);
       try {
         socket.receive(packet);
-        String command = new String(packet.getData(), 0, packet.getLength()).trim();
-        println("Received command: " + command);
+        String command;
+        if (packet.getLength() == 14 && (packet.getData()[0] & 0xFF) == 0xC5) {
+          ByteBuffer event = ByteBuffer.wrap(packet.getData(), 0, 14).order(ByteOrder.LITTLE_ENDIAN);
+          event.get(); // marker
+          long sequence = event.getInt() & 0xFFFFFFFFL;
+          double sentAt = event.getDouble();
+          command = String.valueOf((char) event.get());
+          // a much smaller number means the sender was restarted, so only drop recent repeats
+          if (sequence <= lastSequence && lastSequence - sequence < 1000) {
+            println("Dropped duplicate event #" + sequence);
+            continue;
+          }
+          lastSequence = sequence;
+          double latencyMs = System.currentTimeMillis() - sentAt * 1000.0;
+          println("Received command: " + command + " (event #" + sequence + ", " + nf((float) latencyMs, 0, 1) + " ms after sending)");
+        } else {
+          command = new String(packet.getData(), 0, packet.getLength()).trim();
+          println("Received command: " + command);
+        }
         // Update the sketch state based on the command received.
         processCommand(command);
       } catch (IOException e) {
@@ -0,0 +1,136 @@
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+from stream_utils import window_size, num_channels
+
+# Data augmentation for gesture windows.
+# Every function takes a batch of flattened windows (n, window_size * 6), like dataset.load_dataset
+# returns them, and transforms the whole batch at once:
+#
+#   time_warp           - plays every window back at a smoothly varying speed
+#   jitter              - adds gaussian noise relative to each channel's spread
+#   rotate              - rotates accelerometer and gyroscope by the same small random rotation,
+#                         as if the board were held at a slightly different angle
+#   scale_magnitude     - scales accelerometer and gyroscope by a random factor per window
+#
+# augment() makes several augmented copies of a dataset in batches on a pool of threads
+# (numpy releases the GIL for the heavy work).
+
+
+def _as_windows(X):
+    return np.asarray(X, dtype=np.float32).reshape(len(X), -1, num_channels)
+
+
+def time_warp(X, rng, strength=0.2, knots=4):
+    """Resample every window along a random monotonic time axis (speed varies by about +/- strength)."""
+    windows = _as_windows(X)
+    n, length, _ = windows.shape
+    # random speed at a few knots, interpolated to every sample and integrated into a time axis
+    speeds = np.clip(rng.normal(1.0, strength, size=(n, knots)), 0.1, None)
+    # the knot interval and linear weight of every sample are the same for all windows: one gather
+    knot_positions = np.linspace(0, length - 1, knots)
+    samples = np.arange(length)
+    left = (np.searchsorted(knot_positions, samples, side='right') - 1).clip(0, knots - 2)
+    weight = (samples - knot_positions[left]) / (knot_positions[left + 1] - knot_positions[left])
+    speed = speeds[:, left] * (1 - weight) + speeds[:, left + 1] * weight
+    warped = np.cumsum(speed, axis=1) - speed[:, :1]
+    warped *= (length - 1) / warped[:, -1:]  # start and end stay where they are
+
+    lower = np.floor(warped).astype(np.intp).clip(0, length - 2)
+    fraction = (warped - lower)[:, :, None].astype(np.float32)
+    rows = np.arange(n)[:, None]
+    out = windows[rows, lower] * (1 - fraction) + windows[rows, lower + 1] * fraction
+    return out.reshape(n, -1)
+
+
+def jitter(X, rng, sigma=0.05):
+    """Gaussian noise with a standard deviation of sigma times each channel's standard deviation."""
+    windows = _as_windows(X)
+    spread = windows.reshape(-1, num_channels).std(axis=0)
+    noise = rng.normal(0.0, 1.0, size=windows.shape).astype(np.float32) * (sigma * spread)
+    return (windows + noise).reshape(len(X), -1)
+
+
+def random_rotations(n, rng, max_angle=15):
+    """n rotation matrices about random axes by up to max_angle degrees (Rodrigues' formula)."""
+    axes = rng.normal(size=(n, 3))
+    axes /= np.linalg.norm(axes, axis=1, keepdims=True)
+    angles = np.radians(rng.uniform(-max_angle, max_angle, size=n))[:, None, None]
+    K = np.zeros((n, 3, 3))
+    K[:, 0, 1], K[:, 0, 2], K[:, 1, 2] = -axes[:, 2], axes[:, 1], -axes[:, 0]
+    K -= K.transpose(0, 2, 1)
+    return np.eye(3) + np.sin(angles) * K + (1 - np.cos(angles)) * K @ K
+
+
+def rotate(X, rng, max_angle=15):
+    """Rotate accelerometer and gyroscope of each window by the same random rotation."""
+    windows = _as_windows(X)
+    R = random_rotations(len(windows), rng, max_angle).astype(np.float32)
+    out = np.empty_like(windows)
+    out[:, :, :3] = windows[:, :, :3] @ R.transpose(0, 2, 1)
+    out[:, :, 3:] = windows[:, :, 3:] @ R.transpose(0, 2, 1)
+    return out.reshape(len(X), -1)
+
+
+def scale_magnitude(X, rng, sigma=0.1):
+    """Multiply accelerometer and gyroscope of each window by their own random factor around 1."""
+    windows = _as_windows(X)
+    factors = rng.normal(1.0, sigma, size=(len(windows), 1, 2)).astype(np.float32).repeat(3, axis=2)
+    return (windows * factors).reshape(len(X), -1)
+
+
+augmentations = {
+    "time_warp": time_warp,
+    "jitter": jitter,
+    "rotate": rotate,
+    "scale": scale_magnitude,
+}
+
+
+def augment_batch(X, rng, names=tuple(augmentations)):
+    """Apply the named augmentations one after another."""
+    for name in names:
+        X = augmentations[name](X, rng)
+    return X
+
+
+def augment(X, y, copies=1, names=tuple(augmentations), batch_size=4096, workers=8, seed=42):
+    """
+    The original windows followed by `copies` augmented copies of them.
+
+    Returns:
+        X: ((copies + 1) * n, window_size * 6) float32 windows
+        y: labels, repeated for every copy
+    """
+    X = np.asarray(X, dtype=np.float32)
+    batches = [(copy, start) for copy in range(copies) for start in range(0, len(X), batch_size)]
+    # one independent random stream per batch, so the result doesn't depend on the number of workers
+    seeds = np.random.SeedSequence(seed).spawn(len(batches))
+
+    def run(batch, seed):
+        _, start = batch
+        return augment_batch(X[start:start + batch_size], np.random.default_rng(seed), names)
+
+    with ThreadPoolExecutor(workers) as pool:
+        augmented = list(pool.map(run, batches, seeds))
+    return np.concatenate([X] + augmented), np.tile(y, copies + 1)
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+    from dataset import load_dataset
+
+    parser = argparse.ArgumentParser(description="Time the augmentations on a recorded run.")
+    parser.add_argument("data", nargs="*", default=["example_data/1738726494-66512"])
+    parser.add_argument("--copies", type=int, default=4)
+    args = parser.parse_args()
+
+    X, y, _ = load_dataset(args.data, window_size)
+    for name in augmentations:
+        start = time.perf_counter()
+        augment(X, y, args.copies, names=(name,))
+        print(f"{name:>10}: {1e6 * (time.perf_counter() - start) / (args.copies * len(X)):.2f} us/window")
+    start = time.perf_counter()
+    X_aug, _ = augment(X, y, args.copies)
+    print(f"       all: {len(X)} -> {len(X_aug)} windows in {time.perf_counter() - start:.2f}s")
@@ -0,0 +1,92 @@
+import argparse
+import time
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score
+from sklearn.model_selection import GroupShuffleSplit
+
+from dataset import load_dataset
+from features import window_features, StreamingFeatures
+from stream_utils import window_size
+
+# Compares a random forest trained on raw 300-value windows with one trained on the compact
+# feature vector: accuracy, forest size, and the per-window cost in the live loop.
+# Neighbouring windows share 49 of their 50 samples, so a random split would test on near-copies of
+# training windows. The test set is whole runs, or with a single run the end of every gesture file.
+#
+#   python benchmark_features.py --data example_data/1738726494-66512
+
+
+def time_per_call(function, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        function()
+    return (time.perf_counter() - start) / repeats * 1e6
+
+
+def blocked_split(y, groups, test_size=0.2, gap=window_size - 1):
+    """
+    Train and test indices without shared samples: whole runs are held out when there are several,
+    otherwise the last test_size of every gesture file, with the `gap` windows before it left out
+    (they overlap the first test window).
+    """
+    if len(np.unique(groups)) > 1:
+        return next(GroupShuffleSplit(n_splits=1, test_size=test_size, random_state=42).split(y, y, groups))
+    train, test = [], []
+    # one file per gesture, its windows are contiguous and in time order (see dataset.load_dataset)
+    for label in np.unique(y):
+        indices = np.flatnonzero(y == label)
+        n_test = int(round(len(indices) * test_size))
+        train.append(indices[:max(len(indices) - n_test - gap, 0)])
+        test.append(indices[len(indices) - n_test:])
+    return np.concatenate(train), np.concatenate(test)
+
+
+def forest_size(rf):
+    return (np.mean([tree.tree_.max_depth for tree in rf.estimators_]),
+            np.mean([tree.tree_.node_count for tree in rf.estimators_]))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data", default="example_data/1738726494-66512")
+    parser.add_argument("--repeats", type=int, default=200)
+    args = parser.parse_args()
+
+    X, y, groups = load_dataset([args.data], window_size)
+    train, test = blocked_split(y, groups)
+    X_train, X_test, y_train, y_test = X[train], X[test], y[train], y[test]
+    print(f"{len(X)} windows ({len(train)} train, {len(test)} test), classes {sorted(set(y.tolist()))}")
+
+    one_window = X_test[:1]
+    samples = X_test[0].reshape(window_size, -1)
+    extractor = StreamingFeatures(window_size)
+
+    results = {}
+    for name, transform in [("raw", lambda X: X), ("features", window_features)]:
+        rf = RandomForestClassifier(n_estimators=100, random_state=42, class_weight='balanced', n_jobs=-1)
+        start = time.perf_counter()
+        rf.fit(transform(X_train), y_train)
+        fit_time = time.perf_counter() - start
+        accuracy = accuracy_score(y_test, rf.predict(transform(X_test)))
+        # predict() with n_jobs=-1 pays a thread pool start-up per call; the live scripts call it for one window
+        rf.set_params(n_jobs=1)
+        depth, nodes = forest_size(rf)
+
+        if name == "raw":
+            input_us = 0.0
+            model_input = one_window
+        else:
+            # the live scripts update the features once per sample and read them every 10 samples
+            input_us = time_per_call(lambda: extractor.update(samples[0]), args.repeats * 10) \
+                + time_per_call(extractor.features, args.repeats) / 10
+            model_input = window_features(one_window)
+        predict_us = time_per_call(lambda: rf.predict(model_input), args.repeats)
+        results[name] = (X_train.shape[1] if name == "raw" else model_input.shape[1],
+                         accuracy, fit_time, depth, nodes, input_us, predict_us)
+
+    print(f"{'input':>9} {'dim':>5} {'accuracy':>9} {'fit s':>7} {'depth':>6} {'nodes':>7} "
+          f"{'feat us/sample':>15} {'predict us':>11}")
+    for name, (dim, accuracy, fit_time, depth, nodes, input_us, predict_us) in results.items():
+        print(f"{name:>9} {dim:>5} {accuracy:>9.4f} {fit_time:>7.2f} {depth:>6.1f} {nodes:>7.0f} "
+              f"{input_us:>15.1f} {predict_us:>11.1f}")
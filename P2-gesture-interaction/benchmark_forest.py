@@ -0,0 +1,73 @@
+import argparse
+import os
+import pickle
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+
+from compact_forest import CompactForest, export_forest
+from dataset import load_dataset
+from stream_utils import window_size
+
+# Compares the pickled sklearn forest with its compact .npz export: file size, load time,
+# memory allocated while loading, per-window and batched prediction latency, and agreement.
+#
+#   python benchmark_forest.py --model example_models/rf_b_l_o_r_u.pkl
+
+
+def measure(function, repeats):
+    """Mean seconds per call and the peak memory (bytes) Python allocated during one call."""
+    tracemalloc.start()
+    result = function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    start = time.perf_counter()
+    for _ in range(repeats):
+        function()
+    return (time.perf_counter() - start) / repeats, peak, result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", default="example_models/rf_b_l_o_r_u.pkl")
+    parser.add_argument("--data", default="example_data/1738726494-66512")
+    parser.add_argument("--repeats", type=int, default=50)
+    args = parser.parse_args()
+
+    X, y, _ = load_dataset([args.data], window_size)
+    with open(args.model, 'rb') as f:
+        rf = pickle.load(f)
+    # a single window is predicted at a time in the live scripts; avoid starting a thread pool per call
+    rf.set_params(n_jobs=1)
+    # the export is deleted afterwards; on Windows a still memory mapped file can not be, so that is ignored
+    with tempfile.TemporaryDirectory(ignore_cleanup_errors=True) as directory:
+        compact_path = os.path.join(directory, "forest.npz")
+        export_forest(rf, compact_path)
+
+        def load_pickle():
+            with open(args.model, 'rb') as f:
+                return pickle.load(f)
+
+        candidates = {
+            "pickle": load_pickle,
+            "npz": lambda: CompactForest.load(compact_path, mmap=False),
+            "npz mmap": lambda: CompactForest.load(compact_path, mmap=True),
+        }
+        sizes = {"pickle": os.path.getsize(args.model), "npz": os.path.getsize(compact_path)}
+        sizes["npz mmap"] = sizes["npz"]
+
+        reference = rf.predict(X)
+        batch = X[:256]
+        print(f"{'model':>9} {'file KiB':>9} {'load ms':>8} {'load MiB':>9} {'1 window us':>12} "
+              f"{'256 windows ms':>15} {'agreement':>10}")
+        for name, load in candidates.items():
+            load_time, load_memory, model = measure(load, max(args.repeats // 10, 1))
+            if name == "pickle":
+                model.set_params(n_jobs=1)
+            single_time, _, _ = measure(lambda: model.predict(X[:1]), args.repeats)
+            batch_time, _, _ = measure(lambda: model.predict(batch), max(args.repeats // 10, 1))
+            agreement = np.mean(model.predict(X) == reference)
+            print(f"{name:>9} {sizes[name] / 1024:>9.0f} {1000 * load_time:>8.2f} {load_memory / 2**20:>9.2f} "
+                  f"{1e6 * single_time:>12.0f} {1000 * batch_time:>15.2f} {agreement:>10.4f}")
+        print("(load MiB counts memory allocated by Python; memory mapped pages are shared with the OS page cache)")
@@ -0,0 +1,111 @@
+import argparse
+import time
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+from dataset import make_windows
+from segmentation import gate_segments
+from stream_utils import window_size, channel_names, load_classifier
+
+# Replays the example recordings through the live loop and compares predicting on every 10th
+# sample (what live_sklearn.py did) with predicting only while the motion gate is active:
+# model calls (CPU), keys wrongly sent during the idle recording, and how long it takes after
+# a motion segment starts until the correct gesture is predicted.
+# The recordings have no labelled gesture starts, so the motion onsets are found offline from the
+# gyroscope energy (motion_segments), independently of the gate: the gate reacts later than that onset,
+# and the latency of gated prediction includes its delay.
+#
+#   python benchmark_segmentation.py --data example_data/1738726494-66512
+
+
+def percentiles(latencies):
+    if not latencies:
+        return "no detections"
+    p50, p90, p99 = np.percentile(latencies, [50, 90, 99])
+    return f"p50 {p50:6.0f} ms  p90 {p90:6.0f} ms  p99 {p99:6.0f} ms  (n={len(latencies)})"
+
+
+def motion_segments(values, threshold=0.03, smoothing=5, min_gap=8, min_length=5):
+    """
+    Ground-truth (start, end) motion segments of a recording: runs where the centered moving average
+    of the gyro magnitude over `smoothing` samples is above threshold. It looks ahead, so unlike the
+    causal MotionGate it has no delay. Gaps shorter than min_gap are closed, runs shorter than min_length dropped.
+    """
+    magnitude = np.linalg.norm(values[:, 3:6], axis=1)
+    level = np.convolve(magnitude, np.ones(smoothing) / smoothing, mode='same')
+    edges = np.flatnonzero(np.diff(np.concatenate([[0], level > threshold, [0]]).astype(np.int8)))
+    starts, ends = edges[::2], edges[1::2]
+    # a run starts a new segment unless it follows the previous one within min_gap samples
+    new = np.concatenate([[True], starts[1:] - ends[:-1] >= min_gap])
+    starts, ends = starts[new], ends[np.append(new[1:], True)]
+    long_enough = ends - starts >= min_length
+    return list(zip(starts[long_enough], ends[long_enough]))
+
+
+def first_hit(predict_at, predictions, label, start, end):
+    """Sample index of the first correct prediction in [start, end), or None."""
+    hits = np.flatnonzero(predict_at[start:end] & (predictions[start:end] == label))
+    return start + hits[0] if len(hits) else None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data", default="example_data/1738726494-66512")
+    parser.add_argument("--model", default="example_models/rf_b_l_o_r_u.pkl")
+    parser.add_argument("--every", type=int, default=10, help="baseline: predict every n samples")
+    args = parser.parse_args()
+
+    predict = load_classifier(args.model)
+    single_window = np.zeros((1, window_size * 6), dtype=np.float32)
+    start_time = time.perf_counter()
+    for _ in range(20):
+        predict(single_window)
+    predict_ms = (time.perf_counter() - start_time) / 20 * 1000
+
+    total_samples = total_seconds = 0
+    calls = {"every": 0, "gated": 0}
+    idle_keys = {"every": 0, "gated": 0}
+    latencies = {"every": [], "gated": []}
+    missed = {"every": 0, "gated": 0}
+    gate_seconds = 0.0
+
+    for gesture_file in sorted(Path(args.data).glob("*.csv")):
+        label = gesture_file.stem
+        df = pd.read_csv(gesture_file, float_precision='round_trip')
+        values = df[channel_names].to_numpy(dtype=np.float32)
+        timestamps = df['timestamp'].to_numpy()
+        total_samples += len(values)
+        total_seconds += timestamps[-1] - timestamps[0]
+
+        # the window ending at every sample, with the zero fill the live scripts start with
+        padded = np.concatenate([np.zeros((window_size - 1, 6), dtype=np.float32), values])
+        predictions = np.asarray(predict(make_windows(padded, window_size)))
+
+        start_time = time.perf_counter()
+        _, gated = gate_segments(values)
+        gate_seconds += time.perf_counter() - start_time
+        segments = motion_segments(values)
+        every = (np.arange(1, len(values) + 1) % args.every) == 0
+
+        for name, predict_at in [("every", every), ("gated", gated)]:
+            calls[name] += predict_at.sum()
+            if label == 'o':
+                idle_keys[name] += (predict_at & (predictions != 'o')).sum()
+                continue
+            for start, end in segments:
+                hit = first_hit(predict_at, predictions, label, start, end)
+                if hit is None:
+                    missed[name] += 1
+                else:
+                    latencies[name].append(1000 * (timestamps[hit] - timestamps[start]))
+
+    print(f"{total_samples} samples ({total_samples / total_seconds:.0f} Hz), single-window predict {predict_ms:.2f} ms, "
+          f"gate {1e6 * gate_seconds / total_samples:.1f} us/sample")
+    for name in ["every", "gated"]:
+        cpu = (calls[name] * predict_ms / 1000 + (gate_seconds if name == "gated" else 0)) / total_seconds
+        print(f"{name:>6}: {calls[name]:5d} model calls, {100 * cpu:5.1f}% of one core, "
+              f"{idle_keys[name]:3d} keys sent while idle, {missed[name]} segments missed")
+        print(f"        detection latency after motion onset: {percentiles(latencies[name])}")
+    saved = 1 - calls["gated"] / calls["every"]
+    print(f"motion gate skips {100 * saved:.0f}% of model calls")
@@ -8,11 +8,34 @@ import matplotlib.pyplot as plt
 import matplotlib.animation as animation
 import os  # for creating the data directory
 import matplotlib as mpl  # if you need to adjust rcParams
+from recording import BinaryRecorder
+from stream_utils import RingBuffer
+from resampling import ClockModel
 
 # You might need to change this (you can find it by looking at the port in the Arduino IDE)
 # ARDUINO_PORT = '/dev/cu.usbmodem1401' # Mac-style port
 ARDUINO_PORT = 'COM7' # Windows-style port
 
+# How recordings are saved:
+# "csv" writes one text line per sample, which is easy to read but costly at high sample rates.
+# "bin" writes buffered fixed-width binary records (see recording.py). Convert them for the
+# notebooks with: python recording.py data/<run>
+RECORD_FORMAT = "csv"
+
+# How the live plot is drawn:
+# "autoscale" rescales the axes to the data on every frame (simple, but forces full redraws).
+# "fast" reads straight from a preallocated ring buffer, only redraws the lines (blitting),
+# widens the fixed y-range only when values leave it, and caps the redraw rate at PLOT_MAX_FPS.
+# It also shows the effective FPS and how far the serial reader is behind.
+PLOT_MODE = "fast"
+PLOT_MAX_FPS = 30
+
+# Samples arrive over serial in bursts, so their arrival times are jittery. Recordings keep the raw
+# arrival times: `python train.py data --rate <Hz>` fits a clock model to every recording once, offline,
+# and resamples it onto a uniform grid (see resampling.py). Here a clock model fitted to the arrivals
+# only estimates the board's sample rate for the plot.
+clock = ClockModel()
+
 # Open the serial port
 ser = serial.Serial(ARDUINO_PORT, 9600)
 
@@ -31,6 +54,9 @@ buffer = deque(maxlen=100)
 # Initialize the buffer with zeros
 for _ in range(buffer.maxlen):
     buffer.append(np.zeros(6))
+# Preallocated buffer for the "fast" plot mode and statistics about the reader thread
+plot_buffer = RingBuffer(buffer.maxlen, 6)
+reader_stats = {"samples": 0, "last_sample": time.perf_counter()}
 
 def read_serial():
     """
@@ -53,16 +79,26 @@ def read_serial():
                 values[:3] = values[:3] / 8
                 values[3:] = values[3:] / 4000
                 # Update the fixed-length buffer with new data
-                buffer.append(values)
+                if PLOT_MODE == "fast":
+                    plot_buffer.append(values)
+                    reader_stats["samples"] += 1
+                    reader_stats["last_sample"] = time.perf_counter()
+                else:
+                    buffer.append(values)
 
                 # Record data if recording is active.
-                # Timestamp is now simply time.time() (a float)
+                # Timestamp is time.time() (a float) on arrival
                 timestamp = time.time()
+                clock.update(timestamp)
                 with recording_lock:
                     if recording["active"] and recording["file"] is not None:
-                        csv_line = ",".join(map(str, values))
-                        recording["file"].write(csv_line + f",{timestamp}\n")
-                        recording["file"].flush()
+                        if RECORD_FORMAT == "bin":
+                            # only copies into a preallocated block, disk writes are batched
+                            recording["file"].write(values, timestamp)
+                        else:
+                            csv_line = ",".join(map(str, values))
+                            recording["file"].write(csv_line + f",{timestamp}\n")
+                            recording["file"].flush()
         except Exception as e:
             print("Error reading serial data:", e)
 
@@ -106,6 +142,48 @@ def animate(frame):
     ax.autoscale_view()     # Autoscale the view to the new limits
     return lines
 
+
+# y-range and frame statistics for the "fast" plot mode
+y_limits = [-1.0, 1.0]
+fps_stats = {"frames": 0, "samples": 0, "since": time.perf_counter(), "last_drawn_sample": -1}
+status_text = ax.text(0.01, 0.98, "", transform=ax.transAxes, va='top', fontsize=8, animated=True)
+
+
+def animate_fast(frame):
+    """
+    Animation function for the "fast" plot mode.
+    Sets the line data from a view of the ring buffer (no copy), and only widens the y-range
+    (which needs a full redraw) when a value leaves it. Skips frames without new samples.
+    """
+    now = time.perf_counter()
+    samples = reader_stats["samples"]
+    if samples != fps_stats["last_drawn_sample"]:
+        fps_stats["last_drawn_sample"] = samples
+        data_array = plot_buffer.view()
+        for i, line in enumerate(lines):
+            line.set_ydata(data_array[:, i])
+
+        low, high = float(data_array.min()), float(data_array.max())
+        if low < y_limits[0] or high > y_limits[1]:
+            # grow the range with some headroom so this happens rarely
+            y_limits[0] = min(y_limits[0], low - 0.25 * abs(low))
+            y_limits[1] = max(y_limits[1], high + 0.25 * abs(high))
+            ax.set_ylim(*y_limits)
+            fig.canvas.draw_idle()
+        fps_stats["frames"] += 1
+
+    elapsed = now - fps_stats["since"]
+    if elapsed >= 1.0:
+        fps = fps_stats["frames"] / elapsed
+        sample_rate = (samples - fps_stats["samples"]) / elapsed
+        # bytes waiting in the serial port that the reader thread has not consumed yet
+        backlog = ser.in_waiting
+        device_rate = f" (device {clock.rate:.1f} Hz)" if clock.rate else ""
+        status_text.set_text(f"{fps:.0f} FPS | {sample_rate:.0f} samples/s{device_rate} | reader backlog {backlog} bytes, "
+                             f"newest sample {1000 * (now - reader_stats['last_sample']):.0f} ms old")
+        fps_stats.update(frames=0, samples=samples, since=now)
+    return lines + [status_text]
+
 def on_key_press(event):
     """
     Handle key press events.
@@ -135,11 +213,16 @@ def on_key_press(event):
             # Start recording for this gesture
             recording["active"] = True
             recording["letter"] = key
-            # Create the CSV file inside the data folder for this run.
-            filename = os.path.join(data_folder_path, f"{key}.csv")
-            recording["file"] = open(filename, "w")
-            # Write CSV header
-            recording["file"].write("acc_x,acc_y,acc_z,gyro_x,gyro_y,gyro_z,timestamp\n")
+            if RECORD_FORMAT == "bin":
+                # Create the binary recording inside the data folder for this run.
+                filename = os.path.join(data_folder_path, f"{key}.bin")
+                recording["file"] = BinaryRecorder(filename)
+            else:
+                # Create the CSV file inside the data folder for this run.
+                filename = os.path.join(data_folder_path, f"{key}.csv")
+                recording["file"] = open(filename, "w")
+                # Write CSV header
+                recording["file"].write("acc_x,acc_y,acc_z,gyro_x,gyro_y,gyro_z,timestamp\n")
             ax.set_title(f"RECORDING Gesture {key}", color='red')
             fig.canvas.draw_idle()  # Force the canvas to update the title.
             print(f"Started recording for gesture '{key}' in file: {filename}")
@@ -164,8 +247,13 @@ fig.canvas.mpl_connect('key_press_event', on_key_press)
 if hasattr(fig.canvas.manager, 'key_press_handler_id'):
     fig.canvas.mpl_disconnect(fig.canvas.manager.key_press_handler_id)
 
-# Create an animation that updates every 10ms.
-ani = animation.FuncAnimation(fig, animate, interval=10, blit=True)
+if PLOT_MODE == "fast":
+    ax.set_ylim(*y_limits)
+    # The redraw rate is capped independently of how fast samples arrive.
+    ani = animation.FuncAnimation(fig, animate_fast, interval=1000 / PLOT_MAX_FPS, blit=True, cache_frame_data=False)
+else:
+    # Create an animation that updates every 10ms.
+    ani = animation.FuncAnimation(fig, animate, interval=10, blit=True)
 
 # Start the Matplotlib event loop.
 plt.show()
\ No newline at end of file
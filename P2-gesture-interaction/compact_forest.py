@@ -0,0 +1,148 @@
+import argparse
+import pickle
+import zipfile
+from pathlib import Path
+import numpy as np
+
+# Array-based random forest for fast loading and prediction.
+#
+# export_forest() flattens every tree of a trained sklearn RandomForestClassifier into a few
+# shared arrays (split feature, threshold, left/right child and quantized leaf probabilities)
+# and stores them uncompressed in one .npz. CompactForest.load() memory maps these arrays
+# straight out of the .npz, so loading takes milliseconds instead of unpickling, and predict
+# walks all trees for all windows at once with a handful of vectorized steps.
+#
+#   python compact_forest.py example_models/rf_b_l_o_r_u.pkl   # writes example_models/rf_b_l_o_r_u.npz
+
+PROBABILITY_SCALE = np.iinfo(np.uint16).max
+
+
+def _float32_thresholds(thresholds):
+    """
+    Largest float32 <= each float64 threshold. sklearn compares float32 inputs against float64
+    thresholds, and x <= t holds for a float32 x exactly when x <= this value.
+    """
+    rounded = thresholds.astype(np.float32)
+    too_big = rounded.astype(np.float64) > thresholds
+    rounded[too_big] = np.nextafter(rounded[too_big], np.float32(-np.inf))
+    return rounded
+
+
+def export_forest(rf, path):
+    """Write a fitted RandomForestClassifier (single output) to a compact .npz file."""
+    features, thresholds, left, right, values, roots = [], [], [], [], [], []
+    offset = 0
+    max_depth = 0
+    for estimator in rf.estimators_:
+        tree = estimator.tree_
+        n = tree.node_count
+        is_leaf = tree.children_left == -1
+        nodes = np.arange(n)
+        # leaves point to themselves, so walking a fixed number of steps stays on them
+        left.append(np.where(is_leaf, nodes, tree.children_left) + offset)
+        right.append(np.where(is_leaf, nodes, tree.children_right) + offset)
+        features.append(np.where(is_leaf, 0, tree.feature))
+        thresholds.append(_float32_thresholds(np.where(is_leaf, 0.0, tree.threshold)))
+        probabilities = tree.value[:, 0, :] / tree.value[:, 0, :].sum(axis=1, keepdims=True)
+        values.append(np.round(probabilities * PROBABILITY_SCALE).astype(np.uint16))
+        roots.append(offset)
+        offset += n
+        max_depth = max(max_depth, tree.max_depth)
+
+    # uint16 feature indices unless a model has more than 65536 features
+    feature_dtype = np.uint16 if rf.n_features_in_ <= np.iinfo(np.uint16).max + 1 else np.uint32
+    with open(path, 'wb') as f:
+        # np.savez stores members uncompressed, which is what makes them memory-mappable
+        np.savez(f,
+                 feature=np.concatenate(features).astype(feature_dtype),
+                 threshold=np.concatenate(thresholds),
+                 left=np.concatenate(left).astype(np.int32),
+                 right=np.concatenate(right).astype(np.int32),
+                 value=np.concatenate(values),
+                 roots=np.array(roots, dtype=np.int32),
+                 max_depth=np.array(max_depth),
+                 n_features=np.array(rf.n_features_in_),
+                 classes=np.asarray(rf.classes_).astype(str))
+
+
+def _mmap_npz(path):
+    """Memory map every array of an uncompressed .npz file."""
+    arrays = {}
+    with zipfile.ZipFile(path) as archive, open(path, 'rb') as f:
+        for info in archive.infolist():
+            if info.compress_type != zipfile.ZIP_STORED:
+                raise ValueError(f"{path} is compressed and cannot be memory mapped")
+            # skip the zip local file header (30 bytes + name + extra field) to reach the .npy data
+            f.seek(info.header_offset + 26)
+            name_length, extra_length = (int(n) for n in np.frombuffer(f.read(4), dtype='<u2'))
+            f.seek(info.header_offset + 30 + name_length + extra_length)
+            if np.lib.format.read_magic(f) == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+            name = info.filename[:-len(".npy")]
+            if dtype.hasobject:
+                raise ValueError(f"{path} contains object arrays")
+            if shape == () or 0 in shape:
+                # scalars and empty arrays can't be memory mapped, and are tiny anyway
+                arrays[name] = np.fromfile(f, dtype=dtype, count=int(np.prod(shape))).reshape(shape)
+            else:
+                arrays[name] = np.memmap(path, dtype=dtype, mode='r', offset=f.tell(), shape=shape,
+                                         order='F' if fortran_order else 'C')
+    return arrays
+
+
+class CompactForest:
+    """Drop-in replacement for a fitted RandomForestClassifier's predict / predict_proba."""
+
+    def __init__(self, arrays):
+        # np.asarray keeps memory mapped data mapped, but drops the slower np.memmap subclass
+        self.feature = np.asarray(arrays['feature'])
+        self.threshold = np.asarray(arrays['threshold'])
+        self.left = np.asarray(arrays['left'])
+        self.right = np.asarray(arrays['right'])
+        self.value = np.asarray(arrays['value'])
+        self.roots = np.asarray(arrays['roots'])
+        self.max_depth = int(arrays['max_depth'])
+        self.n_features_in_ = int(arrays['n_features'])
+        self.classes_ = np.asarray(arrays['classes'])
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        if mmap:
+            return cls(_mmap_npz(path))
+        with np.load(path) as arrays:
+            return cls({name: arrays[name] for name in arrays.files})
+
+    def apply(self, X):
+        """Leaf index reached in every tree, shape (n_samples, n_trees)."""
+        X = np.asarray(X, dtype=np.float32).reshape(-1, self.n_features_in_)
+        rows = np.arange(len(X))[:, None]
+        nodes = np.broadcast_to(self.roots, (len(X), len(self.roots)))
+        for _ in range(self.max_depth):
+            go_left = X[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+        return nodes
+
+    def predict_proba(self, X):
+        leaves = self.apply(X)
+        totals = self.value[leaves].sum(axis=1, dtype=np.float64)
+        return totals / (PROBABILITY_SCALE * leaves.shape[1])
+
+    def predict(self, X):
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert a pickled random forest into a compact .npz forest.")
+    parser.add_argument("model", help="pickled RandomForestClassifier, e.g. models/rf_b_l_o_r_u.pkl")
+    parser.add_argument("--out", default=None, help="output path (default: same name with .npz)")
+    args = parser.parse_args()
+
+    with open(args.model, 'rb') as f:
+        rf = pickle.load(f)
+    out = args.out or Path(args.model).with_suffix(".npz")
+    export_forest(rf, out)
+    forest = CompactForest.load(out)
+    print(f"{args.model} -> {out}: {len(forest.roots)} trees, {len(forest.feature)} nodes, "
+          f"max depth {forest.max_depth}, {Path(out).stat().st_size / 1024:.0f} KiB")
@@ -0,0 +1,144 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from recording import open_recording
+from resampling import resample_recording
+from stream_utils import window_size, num_channels, channel_names
+
+# Loading recorded gestures for training.
+# A run folder (data/<timestamp>/) holds one file per gesture, named after the gesture letter,
+# as written by collect.py (.csv or the binary .bin format from recording.py, which is preferred
+# when both exist). Windows never cross file boundaries.
+#
+# load_dataset(..., cache=True) keeps the windows of every run in one .npz next to the
+# recordings (.windows_w<size>_s<step>.npz), so later training runs skip parsing entirely.
+# The cache is rebuilt whenever a recording is added, removed or modified.
+#
+# load_dataset(..., rate=<Hz>) resamples every recording onto a uniform time grid first (see
+# resampling.py), using the timestamps collect.py stored with every sample.
+
+
+def gesture_files(run):
+    """The recording of every gesture in a run folder, preferring .bin over .csv."""
+    files = {f.stem: f for f in sorted(Path(run).glob("*.csv"))}
+    files.update({f.stem: f for f in sorted(Path(run).glob("*.bin"))})
+    return [files[stem] for stem in sorted(files)]
+
+
+def find_runs(paths):
+    """Expand a list of run folders and/or parent folders (like ./data) into run folders."""
+    runs = []
+    for path in map(Path, paths):
+        if gesture_files(path):
+            runs.append(path)
+        else:
+            runs += sorted(p for p in path.iterdir() if p.is_dir() and gesture_files(p))
+    return runs
+
+
+def load_recording(path, chunk_rows=100_000, with_timestamps=False):
+    """
+    Read the six sensor channels of one gesture recording as a float32 (n, 6) array
+    (and the float64 (n,) timestamps if with_timestamps).
+    Binary recordings are memory mapped; large CSV files are read in chunks,
+    so the text is never held in memory all at once.
+    """
+    if Path(path).suffix == ".bin":
+        records = open_recording(path)
+        values, timestamps = np.array(records['values']), np.array(records['timestamp'])
+    else:
+        columns = channel_names + ["timestamp"] if with_timestamps else channel_names
+        dtypes = {name: np.float32 for name in channel_names} | {"timestamp": np.float64}
+        chunks = list(pd.read_csv(path, usecols=columns, dtype=dtypes, chunksize=chunk_rows))
+        if not chunks:
+            values, timestamps = np.zeros((0, num_channels), dtype=np.float32), np.zeros(0)
+        else:
+            values = np.concatenate([chunk[channel_names].to_numpy() for chunk in chunks])
+            timestamps = np.concatenate([chunk["timestamp"].to_numpy() for chunk in chunks]) if with_timestamps else None
+    return (values, timestamps) if with_timestamps else values
+
+
+def load_resampled(path, rate):
+    """A recording resampled to `rate` Hz (or as recorded if rate is None)."""
+    if rate is None:
+        return load_recording(path)
+    return resample_recording(*load_recording(path, with_timestamps=True), rate)
+
+
+def make_windows(values, window_size=window_size, step=1):
+    """
+    All windows of `window_size` consecutive samples, flattened like the live scripts do
+    (sample-major: 50 samples x 6 channels). Returns an (n, window_size * 6) array.
+    """
+    if len(values) < window_size:
+        return np.zeros((0, window_size * values.shape[1]), dtype=values.dtype)
+    windows = sliding_window_view(values, window_size, axis=0)[::step]  # (n, 6, window_size) view
+    return windows.transpose(0, 2, 1).reshape(len(windows), -1)
+
+
+def _cache_path(run, window_size, step, rate):
+    resampled = "" if rate is None else f"_r{rate:g}"
+    return Path(run) / f".windows_w{window_size}_s{step}{resampled}.npz"
+
+
+def _file_stamps(files):
+    """Name, size and modification time of every file, to tell whether a cache is stale."""
+    return np.array([f"{f.name}:{f.stat().st_size}:{f.stat().st_mtime_ns}" for f in files])
+
+
+def read_cache(run, window_size=window_size, step=1, rate=None):
+    """(X, y) of a run from its cache, or None if there is none or a recording changed since."""
+    cache_path = _cache_path(run, window_size, step, rate)
+    if not cache_path.exists():
+        return None
+    with np.load(cache_path) as cached:
+        if not np.array_equal(cached['stamps'], _file_stamps(gesture_files(run))):
+            return None
+        return cached['X'], cached['y']
+
+
+def write_cache(run, X, y, window_size=window_size, step=1, rate=None):
+    cache_path = _cache_path(run, window_size, step, rate)
+    # write under a temporary name first, so an interrupted write never leaves a broken cache
+    tmp_path = cache_path.with_name(cache_path.name + ".tmp")
+    with open(tmp_path, 'wb') as f:
+        np.savez(f, X=X, y=y, stamps=_file_stamps(gesture_files(run)))
+    tmp_path.replace(cache_path)
+
+
+def load_dataset(paths, window_size=window_size, step=1, workers=8, cache=False, rate=None):
+    """
+    Load every gesture file of every run and window it.
+    With cache=True, runs whose recordings haven't changed are read from their .npz cache
+    and the others are cached after loading. With a rate (Hz), recordings are resampled to it first.
+
+    Returns:
+        X: (n, window_size * 6) float32 windows
+        y: (n,) gesture labels
+        groups: (n,) index of the run each window comes from (for grouped cross-validation)
+    """
+    runs = find_runs(paths)
+    if not runs:
+        raise FileNotFoundError(f"No gesture recordings found in {paths}")
+
+    loaded = {run: read_cache(run, window_size, step, rate) for run in runs} if cache else {}
+    files = [f for run in runs if loaded.get(run) is None for f in gesture_files(run)]
+    with ThreadPoolExecutor(workers) as pool:
+        windows = dict(zip(files, pool.map(lambda f: make_windows(load_resampled(f, rate), window_size, step), files)))
+
+    X, y, groups = [], [], []
+    for run_index, run in enumerate(runs):
+        if loaded.get(run) is None:
+            run_files = gesture_files(run)
+            loaded[run] = (np.concatenate([windows[f] for f in run_files]),
+                           np.concatenate([np.full(len(windows[f]), f.stem) for f in run_files]))
+            if cache:
+                write_cache(run, *loaded[run], window_size, step, rate)
+        run_X, run_y = loaded[run]
+        X.append(run_X)
+        y.append(run_y)
+        groups.append(np.full(len(run_y), run_index))
+    return np.concatenate(X), np.concatenate(y), np.concatenate(groups)
@@ -0,0 +1,103 @@
+import struct
+import time
+from collections import deque
+import numpy as np
+
+# Turns the stream of per-window predictions into discrete gesture events.
+# Without it, every window during (and right after) a gesture sends the same key again, and a
+# single misclassified window sends a key too. GestureDecider votes over the last few
+# predictions, requires a per-class confidence, and ignores everything for a refractory period
+# after an event.
+#
+# Events can be sent as the plain one-letter key (what UI.pde has always understood) or as a
+# compact binary message with a sequence number and the send timestamp, so the receiver can
+# drop duplicates and measure end-to-end latency.
+
+
+class GestureDecider:
+    def __init__(self, classes, window=2, mode="mean", threshold=0.6, class_thresholds=None,
+                 refractory=0.5, idle_label='o'):
+        """
+        Args:
+            classes: labels in the order of the probability vectors (model.classes_ / label_encoder.classes_)
+            window (int): number of recent predictions to vote over
+            mode (str): "mean" averages the probability vectors, "vote" takes the majority of the argmax labels
+            threshold (float): confidence an event needs (mean probability, or vote share for "vote")
+            class_thresholds (dict): per-class overrides of threshold, e.g. {'u': 0.8}
+            refractory (float): seconds after an event during which no other event fires
+            idle_label: class that never fires an event
+        """
+        self.classes = np.asarray(classes).tolist()
+        self.window = window
+        self.mode = mode
+        self.thresholds = np.array([(class_thresholds or {}).get(c, threshold) for c in self.classes])
+        self.refractory = refractory
+        self.idle_label = idle_label
+        self.history = deque(maxlen=window)
+        self.last_event_time = -np.inf
+
+    def reset(self):
+        """Forget the collected predictions, e.g. when a new motion segment starts."""
+        self.history.clear()
+
+    def update(self, probabilities, now=None):
+        """
+        Add the probability vector of one prediction. Returns the label of a new event, or None.
+        """
+        now = time.monotonic() if now is None else now
+        self.history.append(np.asarray(probabilities, dtype=np.float64))
+        if len(self.history) < self.window or now - self.last_event_time < self.refractory:
+            return None
+
+        stacked = np.array(self.history)
+        if self.mode == "vote":
+            votes = np.bincount(stacked.argmax(axis=1), minlength=len(self.classes))
+            best = votes.argmax()
+            confidence = votes[best] / len(stacked)
+        else:
+            mean = stacked.mean(axis=0)
+            best = mean.argmax()
+            confidence = mean[best]
+
+        label = self.classes[best]
+        if label == self.idle_label or confidence < self.thresholds[best]:
+            return None
+        self.last_event_time = now
+        self.history.clear()
+        return label
+
+
+# Binary event message: marker byte, uint32 sequence number, float64 time.time() at send, key byte.
+EVENT_FORMAT = "<BIdc"
+EVENT_MARKER = 0xC5  # not a printable character, so it can't be confused with a plain key
+EVENT_SIZE = struct.calcsize(EVENT_FORMAT)
+
+
+def encode_event(key, sequence, timestamp=None):
+    timestamp = time.time() if timestamp is None else timestamp
+    return struct.pack(EVENT_FORMAT, EVENT_MARKER, sequence & 0xFFFFFFFF, timestamp, key.encode("utf-8"))
+
+
+def decode_event(data):
+    """Returns (key, sequence, timestamp) for binary events, or (key, None, None) for plain keys."""
+    if len(data) == EVENT_SIZE and data[0] == EVENT_MARKER:
+        _, sequence, timestamp, key = struct.unpack(EVENT_FORMAT, data)
+        return key.decode("utf-8"), sequence, timestamp
+    return data.decode("utf-8").strip(), None, None
+
+
+class EventSender:
+    """Sends keys over UDP, either as plain text or as binary events with sequence numbers."""
+
+    def __init__(self, sock, address, binary=False):
+        self.sock = sock
+        self.address = address
+        self.binary = binary
+        self.sequence = 0
+
+    def send(self, key):
+        if self.binary:
+            self.sequence += 1
+            self.sock.sendto(encode_event(key, self.sequence), self.address)
+        else:
+            self.sock.sendto(key.encode("utf-8"), self.address)
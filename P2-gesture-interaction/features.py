@@ -0,0 +1,107 @@
+from collections import deque
+import numpy as np
+
+from stream_utils import window_size, num_channels, channel_names
+
+# Compact per-channel features of a sensor window, used instead of the raw 50 x 6 = 300 values.
+# window_features() computes them for a whole batch of windows at once (training, benchmarks),
+# StreamingFeatures keeps them up to date sample by sample (live scripts).
+# Both produce the same numbers, so a model trained on one can be used with the other.
+
+feature_kinds = ["mean", "var", "energy", "zero_crossings", "min", "max"]
+feature_names = [f"{channel}_{kind}" for kind in feature_kinds for channel in channel_names]
+num_features = len(feature_names)
+
+
+def window_features(windows, window_size=window_size):
+    """
+    Compute features for a batch of windows.
+
+    Args:
+        windows: array of shape (n, window_size, 6) or flattened (n, window_size * 6)
+    Returns:
+        float32 array of shape (n, num_features), ordered like feature_names
+    """
+    windows = np.asarray(windows, dtype=np.float64).reshape(len(windows), window_size, -1)
+    negative = np.signbit(windows)
+    return np.concatenate([
+        windows.mean(axis=1),
+        windows.var(axis=1),
+        (windows ** 2).mean(axis=1),
+        (negative[:, 1:] != negative[:, :-1]).sum(axis=1),
+        windows.min(axis=1),
+        windows.max(axis=1),
+    ], axis=1).astype(np.float32)
+
+
+class StreamingFeatures:
+    """
+    Keeps the features of the last `window_size` samples up to date in O(1) per sample.
+
+    Sums, sums of squares and zero-crossing counts are updated with the entering and the
+    leaving sample; min and max use monotonic queues (amortized O(1)).
+    Starts out filled with zeros, like the live scripts' buffers.
+    """
+
+    def __init__(self, window_size=window_size, channels=num_channels):
+        self.window_size = window_size
+        self.channels = channels
+        self.samples = np.zeros((window_size, channels))
+        self.index = 0  # slot of the oldest sample, which is overwritten next
+        self.count = 0
+
+        self.sum = np.zeros(channels)
+        self.sum_sq = np.zeros(channels)
+        self.zero_crossings = np.zeros(channels)
+        # monotonic queues of (sample number, value) per channel
+        self.min_queues = [deque([(window_size - 1, 0.0)]) for _ in range(channels)]
+        self.max_queues = [deque([(window_size - 1, 0.0)]) for _ in range(channels)]
+        self.out = np.zeros(len(feature_kinds) * channels, dtype=np.float32)
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        n = self.window_size
+        i = self.index
+        oldest = self.samples[i]
+        second_oldest = self.samples[(i + 1) % n]
+        newest = self.samples[i - 1]
+
+        self.sum += values - oldest
+        self.sum_sq += values * values - oldest * oldest
+        self.zero_crossings += (np.signbit(values) != np.signbit(newest)).astype(np.float64) \
+            - (np.signbit(second_oldest) != np.signbit(oldest))
+
+        self.samples[i] = values
+        self.index = (i + 1) % n
+        position = self.count + n  # sample number of this value (the zero fill has numbers 0..n-1)
+        self.count += 1
+        for c in range(self.channels):
+            value = values[c]
+            min_queue = self.min_queues[c]
+            while min_queue and min_queue[-1][1] >= value:
+                min_queue.pop()
+            min_queue.append((position, value))
+            if min_queue[0][0] <= position - n:
+                min_queue.popleft()
+
+            max_queue = self.max_queues[c]
+            while max_queue and max_queue[-1][1] <= value:
+                max_queue.pop()
+            max_queue.append((position, value))
+            if max_queue[0][0] <= position - n:
+                max_queue.popleft()
+
+    def features(self):
+        """The current feature vector as a float32 array of shape (num_features,), ordered like feature_names."""
+        n = self.window_size
+        c = self.channels
+        mean = self.sum / n
+        energy = self.sum_sq / n
+        out = self.out
+        out[0:c] = mean
+        out[c:2 * c] = np.maximum(energy - mean * mean, 0)
+        out[2 * c:3 * c] = energy
+        out[3 * c:4 * c] = self.zero_crossings
+        out[4 * c:5 * c] = [queue[0][1] for queue in self.min_queues]
+        out[5 * c:6 * c] = [queue[0][1] for queue in self.max_queues]
+        return out
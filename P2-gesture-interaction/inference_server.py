@@ -0,0 +1,205 @@
+import argparse
+import socket
+import threading
+import time
+import numpy as np
+import serial
+
+from features import window_features
+from stream_utils import window_size, num_channels, prediction_to_key, parse_line, RingBuffer, load_classifier
+
+# One process serving predictions for many IMU boards.
+# Every board (serial port or UDP producer) gets its own ring buffer. A single batching loop
+# wakes up once per tick, stacks the windows of all streams that received enough new samples,
+# runs ONE model.predict for all of them, and sends each stream's key to its own UDP target
+# using the same protocol as live_sklearn.py (a single utf-8 key per datagram).
+#
+# Examples:
+#   python inference_server.py --serial COM7 --serial COM8@127.0.0.1:5006
+#   python inference_server.py --udp-listen 5010 --route glove1=127.0.0.1:5005
+#
+# UDP producers send datagrams of the form "<stream id>|ax,ay,az,gx,gy,gz" (one or more lines).
+
+#### UDP Socket Configuration ####
+UDP_IP = "127.0.0.1"
+UDP_PORT = 5005
+####
+
+
+class Stream:
+    """Per-device state: the sample window, where to send results and how many samples arrived since the last prediction."""
+
+    def __init__(self, name, address):
+        self.name = name
+        self.address = address
+        self.buffer = RingBuffer(window_size, num_channels)
+        self.lock = threading.Lock()
+        self.new_samples = 0
+
+    def push(self, values):
+        with self.lock:
+            self.buffer.append(values)
+            self.new_samples += 1
+
+
+class InferenceServer:
+    def __init__(self, predict, hop=10, tick=0.02, max_batch=256, default_address=(UDP_IP, UDP_PORT), routes=None,
+                 use_features=False):
+        """
+        Args:
+            predict: function mapping a (n, window_size * 6) array to n labels (see stream_utils.load_classifier)
+            hop (int): predict for a stream after this many new samples (the live scripts use 10)
+            tick (float): latency budget in seconds, i.e. how often the batching loop runs
+            max_batch (int): upper bound on windows per model.predict call
+            default_address (tuple): UDP target for streams without an explicit route
+            routes (dict): stream name -> (ip, port)
+            use_features (bool): the model was trained on features.window_features instead of raw windows
+        """
+        self.predict = predict
+        self.hop = hop
+        self.tick = tick
+        self.max_batch = max_batch
+        self.default_address = default_address
+        self.routes = routes or {}
+        self.use_features = use_features
+        self.streams = {}
+        self.streams_lock = threading.Lock()
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.batch = np.zeros((max_batch, window_size * num_channels), dtype=np.float32)
+        self.running = False
+
+        # statistics, printed every few seconds
+        self.ticks = 0
+        self.predictions = 0
+        self.overruns = 0
+
+    def get_stream(self, name, address=None):
+        with self.streams_lock:
+            stream = self.streams.get(name)
+            if stream is None:
+                address = address or self.routes.get(name, self.default_address)
+                stream = Stream(name, address)
+                self.streams[name] = stream
+                print(f"New stream '{name}' -> {address[0]}:{address[1]}")
+            return stream
+
+    def read_serial(self, port, baudrate=9600, address=None):
+        """Reader thread for one serial port."""
+        stream = self.get_stream(port, address)
+        ser = serial.Serial(port, baudrate)
+        while self.running:
+            try:
+                values = parse_line(ser.readline())
+                if values is not None:
+                    stream.push(values)
+            except Exception as e:
+                print(f"Error reading {port}:", e)
+
+    def read_udp(self, port):
+        """Reader thread for UDP producers ("<stream id>|ax,ay,az,gx,gy,gz" per line)."""
+        listener = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        listener.bind(("0.0.0.0", port))
+        print(f"Listening for UDP producers on port {port}")
+        while self.running:
+            data, _ = listener.recvfrom(65535)
+            for line in data.decode('utf-8', errors='ignore').splitlines():
+                name, sep, payload = line.partition('|')
+                if not sep:
+                    continue
+                values = parse_line(payload)
+                if values is not None:
+                    self.get_stream(name).push(values)
+
+    def step(self):
+        """Run one tick: batch every ready stream into a single predict call and fan the results out."""
+        with self.streams_lock:
+            streams = list(self.streams.values())
+
+        ready = []
+        for stream in streams:
+            if stream.new_samples < self.hop:
+                continue
+            with stream.lock:
+                self.batch[len(ready)] = stream.buffer.view().reshape(-1)
+                stream.new_samples = 0
+            ready.append(stream)
+            if len(ready) == self.max_batch:
+                break
+
+        if not ready:
+            return 0
+
+        batch = self.batch[:len(ready)]
+        if self.use_features:
+            batch = window_features(batch)
+        predictions = self.predict(batch)
+        for stream, prediction in zip(ready, predictions):
+            if prediction in prediction_to_key:
+                self.sock.sendto(prediction_to_key[prediction].encode("utf-8"), stream.address)
+        self.predictions += len(ready)
+        return len(ready)
+
+    def run(self, serial_ports=(), udp_port=None, baudrate=9600, report_every=5.0):
+        self.running = True
+        for port, address in serial_ports:
+            threading.Thread(target=self.read_serial, args=(port, baudrate, address), daemon=True).start()
+        if udp_port is not None:
+            threading.Thread(target=self.read_udp, args=(udp_port,), daemon=True).start()
+
+        next_tick = time.perf_counter()
+        last_report = next_tick
+        while self.running:
+            self.step()
+            self.ticks += 1
+
+            now = time.perf_counter()
+            if now - last_report >= report_every:
+                print(f"{len(self.streams)} streams, {self.predictions / (now - last_report):.1f} predictions/s, "
+                      f"{self.predictions / max(self.ticks, 1):.2f} windows per batch, {self.overruns} ticks over budget")
+                self.ticks = self.predictions = self.overruns = 0
+                last_report = now
+
+            # keep a fixed tick rate; if predict took longer than the budget, start the next tick right away
+            next_tick += self.tick
+            if next_tick > now:
+                time.sleep(next_tick - now)
+            else:
+                self.overruns += 1
+                next_tick = now
+
+
+def parse_address(text):
+    ip, _, port = text.rpartition(':')
+    return (ip or UDP_IP, int(port))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve gesture predictions for many boards from one process.")
+    parser.add_argument("--model", default="example_models/rf_b_l_o_r_u.pkl")
+    parser.add_argument("--label-encoder", default=None, help="label encoder pickle, only for keras models")
+    parser.add_argument("--serial", action="append", default=[], metavar="PORT[@IP:PORT]",
+                        help="serial port to read, optionally with its own UDP target (repeatable)")
+    parser.add_argument("--baudrate", type=int, default=9600)
+    parser.add_argument("--udp-listen", type=int, default=None, help="port to receive samples from UDP producers")
+    parser.add_argument("--route", action="append", default=[], metavar="ID=IP:PORT",
+                        help="UDP target for a stream id from a UDP producer (repeatable)")
+    parser.add_argument("--features", action="store_true", help="the model was trained on features.window_features")
+    parser.add_argument("--hop", type=int, default=10)
+    parser.add_argument("--tick-ms", type=float, default=20.0, help="latency budget per batch")
+    parser.add_argument("--max-batch", type=int, default=256)
+    args = parser.parse_args()
+
+    serial_ports = []
+    for spec in args.serial:
+        port, _, address = spec.partition('@')
+        serial_ports.append((port, parse_address(address) if address else None))
+    routes = {}
+    for spec in args.route:
+        name, _, address = spec.partition('=')
+        routes[name] = parse_address(address)
+
+    print("loading model")
+    predict = load_classifier(args.model, args.label_encoder)
+    server = InferenceServer(predict, hop=args.hop, tick=args.tick_ms / 1000, max_batch=args.max_batch, routes=routes,
+                             use_features=args.features)
+    server.run(serial_ports, args.udp_listen, args.baudrate)
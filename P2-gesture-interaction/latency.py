@@ -0,0 +1,112 @@
+import sys
+import time
+
+# Low-overhead latency instrumentation for the live loop.
+#
+#   latency = LatencyRecorder(enabled=True)
+#   t = latency.now()
+#   line = ser.readline()
+#   t = latency.stage("serial read", t)   # records the time since t, returns the new timestamp
+#
+# Every stage keeps an HDR-style histogram (log-linear buckets, a few percent relative error,
+# constant memory), and report() prints p50/p95/p99/max per stage every `report_every` seconds.
+# With enabled=False every call returns immediately, so the instrumentation can stay in the code.
+
+
+class LatencyHistogram:
+    """Histogram of nanosecond values with 2**(sub_bucket_bits - 1) linear buckets per power of two."""
+
+    def __init__(self, sub_bucket_bits=6, max_exponent=40):
+        self.sub_bucket_bits = sub_bucket_bits
+        self.half = 1 << (sub_bucket_bits - 1)
+        self.counts = [0] * ((1 << sub_bucket_bits) + max_exponent * self.half)
+        self.total = 0
+        self.max = 0
+
+    def _index(self, value):
+        if value < (1 << self.sub_bucket_bits):
+            return value
+        shift = value.bit_length() - self.sub_bucket_bits
+        return (1 << self.sub_bucket_bits) + (shift - 1) * self.half + (value >> shift) - self.half
+
+    def _value(self, index):
+        """Upper edge of a bucket."""
+        if index < (1 << self.sub_bucket_bits):
+            return index
+        shift, mantissa = divmod(index - (1 << self.sub_bucket_bits), self.half)
+        return ((mantissa + self.half + 1) << (shift + 1)) - 1
+
+    def record(self, value):
+        index = min(self._index(max(value, 0)), len(self.counts) - 1)
+        self.counts[index] += 1
+        self.total += 1
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, p):
+        target = p / 100 * self.total
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= target:
+                return min(self._value(index), self.max)
+        return self.max
+
+    def reset(self):
+        self.counts = [0] * len(self.counts)
+        self.total = 0
+        self.max = 0
+
+
+class LatencyRecorder:
+    def __init__(self, enabled=True, report_every=5.0, path=None):
+        """
+        Args:
+            enabled (bool): when False, now() and stage() return 0 and record nothing
+            report_every (float): seconds between reports (see maybe_report)
+            path (str): append reports to this file instead of printing them
+        """
+        self.enabled = enabled
+        self.report_every = report_every
+        self.path = path
+        self.histograms = {}
+        self.last_report = time.perf_counter_ns()
+
+    def now(self):
+        return time.perf_counter_ns() if self.enabled else 0
+
+    def stage(self, name, since):
+        """Record the time from `since` (a now() value) until now under `name`, and return now."""
+        if not self.enabled:
+            return 0
+        now = time.perf_counter_ns()
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = LatencyHistogram()
+        histogram.record(now - since)
+        return now
+
+    def maybe_report(self):
+        """Report and reset the histograms if report_every seconds have passed."""
+        if not self.enabled:
+            return
+        now = time.perf_counter_ns()
+        if now - self.last_report >= self.report_every * 1e9:
+            self.report()
+            self.last_report = now
+
+    def report(self):
+        lines = [f"latency over the last {self.report_every:.0f} s ({time.strftime('%H:%M:%S')}):"]
+        for name, histogram in self.histograms.items():
+            if histogram.total == 0:
+                continue
+            p50, p95, p99 = (histogram.percentile(p) / 1e6 for p in (50, 95, 99))
+            lines.append(f"  {name:>16}: n={histogram.total:6d}  p50 {p50:8.3f} ms  p95 {p95:8.3f} ms  "
+                         f"p99 {p99:8.3f} ms  max {histogram.max / 1e6:8.3f} ms")
+            histogram.reset()
+        text = "\n".join(lines) + "\n"
+        if self.path:
+            with open(self.path, 'a') as f:
+                f.write(text)
+        else:
+            sys.stdout.write(text)
@@ -0,0 +1,297 @@
+import argparse
+import asyncio
+import os
+import socket
+import time
+from concurrent.futures import ThreadPoolExecutor
+import serial
+
+from decision import GestureDecider, encode_event
+from segmentation import MotionGate
+from stream_utils import window_size, num_channels, prediction_to_key, parse_line, RingBuffer, \
+    load_probabilistic_classifier
+
+try:
+    import serial_asyncio  # pip install pyserial-asyncio
+except ImportError:
+    serial_asyncio = None
+
+# asyncio version of live_sklearn.py / live_keras.py.
+# One event loop reads any number of boards (serial ports and/or UDP producers), sends keys through
+# a single UDP DatagramProtocol, and answers metrics requests, without a thread per device.
+# Only the model runs off the loop, in a small thread pool, so a slow prediction never delays
+# reading. Every board has its own window, motion gate and decider like in the live scripts;
+# while a board's previous prediction is still running, its next one is skipped.
+#
+# Serial ports are read with pyserial-asyncio when it is installed, otherwise straight from the
+# port's file descriptor (macOS / Linux), otherwise with a blocking reader in the thread pool (Windows).
+#
+#   python live_async.py --serial COM7
+#   python live_async.py --serial /dev/ttyACM0 --serial /dev/ttyACM1@127.0.0.1:5006 --metrics-port 8000
+#   python live_async.py --udp-listen 5010 --model example_models/rf_b_l_o_r_u.npz
+#
+# UDP producers send "<board id>|ax,ay,az,gx,gy,gz" lines like for inference_server.py, and
+# `nc localhost 8000` prints the per-board metrics.
+
+#### UDP Socket Configuration ####
+UDP_IP = "127.0.0.1"
+UDP_PORT = 5005
+####
+
+
+class Board:
+    """Per-board state: window, motion gate, decider, pending prediction and counters."""
+
+    def __init__(self, name, address, classes, hop, use_motion_gate, decider_args):
+        self.name = name
+        self.address = address
+        self.buffer = RingBuffer(window_size, num_channels)
+        self.gate = MotionGate(hop=hop)
+        self.decider = GestureDecider(classes, **decider_args)
+        self.hop = hop
+        self.use_motion_gate = use_motion_gate
+        self.partial = b""  # incomplete line from the last chunk of serial data
+        self.busy = False   # a prediction for this board is running
+        self.samples = 0
+        self.predictions = 0
+        self.skipped = 0
+        self.events = 0
+
+    def due(self, values):
+        """Add one sample; True when the model should run on the current window."""
+        self.buffer.append(values)
+        self.samples += 1
+        if self.gate.update(values) == "start":
+            self.decider.reset()
+        if self.use_motion_gate:
+            return self.gate.should_predict()
+        return self.samples % self.hop == 0
+
+
+class UdpSender(asyncio.DatagramProtocol):
+    """Output side: one UDP endpoint that sends the keys of every board."""
+
+    def __init__(self, binary=False):
+        self.binary = binary
+        self.transport = None
+        self.sequence = 0
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def send(self, key, address):
+        if self.binary:
+            self.sequence += 1
+            self.transport.sendto(encode_event(key, self.sequence), address)
+        else:
+            self.transport.sendto(key.encode("utf-8"), address)
+
+
+class UdpSamples(asyncio.DatagramProtocol):
+    """Input side for UDP producers ("<board id>|ax,ay,az,gx,gy,gz" per line)."""
+
+    def __init__(self, pipeline):
+        self.pipeline = pipeline
+
+    def datagram_received(self, data, addr):
+        for line in data.decode('utf-8', errors='ignore').splitlines():
+            name, sep, payload = line.partition('|')
+            if not sep:
+                continue
+            values = parse_line(payload)
+            if values is not None:
+                self.pipeline.push(self.pipeline.board(name), values)
+
+
+class SerialLines(asyncio.Protocol):
+    """pyserial-asyncio protocol that feeds the bytes of one port into its board."""
+
+    def __init__(self, pipeline, board):
+        self.pipeline = pipeline
+        self.board = board
+
+    def data_received(self, data):
+        self.pipeline.feed(self.board, data)
+
+
+class AsyncPipeline:
+    def __init__(self, predict_proba, classes, hop=10, use_motion_gate=True, binary=False, workers=2,
+                 default_address=(UDP_IP, UDP_PORT), routes=None, decider_args=None):
+        """
+        Args:
+            predict_proba: function mapping a (n, window_size * 6) array to (n, n_classes) probabilities
+            classes: class labels in the order of the probabilities
+            hop (int): predict every `hop` samples (inside motion segments if use_motion_gate)
+            use_motion_gate (bool): only predict while the board is moving (see segmentation.py)
+            binary (bool): send binary events instead of plain keys (see decision.py)
+            workers (int): threads that run the model
+            default_address (tuple): UDP target for boards without an explicit route
+            routes (dict): board name -> (ip, port)
+            decider_args (dict): GestureDecider arguments, e.g. {"threshold": 0.7}
+        """
+        self.predict_proba = predict_proba
+        self.classes = classes
+        self.hop = hop
+        self.use_motion_gate = use_motion_gate
+        self.executor = ThreadPoolExecutor(workers)
+        self.default_address = default_address
+        self.routes = routes or {}
+        self.decider_args = decider_args or {}
+        self.sender = UdpSender(binary)
+        self.boards = {}
+        self.started = time.monotonic()
+        # the loop only keeps weak references to tasks, so running ones are kept here until they are done
+        self.tasks = set()
+
+    def board(self, name, address=None):
+        board = self.boards.get(name)
+        if board is None:
+            address = address or self.routes.get(name, self.default_address)
+            board = Board(name, address, self.classes, self.hop, self.use_motion_gate, self.decider_args)
+            self.boards[name] = board
+            print(f"New board '{name}' -> {address[0]}:{address[1]}")
+        return board
+
+    def feed(self, board, data):
+        """Split raw serial bytes into lines and push every complete sample."""
+        lines = (board.partial + data).split(b"\n")
+        board.partial = lines.pop()
+        for line in lines:
+            values = parse_line(line)
+            if values is not None:
+                self.push(board, values)
+
+    def push(self, board, values):
+        if not board.due(values):
+            return
+        if board.busy:
+            board.skipped += 1
+            return
+        board.busy = True
+        # copy the window: the buffer keeps changing while the model runs in another thread
+        window = board.buffer.view().reshape(1, -1).copy()
+        self.spawn(self.predict(board, window))
+
+    def spawn(self, coroutine):
+        """Run a coroutine as a task that is kept alive until it is done, and report its error."""
+        task = asyncio.get_running_loop().create_task(coroutine)
+        self.tasks.add(task)
+        task.add_done_callback(self.task_done)
+        return task
+
+    def task_done(self, task):
+        self.tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            print(f"Error in {task.get_coro().__name__}:", task.exception())
+
+    async def predict(self, board, window):
+        try:
+            probabilities = await asyncio.get_running_loop().run_in_executor(self.executor, self.predict_proba, window)
+        except Exception as e:
+            print(f"Error predicting for {board.name}:", e)
+            return
+        finally:
+            board.busy = False
+        board.predictions += 1
+        prediction = board.decider.update(probabilities[0])
+        if prediction is None or prediction not in prediction_to_key:
+            return
+        board.events += 1
+        print(f"{board.name}: {prediction}")
+        self.sender.send(prediction_to_key[prediction], board.address)
+
+    async def read_serial(self, port, baudrate=9600, address=None):
+        board = self.board(port, address)
+        loop = asyncio.get_running_loop()
+        if serial_asyncio is not None:
+            await serial_asyncio.create_serial_connection(loop, lambda: SerialLines(self, board), port, baudrate)
+            return
+
+        if os.name == "posix":
+            # non-blocking reads whenever the port's file descriptor becomes readable
+            ser = serial.Serial(port, baudrate, timeout=0)
+
+            def on_readable():
+                try:
+                    data = ser.read(ser.in_waiting or 1)
+                except serial.SerialException as e:
+                    print(f"Error reading {port}:", e)
+                    loop.remove_reader(ser.fileno())
+                    return
+                self.feed(board, data)
+            loop.add_reader(ser.fileno(), on_readable)
+            return
+
+        # Windows' event loop can't watch serial handles: block in a worker thread instead
+        ser = serial.Serial(port, baudrate, timeout=0.1)
+        while True:
+            data = await loop.run_in_executor(None, lambda: ser.read(max(ser.in_waiting, 1)))
+            if data:
+                self.feed(board, data)
+
+    def metrics(self):
+        uptime = time.monotonic() - self.started
+        lines = [f"uptime {uptime:.0f} s, {len(self.boards)} boards"]
+        for board in self.boards.values():
+            lines.append(f"{board.name}: {board.samples / uptime:.1f} samples/s, {board.predictions} predictions, "
+                         f"{board.skipped} skipped (model busy), {board.events} events")
+        return "\n".join(lines) + "\n"
+
+    async def serve_metrics(self, reader, writer):
+        writer.write(self.metrics().encode("utf-8"))
+        await writer.drain()
+        writer.close()
+
+    async def run(self, serial_ports=(), udp_port=None, baudrate=9600, metrics_port=None):
+        loop = asyncio.get_running_loop()
+        await loop.create_datagram_endpoint(lambda: self.sender, family=socket.AF_INET)
+        for port, address in serial_ports:
+            self.spawn(self.read_serial(port, baudrate, address))
+        if udp_port is not None:
+            await loop.create_datagram_endpoint(lambda: UdpSamples(self), local_addr=("0.0.0.0", udp_port))
+            print(f"Listening for UDP producers on port {udp_port}")
+        if metrics_port is not None:
+            await asyncio.start_server(self.serve_metrics, "127.0.0.1", metrics_port)
+            print(f"Metrics on tcp://127.0.0.1:{metrics_port}")
+        await asyncio.Event().wait()  # run until interrupted
+
+
+def parse_address(text):
+    ip, _, port = text.rpartition(':')
+    return (ip or UDP_IP, int(port))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Live gesture recognition for many boards on one asyncio event loop.")
+    parser.add_argument("--model", default="example_models/rf_b_l_o_r_u.pkl")
+    parser.add_argument("--label-encoder", default=None, help="label encoder pickle, only for keras models")
+    parser.add_argument("--serial", action="append", default=[], metavar="PORT[@IP:PORT]",
+                        help="serial port to read, optionally with its own UDP target (repeatable)")
+    parser.add_argument("--baudrate", type=int, default=9600)
+    parser.add_argument("--udp-listen", type=int, default=None, help="port to receive samples from UDP producers")
+    parser.add_argument("--route", action="append", default=[], metavar="ID=IP:PORT",
+                        help="UDP target for a board id from a UDP producer (repeatable)")
+    parser.add_argument("--metrics-port", type=int, default=None, help="TCP port that answers with per-board metrics")
+    parser.add_argument("--hop", type=int, default=10)
+    parser.add_argument("--no-motion-gate", action="store_true", help="predict every --hop samples, even at rest")
+    parser.add_argument("--binary", action="store_true", help="send binary events (see decision.py)")
+    parser.add_argument("--workers", type=int, default=2, help="threads that run the model")
+    args = parser.parse_args()
+
+    serial_ports = []
+    for spec in args.serial:
+        port, _, address = spec.partition('@')
+        serial_ports.append((port, parse_address(address) if address else None))
+    routes = {}
+    for spec in args.route:
+        name, _, address = spec.partition('=')
+        routes[name] = parse_address(address)
+
+    print("loading model")
+    predict_proba, classes = load_probabilistic_classifier(args.model, args.label_encoder)
+    pipeline = AsyncPipeline(predict_proba, classes, hop=args.hop, use_motion_gate=not args.no_motion_gate,
+                             binary=args.binary, workers=args.workers, routes=routes)
+    try:
+        asyncio.run(pipeline.run(serial_ports, args.udp_listen, args.baudrate, args.metrics_port))
+    except KeyboardInterrupt:
+        pass
@@ -5,6 +5,11 @@ import pickle
 import time
 import keras
 import socket
+from features import StreamingFeatures
+from segmentation import MotionGate
+from decision import GestureDecider, EventSender
+from latency import LatencyRecorder
+from resampling import StreamResampler
 
 # You might need to change this (you can find it by looking at the port in the Arduino IDE)
 # ARDUINO_PORT = '/dev/cu.usbmodem1401'
@@ -28,6 +33,17 @@ buffer = deque(maxlen=window_size)
 for _ in range(buffer.maxlen):
     buffer.append(np.zeros(6))
 
+# Set to True for models trained on the compact feature vector (features.window_features)
+# instead of the raw window. The features are then updated incrementally with every sample.
+use_features = False
+extractor = StreamingFeatures(window_size)
+
+# Only run the model while the hand is moving: a gyro-magnitude gate with hysteresis
+# (see segmentation.py) predicts every 10 samples inside a motion segment and skips idle periods.
+# Set to False to predict on every 10th sample regardless of motion.
+use_motion_gate = True
+gate = MotionGate(hop=10)
+
 # change to your model path
 model_path = 'example_models/b_l_o_r_u.keras'
 label_encoder_path = 'example_models/label_encoder_b_l_o_r_u.pkl'
@@ -48,31 +64,81 @@ with open(model_path, 'rb') as f:
 with open(label_encoder_path, 'rb') as f:
     label_encoder = pickle.load(f)
 
+# Debounce predictions before sending keys (see decision.py): average the predicted
+# probabilities over the last 2 predictions, require 60% confidence (per-class overrides in
+# class_thresholds) and ignore everything for 0.5 s after a key. Set to False to send a key for
+# every prediction.
+use_decider = True
+decider = GestureDecider(label_encoder.classes_, window=2, mode="mean", threshold=0.6, class_thresholds={}, refractory=0.5)
+# Set binary=True to send compact events with a sequence number and timestamp instead of the
+# plain key; UI.pde then drops duplicates and prints the end-to-end latency.
+sender = EventSender(sock, (UDP_IP, UDP_PORT), binary=False)
+
+# Set to True for models trained with `python train.py data --rate <Hz>`: samples are then
+# retimed with a clock model and interpolated onto a uniform grid at that rate (see resampling.py),
+# so every window covers the same time as in training, whatever rate the board sends at.
+use_resampling = False
+resampler = StreamResampler(rate=70)
+
+# Set enabled=True to time every stage from serial read to UDP send (see latency.py) and print
+# p50/p95/p99 per stage every 5 seconds (or pass path="latency.txt" to write them to a file).
+latency = LatencyRecorder(enabled=False, report_every=5.0)
+
 print("loaded everything")
 count = 0
 while True:
     try:
-        line = ser.readline().decode('utf-8').strip()
+        latency.maybe_report()
+        t = latency.now()
+        raw_line = ser.readline()
+        t = sample_time = latency.stage("serial read", t)
+        line = raw_line.decode('utf-8').strip()
         values = np.array(line.split(',')).astype(np.float32)
         values[:3] = values[:3] / 8
         values[3:] = values[3:] / 4000
-        buffer.append(list(values))
-        count += 1
-
-        # predict with the rf model
-        if count % 10 == 0:
-            raw_prediction = np.argmax(model.predict(np.array(buffer, dtype=np.float32).reshape(1, window_size * 6), verbose=0))
-            prediction = label_encoder.inverse_transform([raw_prediction])
-            # time.sleep(1500 / 1000 / 100)
-            if prediction[0] == 'o':
-                continue
+        t = latency.stage("parse", t)
+        if use_resampling:
+            samples = resampler.push(values, time.time())
+        else:
+            samples = [values]
+        for values in samples:
+            buffer.append(list(values))
+            if use_features:
+                extractor.update(values)
+            latency.stage("buffer append", t)
+            count += 1
+            if gate.update(values) == "start":
+                decider.reset()
+
+            # predict with the rf model
+            if use_motion_gate:
+                run_model = gate.should_predict()
             else:
-                print(f"Prediction: {prediction[0]}")
-                # convert to key
-                key = prediction_to_key[prediction[0]]
+                run_model = count % 10 == 0
+            if run_model:
+                t = latency.now()
+                if use_features:
+                    model_input = extractor.features().reshape(1, -1)
+                else:
+                    model_input = np.array(buffer, dtype=np.float32).reshape(1, window_size * 6)
+                probabilities = model.predict(model_input, verbose=0)[0]
+                if use_decider:
+                    prediction = decider.update(probabilities)
+                else:
+                    prediction = label_encoder.inverse_transform([np.argmax(probabilities)])[0]
+                t = latency.stage("predict", t)
+                # time.sleep(1500 / 1000 / 100)
+                if prediction is None or prediction == 'o':
+                    continue
+                else:
+                    print(f"Prediction: {prediction}")
+                    # convert to key
+                    key = prediction_to_key[prediction]
 
-                # send key over udp
-                sock.sendto(key.encode("utf-8"), (UDP_IP, UDP_PORT))
+                    # send key over udp
+                    sender.send(key)
+                    latency.stage("send", t)
+                    latency.stage("sample to send", sample_time)
 
     except Exception as e:
         print(e)
@@ -0,0 +1,125 @@
+import argparse
+import time
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+from stream_utils import num_channels, channel_names
+
+# Binary recording format used by collect.py (RECORD_FORMAT = "bin").
+#
+# A 64 byte header followed by fixed-width little-endian records:
+#   header: magic b"CMIS-IMU", uint16 version, uint16 channels, uint32 record size, zero padding
+#   record: float64 timestamp (time.time()), then one float32 per channel
+# The records can be memory mapped directly (open_recording), and convert to and from the CSV
+# schema collect.py writes ("acc_x,...,gyro_z,timestamp"), so the notebooks keep working:
+#
+#   python recording.py data/<run>            # write a .csv next to every .bin
+#   python recording.py data/<run> --to-bin   # write a .bin next to every .csv
+
+MAGIC = b"CMIS-IMU"
+VERSION = 1
+HEADER_SIZE = 64
+header_dtype = np.dtype([('magic', 'S8'), ('version', '<u2'), ('channels', '<u2'), ('record_size', '<u4')])
+
+
+def record_dtype(channels=num_channels):
+    return np.dtype([('timestamp', '<f8'), ('values', '<f4', (channels,))])
+
+
+def write_header(f, channels=num_channels):
+    header = np.zeros(1, dtype=header_dtype)
+    header[0] = (MAGIC, VERSION, channels, record_dtype(channels).itemsize)
+    f.write(header.tobytes().ljust(HEADER_SIZE, b"\0"))
+
+
+def read_header(path):
+    with open(path, 'rb') as f:
+        header = np.frombuffer(f.read(header_dtype.itemsize), dtype=header_dtype)
+    if len(header) == 0 or header[0]['magic'] != MAGIC:
+        raise ValueError(f"{path} is not a binary gesture recording")
+    if header[0]['version'] != VERSION:
+        raise ValueError(f"{path} has unsupported version {header[0]['version']}")
+    return int(header[0]['channels'])
+
+
+def open_recording(path, mode='r'):
+    """
+    Memory map a binary recording as a structured array with fields 'timestamp' (n,) and 'values' (n, channels).
+    A record cut off by a crash at the end of the file is ignored.
+    """
+    dtype = record_dtype(read_header(path))
+    n = (Path(path).stat().st_size - HEADER_SIZE) // dtype.itemsize
+    if n == 0:
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode=mode, offset=HEADER_SIZE, shape=(n,))
+
+
+class BinaryRecorder:
+    """
+    Buffered writer for one recording. write() only copies the sample into a preallocated
+    block; full blocks are written to disk, and the file is flushed every `flush_interval` seconds.
+    """
+
+    def __init__(self, path, channels=num_channels, block_size=256, flush_interval=1.0):
+        self.path = path
+        self.file = open(path, 'wb')
+        write_header(self.file, channels)
+        self.block = np.zeros(block_size, dtype=record_dtype(channels))
+        self.pending = 0
+        self.flush_interval = flush_interval
+        self.last_flush = time.monotonic()
+
+    def write(self, values, timestamp):
+        record = self.block[self.pending]
+        record['timestamp'] = timestamp
+        record['values'] = values
+        self.pending += 1
+        if self.pending == len(self.block):
+            self.file.write(self.block.tobytes())
+            self.pending = 0
+        if time.monotonic() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        if self.pending:
+            self.file.write(self.block[:self.pending].tobytes())
+            self.pending = 0
+        self.file.flush()
+        self.last_flush = time.monotonic()
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+
+def bin_to_csv(bin_path, csv_path):
+    records = open_recording(bin_path)
+    df = pd.DataFrame(np.asarray(records['values']), columns=channel_names[:records['values'].shape[1]])
+    df['timestamp'] = records['timestamp']
+    df.to_csv(csv_path, index=False)
+
+
+def csv_to_bin(csv_path, bin_path):
+    df = pd.read_csv(csv_path, float_precision='round_trip')
+    values = df[channel_names].to_numpy(dtype=np.float32)
+    records = np.zeros(len(df), dtype=record_dtype(values.shape[1]))
+    records['timestamp'] = df['timestamp'].to_numpy(dtype=np.float64)
+    records['values'] = values
+    with open(bin_path, 'wb') as f:
+        write_header(f, values.shape[1])
+        f.write(records.tobytes())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert gesture recordings between the binary and CSV formats.")
+    parser.add_argument("paths", nargs="+", help="recording files or run folders")
+    parser.add_argument("--to-bin", action="store_true", help="convert CSV to binary (default: binary to CSV)")
+    args = parser.parse_args()
+
+    source, target = (".csv", ".bin") if args.to_bin else (".bin", ".csv")
+    for path in map(Path, args.paths):
+        for f in (sorted(path.glob(f"*{source}")) if path.is_dir() else [path]):
+            out = f.with_suffix(target)
+            (csv_to_bin if args.to_bin else bin_to_csv)(f, out)
+            print(f"{f} -> {out}")
@@ -0,0 +1,191 @@
+import numpy as np
+
+from stream_utils import num_channels
+
+# Uniform sample timing for recorded and live data.
+#
+# collect.py and the live scripts stamp every sample when it arrives over serial. USB buffering
+# and the OS scheduler make those arrival times jittery (samples arrive in bursts), and the
+# Arduino's clock runs at a slightly different speed than the computer's. The classifiers assume
+# that 50 samples always cover the same stretch of time, so:
+#
+#   ClockModel      - fits arrival time = offset + period * sample number over the recent past
+#                     (exponentially forgetting old samples, so slow clock drift is followed).
+#                     The fitted line gives jitter-free timestamps and the true device rate.
+#   Resampler       - linearly interpolates samples with corrected timestamps onto a uniform
+#                     grid at a fixed rate, one block at a time.
+#   StreamResampler - both together, fed one sample (live) or a block of samples (recordings)
+#                     at a time. resample_recording() runs it over a whole recording in blocks,
+#                     so training data goes through the same clock model and interpolation as live data.
+#
+# When the data is resampled to the rate a model was trained at, the device can run at a
+# different rate (e.g. a higher baud rate) without retraining.
+
+
+class ClockModel:
+    def __init__(self, memory=1000, max_gap=0.25):
+        """
+        Args:
+            memory (float): number of samples after which an old sample's weight has dropped to 1/e
+            max_gap (float): seconds without samples after which the fit starts over (device reset, unplugged)
+        """
+        self.decay = np.exp(-1 / memory)
+        self.max_gap = max_gap
+        self.reset()
+
+    def reset(self):
+        self.t0 = None           # arrival time of the first sample, all times are relative to it
+        self.count = 0           # samples seen since the last reset
+        self.last_arrival = None
+        # exponentially weighted sums for the least-squares line through (sample number, time)
+        self.sums = np.zeros(5)  # w, w*n, w*t, w*n*n, w*n*t
+
+    def fit(self):
+        """(offset, period) of the current fit, or None with fewer than two samples."""
+        w, wn, wt, wnn, wnt = self.sums
+        denominator = w * wnn - wn * wn
+        if self.count < 2 or denominator <= 0:
+            return None
+        period = (w * wnt - wn * wt) / denominator
+        return (wt - period * wn) / w, period
+
+    @property
+    def rate(self):
+        """Estimated device sample rate in Hz (None until there are two samples)."""
+        fit = self.fit()
+        return None if fit is None or fit[1] <= 0 else 1 / fit[1]
+
+    def update(self, arrivals):
+        """
+        Add the arrival times (seconds) of consecutive samples and return their corrected timestamps.
+        A gap longer than max_gap restarts the fit; returns float64 array of the same length.
+        """
+        arrivals = np.atleast_1d(np.asarray(arrivals, dtype=np.float64))
+        if len(arrivals) == 0:
+            return arrivals
+        previous = arrivals[:1] if self.last_arrival is None else [self.last_arrival]
+        gaps = np.flatnonzero(np.diff(arrivals, prepend=previous) > self.max_gap)
+        if len(gaps):
+            # fit the part before the gap with the old model, then start over
+            before = self.update(arrivals[:gaps[0]]) if gaps[0] else np.zeros(0)
+            self.reset()
+            return np.concatenate([before, self.update(arrivals[gaps[0]:])])
+
+        if self.t0 is None:
+            self.t0 = arrivals[0]
+        m = len(arrivals)
+        n = self.count + np.arange(m, dtype=np.float64)
+        t = arrivals - self.t0
+        weights = self.decay ** np.arange(m - 1, -1, -1)
+        self.sums *= self.decay ** m
+        self.sums += [weights.sum(), weights @ n, weights @ t, weights @ (n * n), weights @ (n * t)]
+        self.count += m
+        self.last_arrival = arrivals[-1]
+
+        fit = self.fit()
+        if fit is None or fit[1] <= 0:
+            return arrivals.copy()
+        offset, period = fit
+        return self.t0 + offset + period * n
+
+
+class Resampler:
+    def __init__(self, rate, channels=num_channels):
+        """
+        Args:
+            rate (float): output sample rate in Hz
+        """
+        self.period = 1 / rate
+        self.channels = channels
+        self.reset()
+
+    def reset(self):
+        self.last_time = None    # the last input sample, kept to interpolate across block borders
+        self.last_values = None
+        self.next_time = None    # time of the next output sample
+
+    def process(self, times, values):
+        """
+        Take input samples (times increasing) and return the output samples that fall between the
+        previous block and the end of this one, as a (k, channels) float32 array (k may be 0).
+        """
+        values = np.asarray(values, dtype=np.float32).reshape(-1, self.channels)
+        if len(values) == 0:
+            return values
+        if self.last_time is not None:
+            times = np.concatenate([[self.last_time], times])
+            values = np.concatenate([self.last_values[None], values])
+        if self.next_time is None:
+            self.next_time = times[0]
+        self.last_time, self.last_values = times[-1], values[-1].copy()
+
+        k = int(np.floor((times[-1] - self.next_time) / self.period)) + 1
+        if k <= 0:
+            return np.zeros((0, self.channels), dtype=np.float32)
+        grid = self.next_time + self.period * np.arange(k)
+        self.next_time = grid[-1] + self.period
+
+        # linear interpolation of all channels at once
+        right = np.searchsorted(times, grid, side='right').clip(1, len(times) - 1)
+        left = right - 1
+        span = times[right] - times[left]
+        fraction = np.divide(grid - times[left], span, out=np.zeros_like(grid), where=span > 0)
+        fraction = fraction.clip(0, 1).astype(np.float32)[:, None]
+        return values[left] * (1 - fraction) + values[right] * fraction
+
+
+class StreamResampler:
+    def __init__(self, rate, block_size=1, memory=1000, max_gap=0.25, channels=num_channels):
+        """
+        Args:
+            rate (float): output sample rate in Hz (the rate the model was trained at)
+            block_size (int): samples collected before they are corrected and resampled together.
+                Larger blocks are cheaper per sample but delay every sample by up to block_size - 1 samples.
+            memory, max_gap: see ClockModel
+        """
+        self.clock = ClockModel(memory, max_gap)
+        self.resampler = Resampler(rate, channels)
+        self.block_size = block_size
+        self.pending_values = np.zeros((block_size, channels), dtype=np.float32)
+        self.pending_arrivals = np.zeros(block_size)
+        self.pending = 0
+
+    @property
+    def rate(self):
+        """Estimated device sample rate in Hz."""
+        return self.clock.rate
+
+    def push(self, values, arrival):
+        """Add one sample and its arrival time; returns the uniform output samples that are ready (k, channels)."""
+        self.pending_values[self.pending] = values
+        self.pending_arrivals[self.pending] = arrival
+        self.pending += 1
+        if self.pending < self.block_size:
+            return self.pending_values[:0]
+        self.pending = 0
+        return self.push_block(self.pending_values, self.pending_arrivals)
+
+    def push_block(self, values, arrivals):
+        """Add consecutive samples (n, channels) with their arrival times (n,) at once."""
+        arrivals = np.asarray(arrivals, dtype=np.float64)
+        previous = arrivals[:1] if self.clock.last_arrival is None else [self.clock.last_arrival]
+        gaps = np.flatnonzero(np.diff(arrivals, prepend=previous) > self.clock.max_gap)
+        # don't interpolate across gaps: resample every part on its own (the clock restarts too)
+        bounds = [0, *gaps, len(arrivals)]
+        out = []
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            if start > 0 or len(gaps) and gaps[0] == 0:
+                self.resampler.reset()
+            if end > start:
+                out.append(self.resampler.process(self.clock.update(arrivals[start:end]), values[start:end]))
+        return out[0] if len(out) == 1 else np.concatenate(out)
+
+
+def resample_recording(values, timestamps, rate, block_size=256, **kwargs):
+    """Resample a whole recording (n, channels) with arrival timestamps (n,) to `rate` Hz."""
+    stream = StreamResampler(rate, block_size, channels=values.shape[1], **kwargs)
+    blocks = [stream.push_block(values[i:i + block_size], timestamps[i:i + block_size])
+              for i in range(0, len(values), block_size)]
+    if not blocks:
+        return np.zeros((0, values.shape[1]), dtype=np.float32)
+    return np.concatenate(blocks)
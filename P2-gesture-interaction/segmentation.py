@@ -0,0 +1,81 @@
+import numpy as np
+
+# Cheap motion gate in front of the classifier.
+# Most of the time the hand is at rest and the classifier would only predict the idle class 'o'.
+# The gate tracks the (smoothed) gyroscope magnitude and switches on above `on_threshold` and
+# off again once it has stayed below `off_threshold` for `hold` samples (hysteresis), so the
+# model only runs while a gesture can be happening. update() reports segment boundaries.
+
+
+class MotionGate:
+    def __init__(self, on_threshold=0.06, off_threshold=0.03, hold=8, smoothing=0.3, hop=10):
+        """
+        Args:
+            on_threshold (float): smoothed gyro magnitude that starts a segment (normalized units, see parse_line)
+            off_threshold (float): magnitude the signal has to stay below to end a segment
+            hold (int): samples below off_threshold before a segment ends
+            smoothing (float): weight of the newest sample in the exponential moving average
+            hop (int): while a segment is active, should_predict() is true every `hop` samples
+        """
+        self.on_threshold = on_threshold
+        self.off_threshold = off_threshold
+        self.hold = hold
+        self.smoothing = smoothing
+        self.hop = hop
+
+        self.level = 0.0
+        self.active = False
+        self.quiet = 0  # consecutive samples below off_threshold while active
+        self.since_start = 0  # samples since the current segment started
+
+    def update(self, values):
+        """
+        Feed one normalized sample (6 values). Returns "start" or "end" at segment boundaries, else None.
+        """
+        gx, gy, gz = values[3], values[4], values[5]
+        magnitude = (gx * gx + gy * gy + gz * gz) ** 0.5
+        self.level += self.smoothing * (magnitude - self.level)
+
+        if not self.active:
+            if self.level > self.on_threshold:
+                self.active = True
+                self.quiet = 0
+                self.since_start = 0
+                return "start"
+            return None
+
+        self.since_start += 1
+        if self.level < self.off_threshold:
+            self.quiet += 1
+            if self.quiet >= self.hold:
+                self.active = False
+                return "end"
+        else:
+            self.quiet = 0
+        return None
+
+    def should_predict(self):
+        """True when the classifier should run on the current window."""
+        return self.active and self.since_start % self.hop == 0
+
+
+def gate_segments(values, **gate_args):
+    """
+    Run a MotionGate over a recorded (n, 6) array.
+    Returns the (start, end) sample indices of every segment and a boolean mask of samples where
+    should_predict() was true.
+    """
+    gate = MotionGate(**gate_args)
+    segments = []
+    predict_mask = np.zeros(len(values), dtype=bool)
+    start = None
+    for i, sample in enumerate(values):
+        event = gate.update(sample)
+        if event == "start":
+            start = i
+        elif event == "end":
+            segments.append((start, i))
+        predict_mask[i] = gate.should_predict()
+    if gate.active:
+        segments.append((start, len(values)))
+    return segments, predict_mask
@@ -0,0 +1,114 @@
+import pickle
+import numpy as np
+
+from compact_forest import CompactForest
+
+# Shared helpers for the live scripts, the inference server and the tools built on them.
+# Values are normalized exactly like collect.py does, so recorded data and live data match.
+
+window_size = 50
+num_channels = 6
+channel_names = ["acc_x", "acc_y", "acc_z", "gyro_x", "gyro_y", "gyro_z"]
+
+## there are more commands that you can use
+### (L, R, A, D, W, S, +, -) ###
+prediction_to_key = {
+    'b': 'S',
+    'r': 'D',
+    'l': 'A',
+    'u': 'W',
+}
+
+
+def parse_line(line):
+    """
+    Convert one line from the Arduino ("ax,ay,az,gx,gy,gz") into normalized float32 values.
+    Accepts bytes or str. Returns None for empty or malformed lines.
+    """
+    if isinstance(line, bytes):
+        line = line.decode('utf-8', errors='ignore')
+    line = line.strip()
+    if not line:
+        return None
+    try:
+        values = np.array(line.split(','), dtype=np.float32)
+    except ValueError:
+        return None
+    if len(values) != num_channels:
+        return None
+    values[:3] = values[:3] / 8
+    values[3:] = values[3:] / 4000
+    return values
+
+
+class RingBuffer:
+    """
+    Preallocated ring buffer of (capacity, channels) float32 samples.
+
+    Every sample is written twice (at i and i + capacity), so the last `capacity`
+    samples are always one contiguous slice and view() never copies.
+    """
+
+    def __init__(self, capacity=window_size, channels=num_channels):
+        self.capacity = capacity
+        self.channels = channels
+        self.data = np.zeros((2 * capacity, channels), dtype=np.float32)
+        self.index = 0  # position the next sample is written to
+        self.count = 0  # total number of samples ever appended
+
+    def append(self, values):
+        i = self.index
+        self.data[i] = values
+        self.data[i + self.capacity] = values
+        self.index = (i + 1) % self.capacity
+        self.count += 1
+
+    def view(self):
+        """Oldest-to-newest samples as a (capacity, channels) view into the buffer (no copy)."""
+        return self.data[self.index:self.index + self.capacity]
+
+    def latest(self, n):
+        """The newest n samples (n <= capacity) as a view."""
+        end = self.index + self.capacity
+        return self.data[end - n:end]
+
+
+def load_classifier(model_path, label_encoder_path=None):
+    """
+    Load a pickled sklearn model, a compact forest (.npz, see compact_forest.py), or a pickled
+    keras model plus its label encoder, and return a function mapping a (n, window_size * 6)
+    array to an array of labels.
+    """
+    if str(model_path).endswith('.npz'):
+        return CompactForest.load(model_path).predict
+
+    with open(model_path, 'rb') as f:
+        model = pickle.load(f)
+    if label_encoder_path is None:
+        return model.predict
+
+    with open(label_encoder_path, 'rb') as f:
+        label_encoder = pickle.load(f)
+
+    def predict(X):
+        return label_encoder.inverse_transform(np.argmax(model.predict(X, verbose=0), axis=1))
+    return predict
+
+
+def load_probabilistic_classifier(model_path, label_encoder_path=None):
+    """
+    Like load_classifier, but returns (predict_proba, classes): a function mapping a
+    (n, window_size * 6) array to (n, n_classes) probabilities, and the class labels in that order.
+    """
+    if str(model_path).endswith('.npz'):
+        model = CompactForest.load(model_path)
+        return model.predict_proba, model.classes_
+
+    with open(model_path, 'rb') as f:
+        model = pickle.load(f)
+    if label_encoder_path is None:
+        return model.predict_proba, model.classes_
+
+    with open(label_encoder_path, 'rb') as f:
+        label_encoder = pickle.load(f)
+    return (lambda X: model.predict(X, verbose=0)), label_encoder.classes_
@@ -0,0 +1,139 @@
+import argparse
+import pickle
+import time
+from pathlib import Path
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score, confusion_matrix
+from sklearn.model_selection import GroupKFold, StratifiedKFold, cross_validate, train_test_split
+from sklearn.preprocessing import LabelEncoder
+
+from augment import augment
+from dataset import load_dataset
+from features import window_features
+from stream_utils import window_size
+
+# Unattended version of train_sklearn.ipynb / train_keras.ipynb.
+# Loads every run under the given folders, cross-validates in parallel and saves the model in
+# the format live_sklearn.py / live_keras.py load.
+#
+#   python train.py data                                  # random forest on all runs in ./data
+#   python train.py data/1738726494-66512 --model keras
+#   python train.py data --features                       # train on features.window_features
+#   python train.py data --cache --augment 4              # cache windows, add 4 augmented copies
+#   python train.py data --rate 70                        # resample to a uniform 70 Hz first
+
+
+def prepare(X, y, copies, use_features):
+    """Add augmented copies (of the raw windows), then compute features if requested."""
+    if copies:
+        X, y = augment(X, y, copies)
+    if use_features:
+        X = window_features(X, window_size)
+    return X, y
+
+
+def train_random_forest(X, y, groups, folds, copies=0, use_features=False):
+    rf = RandomForestClassifier(n_estimators=100, random_state=42, class_weight='balanced', n_jobs=-1)
+
+    # windows overlap by 49 samples, so hold out whole runs when there are enough of them
+    if len(np.unique(groups)) >= folds:
+        cv = GroupKFold(n_splits=folds)
+    else:
+        cv = StratifiedKFold(n_splits=folds, shuffle=True, random_state=42)
+        groups = None
+    start = time.perf_counter()
+    if copies:
+        # only the training folds are augmented, the test folds stay real recordings
+        scores = []
+        for train, test in cv.split(X, y, groups):
+            rf.fit(*prepare(X[train], y[train], copies, use_features))
+            scores.append(rf.score(*prepare(X[test], y[test], 0, use_features)))
+        scores = np.array(scores)
+    else:
+        X_cv = prepare(X, y, 0, use_features)[0]
+        # the folds run in parallel, so each forest uses one core (not cores x cores threads)
+        scores = cross_validate(rf.set_params(n_jobs=1), X_cv, y, groups=groups, cv=cv, n_jobs=-1)['test_score']
+    print(f"{folds}-fold {type(cv).__name__} accuracy: {scores.mean():.4f} "
+          f"(+/- {scores.std():.4f}) in {time.perf_counter() - start:.1f}s")
+
+    start = time.perf_counter()
+    X, y = prepare(X, y, copies, use_features)
+    rf.set_params(n_jobs=-1).fit(X, y)
+    print(f"final fit on {len(X)} windows in {time.perf_counter() - start:.1f}s")
+    return rf
+
+
+def train_keras(X, y, batch_size=32, epochs=10, copies=0, use_features=False):
+    import keras
+
+    label_encoder = LabelEncoder()
+    y = label_encoder.fit_transform(y)
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    X_train, y_train = prepare(X_train, y_train, copies, use_features)
+    X_test, y_test = prepare(X_test, y_test, 0, use_features)
+
+    model = keras.Sequential([
+        keras.layers.Input(shape=(X_train.shape[1],)),
+        keras.layers.Dense(64, activation='relu'),
+        keras.layers.Dense(len(label_encoder.classes_), activation='softmax')
+    ])
+    model.compile(optimizer=keras.optimizers.Adam(learning_rate=3e-4), loss=keras.losses.SparseCategoricalCrossentropy(),
+                  metrics=[keras.metrics.SparseCategoricalAccuracy(name='accuracy')])
+    model.fit(X_train, y_train, batch_size=batch_size, epochs=epochs, validation_split=0.15, verbose=2,
+              callbacks=[keras.callbacks.EarlyStopping(monitor="val_loss", patience=2)])
+
+    y_pred = np.argmax(model.predict(X_test, verbose=0), axis=1)
+    print(f"test accuracy: {accuracy_score(y_test, y_pred):.4f}")
+    print(confusion_matrix(y_test, y_pred))
+    return model, label_encoder
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train a gesture classifier from recorded runs.")
+    parser.add_argument("data", nargs="+", help="run folders (data/<timestamp>) or folders containing runs")
+    parser.add_argument("--model", choices=["rf", "keras"], default="rf")
+    parser.add_argument("--features", action="store_true", help="train on features.window_features instead of raw windows")
+    parser.add_argument("--step", type=int, default=1, help="stride between windows")
+    parser.add_argument("--folds", type=int, default=5, help="cross-validation folds (random forest only)")
+    parser.add_argument("--epochs", type=int, default=10, help="training epochs (keras only)")
+    parser.add_argument("--cache", action="store_true", help="cache the windows of every run in a .npz next to the recordings")
+    parser.add_argument("--augment", type=int, default=0, metavar="COPIES",
+                        help="add this many augmented copies of the training windows (see augment.py)")
+    parser.add_argument("--rate", type=float, default=None,
+                        help="resample recordings to this rate in Hz (see resampling.py); use the same rate in the live script")
+    parser.add_argument("--out", default="models")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    X, y, groups = load_dataset(args.data, window_size, args.step, cache=args.cache, rate=args.rate)
+    classes = sorted(set(y.tolist()))
+    print(f"loaded {X.shape[0]} windows from {len(np.unique(groups))} runs, "
+          f"classes {classes}, in {time.perf_counter() - start:.1f}s")
+
+    # make the model name based on the gesture names, like the notebooks do
+    run_timestamp = str(time.time()).replace(".", "-")
+    model_name = '_'.join(classes) + "__" + run_timestamp
+    if args.features:
+        model_name = "feat_" + model_name
+    model_dir = Path(args.out)
+    model_dir.mkdir(parents=True, exist_ok=True)
+
+    if args.model == "rf":
+        rf = train_random_forest(X, y, groups, args.folds, args.augment, args.features)
+        model_path = model_dir / f'rf_{model_name}.pkl'
+        with open(model_path, 'wb') as f:
+            pickle.dump(rf, f)
+        print(f"saved {model_path}")
+    else:
+        model, label_encoder = train_keras(X, y, epochs=args.epochs, copies=args.augment, use_features=args.features)
+        model_path = model_dir / f'{model_name}.keras'
+        with open(model_path, 'wb') as f:
+            pickle.dump(model, f)
+        with open(model_dir / f'label_encoder_{model_name}.pkl', 'wb') as f:
+            pickle.dump(label_encoder, f)
+        print(f"saved {model_path} and label_encoder_{model_name}.pkl")
+    if args.features:
+        print("set use_features = True in the live script to use this model")
+    if args.rate:
+        print(f"set use_resampling = True and StreamResampler(rate={args.rate:g}) in the live script to use this model")
@@ -0,0 +1,57 @@
+import argparse
+import os
+import sys
+import time
+import numpy as np
+from scipy.stats import dirichlet
+
+# Add the parent directory to sys.path to find the dbn_helpers and world_space modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dbn_helpers.adaptive_transition import CRITERIA, AdaptiveTransition, certain_index
+from dbn_helpers.gaze_and_gesture_net import GazeAndGestureNet
+
+# Cost of the adaptive It CPT (dbn_helpers/adaptive_transition.py):
+#   criteria  - certain_index on N posteriors at once against one call per posterior
+#   switching - changing the It CPT of the NumPy engine: the old scale_cpd (a dirichlet.mean per row)
+#               plus update_cpt, against switching to a precomputed level
+#
+#   python benchmarks/benchmark_adaptive_transition.py --posteriors 10000
+
+
+def old_scale_cpd(cpd):
+    """scale_cpd as it used to be written"""
+    scaled = np.power(cpd, 3)
+    return np.array([dirichlet.mean(row) for row in scaled])
+
+
+def per_call(function, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        function()
+    return 1e6 * (time.perf_counter() - start) / repeats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--posteriors", type=int, default=10000, help="users (or time steps) to evaluate at once")
+    parser.add_argument("--repeats", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    posteriors = rng.dirichlet(np.full(9, 0.5), size=args.posteriors)
+    print(f"certainty criteria on {args.posteriors} posteriors of I, us per posterior:")
+    print(f"{'criterion':>14} {'one call each':>14} {'vectorized':>11} {'certain':>8}")
+    for criterion in CRITERIA:
+        loop = per_call(lambda: [certain_index(p, criterion) for p in posteriors[:1000]], 1) / 1000
+        vectorized = per_call(lambda: certain_index(posteriors, criterion), 10) / args.posteriors
+        share = (certain_index(posteriors, criterion) != -1).mean()
+        print(f"{criterion:>14} {loop:>14.2f} {vectorized:>11.3f} {share:>8.0%}")
+
+    net = GazeAndGestureNet()
+    adaptive = AdaptiveTransition(net.originalIt_cpd)
+    print("switching the It CPT of the NumPy engine, us:")
+    print(f"  scale_cpd + update_cpt: {per_call(lambda: net.numpy_filter.set_cpt('It', old_scale_cpd(net.originalIt_cpd)), args.repeats):8.1f}")
+    print(f"  precomputed level:      {per_call(lambda: net.numpy_filter.set_cpt('It', adaptive.levels[3]), args.repeats):8.1f}")
+    users = AdaptiveTransition(net.originalIt_cpd, n_users=args.posteriors)
+    print(f"  levels of {args.posteriors} users:  {per_call(lambda: users.update(posteriors), args.repeats):8.1f}")
@@ -0,0 +1,89 @@
+import os
+
+# one BLAS thread per process, so "one core" means one core
+for variable in ["OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"]:
+    os.environ.setdefault(variable, "1")
+
+import argparse
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+# Add the parent directory to sys.path to find the dbn_helpers and world_space modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dbn_helpers.batched_filter import BatchedFilter
+from dbn_helpers.gaze_and_gesture_net import GazeAndGestureNet
+from world_space.curr_world_space import world
+
+# Time per frame to filter N concurrent users:
+#   per-user nets - one GazeAndGestureNet per user, NumPy engine (only up to --loop-max users)
+#   batched       - one BatchedFilter step for all users, on one core
+#   pool          - the users split into one BatchedFilter per process, every process steps its share
+#
+#   python benchmarks/benchmark_batched_filter.py --users 1 10 100 1000 10000 --workers 4
+
+
+def random_observations(frames, n_users, seed):
+    """(frames, N) gaze and gesture indices: a random gaze target, and no gesture in 97% of the frames"""
+    rng = np.random.default_rng(seed)
+    gaze = rng.integers(len(world.interactables), size=(frames, n_users))
+    gesture = np.where(rng.random((frames, n_users)) < 0.03, rng.integers(len(world.gestures), size=(frames, n_users)),
+                       world.gesture_index["None"])
+    return gaze, gesture
+
+
+def run_batched(cpts, n_users, frames, seed=0):
+    """seconds to filter frames steps of n_users with one BatchedFilter"""
+    gaze, gesture = random_observations(frames, n_users, seed)
+    batched_filter = BatchedFilter(cpts, n_users)
+    start = time.perf_counter()
+    for t in range(frames):
+        batched_filter.step(gaze[t], gesture[t])
+    return time.perf_counter() - start
+
+
+def run_nets(n_users, frames, seed=0):
+    gaze, gesture = random_observations(frames, n_users, seed)
+    nets = [GazeAndGestureNet(history_horizon=frames) for _ in range(n_users)]
+    start = time.perf_counter()
+    for t in range(frames):
+        for user, net in enumerate(nets):
+            net.update({f"t{t}": {f"GO{t}": int(gaze[t, user]), f"HO{t}": int(gesture[t, user])}},
+                       visualize_inference=False, inference_engine="NumPy")
+    return time.perf_counter() - start
+
+
+def run_pool(pool, workers, cpts, n_users, frames):
+    shards = [len(shard) for shard in np.array_split(np.arange(n_users), workers) if len(shard)]
+    start = time.perf_counter()
+    futures = [pool.submit(run_batched, cpts, shard, frames, seed) for seed, shard in enumerate(shards)]
+    for future in futures:
+        future.result()
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, nargs="+", default=[1, 10, 100, 1000, 10000])
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--loop-max", type=int, default=100, help="most users to time one GazeAndGestureNet each for")
+    args = parser.parse_args()
+
+    cpts = GazeAndGestureNet().numpy_filter.cpts
+    with ProcessPoolExecutor(args.workers) as pool:
+        # start the processes and import everything before timing
+        list(pool.map(run_batched, [cpts] * args.workers, [1] * args.workers, [1] * args.workers))
+
+        print(f"ms per frame for all users, {args.frames} frames, {args.workers} processes in the pool")
+        print(f"{'users':>7} {'per-user nets':>14} {'batched':>9} {'pool':>9} {'batched users/s':>16} {'pool users/s':>13}")
+        for n_users in args.users:
+            nets = "-"
+            if n_users <= args.loop_max:
+                nets = f"{1000 * run_nets(n_users, args.frames) / args.frames:.2f}"
+            batched = run_batched(cpts, n_users, args.frames) / args.frames
+            pooled = run_pool(pool, args.workers, cpts, n_users, args.frames) / args.frames
+            print(f"{n_users:>7} {nets:>14} {1000 * batched:>9.2f} {1000 * pooled:>9.2f} "
+                  f"{n_users / batched:>16,.0f} {n_users / pooled:>13,.0f}")
@@ -0,0 +1,106 @@
+import argparse
+import os
+import sys
+import time
+import numpy as np
+from scipy.stats import dirichlet
+
+# Add the parent directory to sys.path to find the dbn_helpers and world_space modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dbn_helpers import gaze_and_gesture_cpds as cpds
+from dbn_helpers.gaze_and_gesture_cpds import chain_rule_cpd, match_alpha
+from world_space.loader import compatibility_matrix
+
+# Time to build the GAt and HAt cpds for growing world spaces: the previous nested loops with
+# scipy's dirichlet.mean per row against the broadcast version in dbn_helpers/gaze_and_gesture_cpds.py.
+# Every synthetic device offers 3 interactions; the loops are only timed up to --loop-max devices.
+#
+#   python benchmarks/benchmark_cpds.py --sizes 4 16 64 256
+
+
+def synthetic_world_space(n_interactables, n_gestures, rng):
+    interactables = [f"device {j}" for j in range(n_interactables)] + ["None"]
+    interactions_dict = {device: [f"{device} action {k}" for k in range(3)] for device in interactables[:-1]}
+    interactions_dict["None"] = ["None"]
+    interactions = [i for device in interactables for i in interactions_dict[device]]
+    gestures = [f"gesture {k}" for k in range(n_gestures)] + ["None"]
+    # like gpt_elicitation: every interaction fits one or two gestures
+    elicitation = np.zeros((len(interactions), len(gestures)))
+    elicitation[np.arange(len(interactions)), rng.integers(len(gestures), size=len(interactions))] = 7
+    return interactions, interactables, interactions_dict, gestures, elicitation
+
+
+def loop_cpd_GAt(interactions, interactables, interactions_dict, w_given_GA0=3, w_given_It=5):
+    """cpd_GAt as it used to be written"""
+    alpha_GAt_It = np.ones((len(interactions), len(interactables)))
+    alpha_GAt_GA0_It = np.ones((len(interactions), len(interactables), len(interactables)))
+    alpha_GAt_GA0 = np.ones((len(interactables), len(interactables)))
+    np.fill_diagonal(alpha_GAt_GA0, w_given_GA0)
+    for i in range(len(interactions)):
+        for j in range(len(interactables)):
+            if interactions[i] in interactions_dict[interactables[j]]:
+                alpha_GAt_It[i, j] = w_given_It
+    for i in range(len(interactions)):
+        for j in range(len(interactables)):
+            for k in range(len(interactables)):
+                alpha_GAt_GA0_It[i, j, k] = alpha_GAt_It[i, k] * alpha_GAt_GA0[k, j]
+    return np.apply_along_axis(lambda row: dirichlet.mean(row).flatten(), 2, alpha_GAt_GA0_It)
+
+
+def loop_cpd_HAt(gestures, elicitation, w_given_HA0=5, w_given_It=5, w_no_gesture_detected=100):
+    """cpd_HAt as it used to be written"""
+    alpha_HAt_It = np.where(elicitation == 0, 1, w_given_It)
+    alpha_HAt_It[-1, -1] = w_no_gesture_detected
+    alpha_HAt_HA0 = np.ones((len(gestures), len(gestures)))
+    np.fill_diagonal(alpha_HAt_HA0, w_given_HA0)
+    alpha_HAt_HA0_It = np.ones((len(elicitation), len(gestures), len(gestures)))
+    for i in range(len(elicitation)):
+        for j in range(len(gestures)):
+            for k in range(len(gestures)):
+                alpha_HAt_HA0_It[i, j, k] = alpha_HAt_It[i, k] * alpha_HAt_HA0[k, j]
+    return np.apply_along_axis(lambda row: dirichlet.mean(row).flatten(), 2, alpha_HAt_HA0_It)
+
+
+def broadcast_cpds(interactions, interactables, interactions_dict, gestures, elicitation):
+    alpha_GAt_It = np.where(compatibility_matrix(interactions, interactables, interactions_dict).toarray(), 5, 1.0)
+    cpd_GAt = chain_rule_cpd(alpha_GAt_It, match_alpha(len(interactables), 3))
+    alpha_HAt_It = np.where(elicitation == 0, 1, 5).astype(float)
+    alpha_HAt_It[-1, -1] = 100
+    cpd_HAt = chain_rule_cpd(alpha_HAt_It, match_alpha(len(gestures), 5))
+    return cpd_GAt, cpd_HAt
+
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return 1000 * (time.perf_counter() - start), result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[4, 16, 64, 128, 256],
+                        help="numbers of interactables (and gestures)")
+    parser.add_argument("--loop-max", type=int, default=64, help="largest size to time the loops at")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'devices':>8} {'|I|':>6} {'|GA|':>6} {'|HA|':>6} {'loops ms':>10} {'broadcast ms':>13} {'max diff':>9}")
+    for size in args.sizes:
+        world = synthetic_world_space(size, size, rng)
+        interactions, interactables, interactions_dict, gestures, elicitation = world
+        broadcast_time, (cpd_GAt, cpd_HAt) = timed(lambda: broadcast_cpds(*world))
+        loops, difference = "-", "-"
+        if size <= args.loop_max:
+            loop_time, (loop_GAt, loop_HAt) = timed(lambda: (loop_cpd_GAt(interactions, interactables, interactions_dict),
+                                                            loop_cpd_HAt(gestures, elicitation)))
+            loops = f"{loop_time:.1f}"
+            difference = f"{max(np.abs(loop_GAt - cpd_GAt).max(), np.abs(loop_HAt - cpd_HAt).max()):.0e}"
+        print(f"{size:>8} {len(interactions):>6} {len(interactables):>6} {len(gestures):>6} {loops:>10} "
+              f"{broadcast_time:>13.1f} {difference:>9}")
+
+    # the cpds of the current world space are memoized per weights
+    cpds.clear_cpd_cache()
+    first, _ = timed(lambda: cpds.cpd_GAt(w_given_GA0=3, w_given_It=5))
+    repeated, _ = timed(lambda: [cpds.cpd_GAt(w_given_GA0=3, w_given_It=5) for _ in range(1000)])
+    print(f"cpd_GAt of the current world space: first call {1000 * first:.0f} us, memoized {repeated:.1f} us")
@@ -0,0 +1,126 @@
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+import numpy as np
+
+# Add the parent directory to sys.path to find the dbn_helpers and world_space modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dbn_helpers.gaze_and_gesture_net import INFERENCE_ENGINES, GazeAndGestureNet
+from dbn_helpers.interaction_log import read_interaction_log
+from world_space import curr_world_space
+from benchmark_inference_worker import synthetic_world_space
+
+# Every inference engine of GazeAndGestureNet.update on the same evidence trace: a recorded interaction log
+# (--log) or simulated inputs for the default world space, and simulated inputs for synthetic world spaces with
+# more devices (--devices). For each engine: time per update, memory added at the peak (net and engine), and
+# the KL divergence of its posteriors (I1, GA1 and HA1 summed) from exact inference, averaged over the frames.
+# The posteriors are fed back as priors, so the error of the approximate engines accumulates over the trace,
+# as it does in the demo. Recommends the fastest engine with a mean KL divergence within --kl-budget.
+# Every engine runs in its own process, so the memory of one does not count against the next.
+#
+#   python benchmarks/benchmark_engines.py --frames 300 --devices 16 64 --kl-budget 1e-3 --max-time 0.005
+#   python benchmarks/benchmark_engines.py --log logs/interaction_log_<time>.txt
+
+TARGETS = ['I1', 'GA1', 'HA1']
+
+
+def simulated_trace(world, frames, seed=0):
+    """gaze and gesture label indices (-1 = not observed) that stay the same for a while"""
+    rng = np.random.default_rng(seed)
+    gaze, gesture = np.empty(frames, dtype=np.int16), np.empty(frames, dtype=np.int16)
+    none_gaze, none_gesture = world.interactable_index["None"], world.gesture_index["None"]
+    current = none_gaze
+    for t in range(frames):
+        if rng.random() < 0.05:
+            current = rng.integers(len(world.interactables))
+        gaze[t] = current
+        gesture[t] = rng.integers(len(world.gestures) - 1) if rng.random() < 0.03 else none_gesture
+    return gaze, gesture
+
+
+def memory_mb(field):
+    """VmRSS (resident memory) or VmHWM (its peak) of this process, Linux only"""
+    with open("/proc/self/status") as f:
+        return next(int(line.split()[1]) for line in f if line.startswith(field)) / 1024
+
+
+def run_engine(world, gaze, gesture, engine, approximation, results):
+    """filter the trace with one engine, put (seconds per update, MB added at the peak, posteriors) in results"""
+    resident = memory_mb("VmRSS")
+    net = GazeAndGestureNet(world_space=world, fast_path_tolerance=None, approximation=approximation)
+    posteriors = {name: np.empty((len(gaze), net.dbn.variable(name).domainSize())) for name in TARGETS}
+    seconds = 0.0
+    for t in range(len(gaze)):
+        evidence = {}
+        if gaze[t] >= 0:
+            evidence[f"GO{t}"] = int(gaze[t])
+        if gesture[t] >= 0:
+            evidence[f"HO{t}"] = int(gesture[t])
+        start = time.perf_counter()
+        result = net.update({f"t{t}": evidence}, visualize_inference=False, inference_engine=engine)
+        seconds += time.perf_counter() - start
+        for name in TARGETS:
+            posteriors[name][t] = result[name]
+    results.put((seconds / len(gaze), memory_mb("VmHWM") - resident, posteriors))
+
+
+def kl_divergence(exact, approximate):
+    """KL(exact || approximate) per frame, summed over the targets"""
+    kl = sum((exact[name] * (np.log(np.maximum(exact[name], 1e-300))
+                             - np.log(np.maximum(approximate[name], 1e-12)))).sum(axis=1) for name in TARGETS)
+    return np.maximum(kl, 0.0)  # rounding
+
+
+def compare(world, gaze, gesture, engines, approximation, kl_budget):
+    context = multiprocessing.get_context("fork")
+    measurements = {}
+    for engine in engines:
+        results = context.Queue()
+        process = context.Process(target=run_engine, args=(world, gaze, gesture, engine, approximation, results))
+        process.start()
+        measurements[engine] = results.get()
+        process.join()
+    # NumPy is exact and agrees with LazyPropagation (benchmark_numpy_engine.py)
+    exact = measurements["NumPy"][2] if "NumPy" in measurements else measurements["LazyPropagation"][2]
+    print(f"{'engine':>24} {'ms/update':>10} {'MB':>8} {'mean KL':>9} {'max KL':>9}")
+    within_budget = []
+    for engine, (seconds, memory, posteriors) in measurements.items():
+        kl = kl_divergence(exact, posteriors)
+        print(f"{engine:>24} {1e3 * seconds:>10.3f} {memory:>8.1f} {kl.mean():>9.1e} {kl.max():>9.1e}")
+        if kl.mean() <= kl_budget:
+            within_budget.append((seconds, engine))
+    if within_budget:
+        print(f"recommended: {min(within_budget)[1]} (fastest with a mean KL divergence <= {kl_budget:g})")
+    else:
+        print(f"no engine within a mean KL divergence of {kl_budget:g}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--frames", type=int, default=300, help="length of the simulated traces")
+    parser.add_argument("--log", help="interaction log to use as the trace for the default world space")
+    parser.add_argument("--devices", type=int, nargs="*", default=[16, 64], help="synthetic world spaces to add")
+    parser.add_argument("--engines", nargs="+", default=list(INFERENCE_ENGINES), choices=INFERENCE_ENGINES)
+    parser.add_argument("--kl-budget", type=float, default=1e-3)
+    parser.add_argument("--max-time", type=float, default=0.005, help="seconds per update for the approximate engines")
+    parser.add_argument("--epsilon", type=float, default=1e-3, help="stopping criterion of the approximate engines")
+    args = parser.parse_args()
+
+    approximation = {'max_time': args.max_time, 'epsilon': args.epsilon}
+    world = curr_world_space.world
+    if args.log:
+        _, gaze, gesture = read_interaction_log(args.log, world)
+        print(f"{args.log}: {len(gaze)} frames")
+    else:
+        gaze, gesture = simulated_trace(world, args.frames)
+        print(f"default world space, {args.frames} simulated frames")
+    compare(world, gaze, gesture, args.engines, approximation, args.kl_budget)
+
+    for n_devices in args.devices:
+        world = synthetic_world_space(n_devices)
+        gaze, gesture = simulated_trace(world, args.frames)
+        print(f"\n{n_devices} devices ({len(world.interactions)} interactions), {args.frames} simulated frames")
+        compare(world, gaze, gesture, args.engines, approximation, args.kl_budget)
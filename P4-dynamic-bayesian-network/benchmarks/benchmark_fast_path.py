@@ -0,0 +1,51 @@
+import argparse
+import os
+import sys
+import time
+import numpy as np
+
+# Add the parent directory to sys.path to find the dbn_helpers and world_space modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dbn_helpers.gaze_and_gesture_net import GazeAndGestureNet
+from benchmark_update import simulated_inputs
+
+# GazeAndGestureNet.update with and without the fast path for repeated evidence: share of frames served
+# from the stationary posterior, time per frame, and the largest difference to running inference every frame.
+#   busy - simulated_inputs, gaze and gesture change every few frames
+#   idle - the same, with 5 s (300 frames) of no gaze and no gesture after every second of input
+#
+#   python benchmarks/benchmark_fast_path.py --frames 3000 --tolerance 1e-9
+
+
+def idle_inputs(frames, seed=0, active=60, idle=300):
+    inputs = simulated_inputs(frames, seed)
+    for start in range(active, frames, active + idle):
+        inputs[start:start + idle] = [("None", "None")] * len(inputs[start:start + idle])
+    return inputs
+
+
+def run(inputs, engine, tolerance):
+    dbn = GazeAndGestureNet(fast_path_tolerance=tolerance)
+    posteriors = []
+    start = time.perf_counter()
+    for t, (gaze, gesture) in enumerate(inputs):
+        posteriors.append(dbn.update({f"t{t}": {f"GO{t}": gaze, f"HO{t}": gesture}},
+                                     visualize_inference=False, inference_engine=engine))
+    return time.perf_counter() - start, posteriors, dbn.fast_path_counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--frames", type=int, default=3000)
+    parser.add_argument("--tolerance", type=float, default=1e-9, help="fast_path_tolerance of GazeAndGestureNet")
+    args = parser.parse_args()
+
+    for name, inputs in [("busy", simulated_inputs(args.frames)), ("idle", idle_inputs(args.frames))]:
+        for engine in ["LazyPropagation", "NumPy"]:
+            seconds, exact, _ = run(inputs, engine, None)
+            fast_seconds, fast, counts = run(inputs, engine, args.tolerance)
+            difference = max(np.abs(a[k] - b[k]).max() for a, b in zip(exact, fast) for k in a)
+            print(f"{name:>5} {engine:>15}: {counts['stationary'] / len(inputs):4.0%} of frames from the fast path, "
+                  f"{1e6 * fast_seconds / len(inputs):5.0f} us/frame (always inference: {1e6 * seconds / len(inputs):5.0f} us), "
+                  f"max difference {difference:.0e}")
@@ -0,0 +1,93 @@
+import argparse
+import os
+import sys
+import time
+import numpy as np
+
+# Add the parent directory to sys.path to find the dbn_helpers and world_space modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dbn_helpers.gaze_and_gesture_net import GazeAndGestureNet
+from dbn_helpers.inference_worker import InferenceProcess, InferenceWorker
+from world_space.loader import WorldSpace
+
+# Frame times of a simulated 60 FPS UI loop when DBN inference runs inside the loop (as the demo used to)
+# against on an InferenceWorker thread and in an InferenceProcess. Larger world spaces make every inference
+# step slower; with the process the frame rate should not depend on it.
+#
+#   python benchmarks/benchmark_inference_worker.py --devices 4 32 64 --engine LazyPropagation
+
+
+def synthetic_world_space(n_interactables, n_gestures=5):
+    interactions_dict = {f"device {j}": [f"device {j} action {k}" for k in range(3)] for j in range(n_interactables)}
+    interactions_dict["None"] = ["None"]
+    gestures = [f"gesture {k}" for k in range(n_gestures)] + ["None"]
+    gpt_elicitation = {f"device {j} action {k}": [gestures[(j + k) % n_gestures]]
+                       for j in range(n_interactables) for k in range(3)}
+    gpt_elicitation["None"] = ["None"]
+    return WorldSpace(gestures, interactions_dict, gpt_elicitation=gpt_elicitation)
+
+
+def ui_loop(world, seconds, on_frame, fps=60):
+    """call on_frame(gaze, gesture) at most fps times per second, like pygame's clock.tick, return the frame times"""
+    rng = np.random.default_rng(0)
+    period = 1.0 / fps
+    frame_times = []
+    end = time.perf_counter() + seconds
+    last = time.perf_counter()
+    while last < end:
+        gaze = int(rng.integers(len(world.interactables)))
+        gesture = int(rng.integers(len(world.gestures))) if rng.random() < 0.03 else len(world.gestures) - 1
+        on_frame(gaze, gesture)
+        # clock.tick(fps)
+        remaining = period - (time.perf_counter() - last)
+        if remaining > 0:
+            time.sleep(remaining)
+        now = time.perf_counter()
+        frame_times.append(now - last)
+        last = now
+    return np.array(frame_times)
+
+
+def summary(frame_times):
+    return (f"{1 / frame_times.mean():6.1f} FPS, frame time p50 {1000 * np.median(frame_times):5.1f} ms, "
+            f"p99 {1000 * np.percentile(frame_times, 99):6.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--devices", type=int, nargs="+", default=[4, 32, 64], help="numbers of interactables")
+    parser.add_argument("--engine", default="LazyPropagation", help="inference engine of GazeAndGestureNet.update")
+    parser.add_argument("--rate", type=float, default=60, help="inference worker steps per second")
+    parser.add_argument("--seconds", type=float, default=3, help="duration of each run")
+    args = parser.parse_args()
+
+    for n_interactables in args.devices:
+        world = synthetic_world_space(n_interactables)
+        print(f"{n_interactables} devices, {len(world.interactions)} interactions, {args.engine}:")
+
+        dbn = GazeAndGestureNet(world_space=world)
+        t = 0
+
+        def synchronous(gaze, gesture):
+            global t
+            dbn.update({f"t{t}": {f"GO{t}": gaze, f"HO{t}": gesture}}, visualize_inference=False,
+                       inference_engine=args.engine)
+            t += 1
+
+        print(f"  inference {'in the UI loop:':<16} {summary(ui_loop(world, args.seconds, synchronous))}, {t} steps")
+
+        workers = {"thread": InferenceWorker(GazeAndGestureNet(world_space=world), rate=args.rate,
+                                             inference_engine=args.engine),
+                   "process": InferenceProcess(world, rate=args.rate, inference_engine=args.engine)}
+        for name, worker in workers.items():
+            worker.start()
+
+            def on_worker(gaze, gesture):
+                worker.submit(gaze, gesture)
+                worker.latest()
+
+            frame_times = ui_loop(world, args.seconds, on_worker)
+            worker.stop()
+            print(f"  inference {'on a ' + name + ':':<16} {summary(frame_times)}, {worker.t} steps "
+                  f"({worker.t / args.seconds:.0f}/s, {worker.skipped_steps} skipped, last step {1000 * worker.step_time:.1f} ms)")
@@ -0,0 +1,92 @@
+import argparse
+import os
+import sys
+import time
+import numpy as np
+import pyAgrum as gum
+
+# Add the parent directory to sys.path to find the dbn_helpers and world_space modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dbn_helpers.gaze_and_gesture_net import GazeAndGestureNet
+from dbn_helpers.numpy_filter import NumpyFilter
+from dbn_helpers import gaze_and_gesture_dynamic_cpds as dynamic_cpds
+from benchmark_update import simulated_inputs
+
+# Checks the numpy forward filter (dbn_helpers/numpy_filter.py) against pyAgrum's LazyPropagation
+# on random soft evidence, with the original and a scaled It CPT, then times one filtering step
+# of each and a full GazeAndGestureNet.update with either engine.
+#
+#   python benchmarks/benchmark_numpy_engine.py
+
+TARGETS = ['I1', 'GA1', 'HA1']
+
+
+def random_evidence(net, rng):
+    evidence = {}
+    for name in ['I0', 'GA0', 'HA0']:
+        evidence[name] = rng.dirichlet(np.ones(net.dbn.variable(name).domainSize()))
+    for name in ['GO1', 'HO1']:
+        labels = net.dbn.variable(name).labels()
+        evidence[name] = labels[rng.integers(len(labels))]
+    return evidence
+
+
+def max_difference(net, numpy_filter, rng, trials):
+    ie = gum.LazyPropagation(net.dbn)
+    ie.setTargets(set(TARGETS))
+    worst = 0.0
+    for _ in range(trials):
+        evidence = random_evidence(net, rng)
+        ie.setEvidence(evidence)
+        ie.makeInference()
+        result = numpy_filter.infer(evidence)
+        worst = max(worst, max(np.abs(ie.posterior(name).toarray() - result[name]).max() for name in TARGETS))
+    return worst
+
+
+def per_step(function, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        function()
+    return 1e6 * (time.perf_counter() - start) / repeats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--trials", type=int, default=200, help="random evidence sets to validate on")
+    parser.add_argument("--repeats", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    net = GazeAndGestureNet()
+    numpy_filter = NumpyFilter(net.twoTBN)
+    print(f"max |numpy - LazyPropagation|: {max_difference(net, numpy_filter, rng, args.trials):.1e}")
+    net.update_cpt('It', dynamic_cpds.scale_cpd(net.twoTBN.cpt('It')[:]))
+    print(f"  with the scaled It CPT:     {max_difference(net, net.numpy_filter, rng, args.trials):.1e}")
+    net.update_cpt('It', net.originalIt_cpd)
+
+    evidence = random_evidence(net, rng)
+    ie = gum.LazyPropagation(net.dbn)
+    ie.setTargets(set(TARGETS))
+
+    def lazy_step():
+        ie.updateEvidence(evidence)
+        ie.makeInference()
+        return [ie.posterior(name).toarray() for name in TARGETS]
+
+    print("one filtering step:")
+    print(f"  LazyPropagation: {per_step(lazy_step, args.repeats):8.1f} us")
+    print(f"  NumPy:           {per_step(lambda: numpy_filter.infer(evidence), args.repeats):8.1f} us")
+
+    inputs = simulated_inputs(args.repeats // 4)
+    print("one GazeAndGestureNet.update:")
+    for engine in ["LazyPropagation", "NumPy"]:
+        net = GazeAndGestureNet()
+
+        def run():
+            for t, (gaze, gesture) in enumerate(inputs):
+                net.update({f"t{t}": {f"GO{t}": gaze, f"HO{t}": gesture}}, visualize_inference=False,
+                           inference_engine=engine)
+        duration = per_step(run, 1) / len(inputs)
+        print(f"  {engine + ':':<16} {duration:8.1f} us")
@@ -0,0 +1,95 @@
+import argparse
+import os
+import sys
+import time
+import numpy as np
+
+# Add the parent directory to sys.path to find the dbn_helpers and world_space modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dbn_helpers.gaze_and_gesture_net import GazeAndGestureNet
+from dbn_helpers.particle_filter import ParticleFilter
+from benchmark_inference_worker import synthetic_world_space
+from benchmark_engines import simulated_trace
+
+# Accuracy against particles against step time of the particle filter (dbn_helpers/particle_filter.py) on
+# synthetic world spaces with growing numbers of devices, with a fixed number of particles and with the number
+# adapted to --target-ess. The reference is the same filter with every interaction enumerated (exact):
+#   step KL - KL divergence from the exact step on the same beliefs, summed over I1, GA1 and HA1
+#   run KL  - KL divergence from an exact run over the whole trace, where the errors accumulate
+# Up to --dense-max devices the dense NumPy engine of GazeAndGestureNet is timed too; beyond that its
+# P(GAt|GA0,It) tables (|I|*|GA|^2 entries) get too large.
+#
+#   python benchmarks/benchmark_particle_filter.py --devices 16 64 256 512 --particles 16 64 256 1024
+
+TARGETS = ['I1', 'GA1', 'HA1']
+
+
+def kl_divergence(exact, approximate):
+    return max(sum((exact[name] * (np.log(np.maximum(exact[name], 1e-300))
+                                   - np.log(np.maximum(approximate[name], 1e-12)))).sum() for name in TARGETS), 0.0)
+
+
+def evidence_of(beliefs, gaze, gesture):
+    evidence = dict(zip(['I0', 'GA0', 'HA0'], beliefs))
+    if gaze >= 0:
+        evidence['GO1'] = int(gaze)
+    if gesture >= 0:
+        evidence['HO1'] = int(gesture)
+    return evidence
+
+
+def run(world, gaze, gesture, **particle_args):
+    """seconds per step, mean particles, mean step KL and run KL of a particle filter, against an exact one"""
+    particles = ParticleFilter(world, seed=0, **particle_args)
+    exact_step = ParticleFilter(world, n_particles=None)
+    exact_run = ParticleFilter(world, n_particles=None)
+    seconds, n_particles, step_kl, run_kl = 0.0, [], [], []
+    for t in range(len(gaze)):
+        beliefs = (particles.belief_I, particles.belief_GA, particles.belief_HA)
+        n_particles.append(particles.n_particles or len(world.interactions))
+        start = time.perf_counter()
+        posteriors = particles.step(gaze[t], gesture[t])
+        seconds += time.perf_counter() - start
+        # the exact step on the same beliefs, with the It CPT the particle filter used
+        exact_step.cpts['It'] = particles.cpts['It']
+        step_kl.append(kl_divergence(exact_step.infer(evidence_of(beliefs, gaze[t], gesture[t])), posteriors))
+        run_kl.append(kl_divergence(exact_run.step(gaze[t], gesture[t]), posteriors))
+    return seconds / len(gaze), np.mean(n_particles), np.mean(step_kl), np.mean(run_kl)
+
+
+def dense_seconds(world, gaze, gesture):
+    net = GazeAndGestureNet(world_space=world, fast_path_tolerance=None)
+    start = time.perf_counter()
+    for t in range(len(gaze)):
+        evidence = {}
+        if gaze[t] >= 0:
+            evidence[f"GO{t}"] = int(gaze[t])
+        if gesture[t] >= 0:
+            evidence[f"HO{t}"] = int(gesture[t])
+        net.update({f"t{t}": evidence}, visualize_inference=False, inference_engine="NumPy")
+    return (time.perf_counter() - start) / len(gaze)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--devices", type=int, nargs="+", default=[16, 64, 256, 512])
+    parser.add_argument("--particles", type=int, nargs="+", default=[16, 64, 256, 1024])
+    parser.add_argument("--target-ess", type=float, default=128)
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--dense-max", type=int, default=64, help="largest world space to run the dense NumPy engine on")
+    args = parser.parse_args()
+
+    for n_devices in args.devices:
+        world = synthetic_world_space(n_devices)
+        gaze, gesture = simulated_trace(world, args.frames)
+        print(f"\n{n_devices} devices ({len(world.interactions)} interactions), {args.frames} frames")
+        print(f"{'filter':>22} {'particles':>9} {'ms/step':>8} {'step KL':>9} {'run KL':>9}")
+        rows = [(f"{n} particles", {'n_particles': n, 'target_ess': None}) for n in args.particles]
+        rows.append((f"ESS {args.target_ess:g}", {'target_ess': args.target_ess}))
+        rows.append(("exact (enumerated)", {'n_particles': None}))
+        for name, particle_args in rows:
+            seconds, n_particles, step_kl, run_kl = run(world, gaze, gesture, **particle_args)
+            print(f"{name:>22} {n_particles:>9.0f} {1e3 * seconds:>8.3f} {step_kl:>9.1e} {run_kl:>9.1e}")
+        if n_devices <= args.dense_max:
+            print(f"{'dense NumPy engine':>22} {'':>9} {1e3 * dense_seconds(world, gaze, gesture):>8.3f}")
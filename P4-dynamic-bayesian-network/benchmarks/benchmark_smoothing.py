@@ -0,0 +1,49 @@
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+import numpy as np
+
+# Add the parent directory to sys.path to find the dbn_helpers and world_space modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dbn_helpers.gaze_and_gesture_net import GazeAndGestureNet
+from dbn_helpers.smoothing import JointModel, fixed_lag_smooth, smooth
+from benchmark_batched_filter import random_observations
+
+# Time per frame and peak memory (besides the output arrays) of forward-backward smoothing over sessions
+# of growing length, with checkpointed chunks and in one chunk (all forward messages in memory), and of
+# fixed-lag smoothing.
+#
+#   python benchmarks/benchmark_smoothing.py --frames 1000 10000 100000 --chunk-size 4096 --lag 30
+
+
+def measure(function):
+    tracemalloc.start()
+    start = time.perf_counter()
+    function()
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds, peak / 2 ** 20
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--frames", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--chunk-size", type=int, default=4096)
+    parser.add_argument("--lag", type=int, default=30)
+    args = parser.parse_args()
+
+    model = JointModel(GazeAndGestureNet().numpy_filter.cpts)
+    print(f"{model.n_states} joint states")
+    print(f"{'frames':>8} {'method':>22} {'us/frame':>9} {'peak MB':>8}")
+    for n_frames in args.frames:
+        gaze, gesture = (observations[:, 0] for observations in random_observations(n_frames, 1, seed=0))
+        out = {name: np.empty((n_frames, size)) for name, size in zip(['I1', 'GA1', 'HA1'], model.shape)}
+        for name, function in [(f"chunks of {args.chunk_size}", lambda: smooth(model, gaze, gesture, args.chunk_size, out)),
+                               ("one chunk", lambda: smooth(model, gaze, gesture, n_frames, out)),
+                               (f"fixed lag {args.lag}", lambda: fixed_lag_smooth(model, gaze, gesture, args.lag, out))]:
+            seconds, peak = measure(function)
+            print(f"{n_frames:>8} {name:>22} {1e6 * seconds / n_frames:>9.1f} {peak:>8.1f}")
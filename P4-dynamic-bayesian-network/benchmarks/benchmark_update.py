@@ -0,0 +1,90 @@
+import argparse
+import os
+import sys
+import time
+import numpy as np
+import pyAgrum as gum
+import pyAgrum.lib.dynamicBN as gdyn
+
+# Add the parent directory to sys.path to find the dbn_helpers and world_space modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dbn_helpers.gaze_and_gesture_net import GazeAndGestureNet
+from world_space.curr_world_space import interactables, gestures
+
+# Updates per second of the gaze and gesture filter:
+#   rebuilt    - unroll the 2-TBN and build a new LazyPropagation every frame (what update() used to do)
+#   persistent - one unrolled network and inference engine, only the evidence changes
+#   update()   - GazeAndGestureNet.update, i.e. persistent plus the dynamic CPD logic
+#
+#   python benchmarks/benchmark_update.py --frames 500
+
+TARGETS = ['I1', 'GA1', 'HA1']
+
+
+def simulated_inputs(frames, seed=0):
+    """Gaze and gesture observations that stay the same for a while, like mouse hover and the webcam do."""
+    rng = np.random.default_rng(seed)
+    inputs = []
+    gaze, gesture = "None", "None"
+    for _ in range(frames):
+        if rng.random() < 0.05:
+            gaze = rng.choice(interactables)
+        gesture = rng.choice(gestures[:-1]) if rng.random() < 0.03 else "None"
+        inputs.append((str(gaze), str(gesture)))
+    return inputs
+
+
+def run_filter(twoTBN, inputs, persistent):
+    """Filter the inputs with pyAgrum, returns the posteriors of every frame."""
+    if persistent:
+        dbn = gdyn.unroll2TBN(twoTBN, 2)
+        ie = gum.LazyPropagation(dbn)
+        ie.setTargets(set(TARGETS))
+    priors = {name: twoTBN.cpt(f"{name}0").toarray() for name in ['I', 'GA', 'HA']}
+    history = []
+    for gaze, gesture in inputs:
+        if not persistent:
+            dbn = gdyn.unroll2TBN(twoTBN, 2)
+            ie = gum.LazyPropagation(dbn)
+            ie.setTargets(set(TARGETS))
+        evidence = {'GO1': gaze, 'HO1': gesture, 'I0': priors['I'], 'GA0': priors['GA'], 'HA0': priors['HA']}
+        if persistent:
+            ie.updateEvidence(evidence)
+        else:
+            ie.setEvidence(evidence)
+        ie.makeInference()
+        posteriors = {name: ie.posterior(name).toarray() for name in TARGETS}
+        priors = {name[:-1]: posterior for name, posterior in posteriors.items()}
+        history.append(posteriors)
+    return history
+
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return time.perf_counter() - start, result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--frames", type=int, default=300)
+    args = parser.parse_args()
+
+    inputs = simulated_inputs(args.frames)
+    net = GazeAndGestureNet()
+
+    rebuilt_time, rebuilt = timed(lambda: run_filter(net.twoTBN, inputs, persistent=False))
+    persistent_time, persistent = timed(lambda: run_filter(net.twoTBN, inputs, persistent=True))
+
+    def run_update():
+        for t, (gaze, gesture) in enumerate(inputs):
+            net.update({f"t{t}": {f"GO{t}": gaze, f"HO{t}": gesture}}, visualize_inference=False)
+    update_time, _ = timed(run_update)
+
+    difference = max(np.abs(a[name] - b[name]).max() for a, b in zip(rebuilt, persistent) for name in TARGETS)
+    print(f"{args.frames} frames")
+    print(f"  rebuilt every frame: {args.frames / rebuilt_time:8.0f} updates/s")
+    print(f"  persistent engine:   {args.frames / persistent_time:8.0f} updates/s "
+          f"({rebuilt_time / persistent_time:.1f}x), max posterior difference {difference:.1e}")
+    print(f"  update():            {args.frames / update_time:8.0f} updates/s")
@@ -0,0 +1,133 @@
+import argparse
+import os
+import sys
+import numpy as np
+import pyAgrum as gum
+import pyAgrum.lib.dynamicBN as gdyn
+
+# Add the parent directory to sys.path to find the dbn_helpers and world_space modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dbn_helpers.batched_filter import BatchedFilter
+from dbn_helpers.gaze_and_gesture_net import GazeAndGestureNet
+from dbn_helpers.smoothing import JointModel, fixed_lag_smooth, smooth
+from world_space import curr_world_space
+from benchmark_engines import simulated_trace
+from benchmark_inference_worker import synthetic_world_space
+
+# Checks that the fast filters give the posteriors of exact inference on short traces, and exits with an
+# error if one differs by more than --tolerance (largest absolute difference over I1, GA1 and HA1):
+#   NumPy, Sparse    - the engines of GazeAndGestureNet.update against LazyPropagation, step by step
+#   batched          - BatchedFilter against one GazeAndGestureNet per user, with the default and the cycling It CPT
+#   smoothing        - smooth() and fixed_lag_smooth() against LazyPropagation on the 2-TBN unrolled over the
+#                      whole trace, with all (or the next lag) observations as evidence
+#
+#   python benchmarks/check_equivalence.py --frames 60 --devices 16
+
+TARGETS = ['I1', 'GA1', 'HA1']
+
+
+def evidence_at(t, gaze, gesture):
+    evidence = {}
+    if gaze >= 0:
+        evidence[f"GO{t}"] = int(gaze)
+    if gesture >= 0:
+        evidence[f"HO{t}"] = int(gesture)
+    return {f"t{t}": evidence}
+
+
+def max_difference(a, b):
+    return max(np.abs(np.asarray(a[name]) - np.asarray(b[name])).max() for name in TARGETS)
+
+
+def check_engines(world, gaze, gesture, engines=("NumPy", "Sparse")):
+    """largest difference of each engine from LazyPropagation, every net fed its own posteriors"""
+    nets = {engine: GazeAndGestureNet(world_space=world, fast_path_tolerance=None)
+            for engine in ("LazyPropagation",) + tuple(engines)}
+    differences = dict.fromkeys(engines, 0.0)
+    for t in range(len(gaze)):
+        results = {engine: net.update(evidence_at(t, gaze[t], gesture[t]), visualize_inference=False,
+                                      inference_engine=engine) for engine, net in nets.items()}
+        for engine in engines:
+            differences[engine] = max(differences[engine], max_difference(results[engine], results["LazyPropagation"]))
+    return differences
+
+
+def check_batched(world, n_users, frames, cycle_It, seed=0):
+    """largest difference of a BatchedFilter from one GazeAndGestureNet (LazyPropagation) per user"""
+    traces = [simulated_trace(world, frames, seed + user) for user in range(n_users)]
+    gaze = np.stack([trace[0] for trace in traces], axis=1)
+    gesture = np.stack([trace[1] for trace in traces], axis=1)
+    nets = [GazeAndGestureNet(world_space=world, fast_path_tolerance=None, cycle_It=cycle_It) for _ in range(n_users)]
+    batched = BatchedFilter(nets[0].numpy_filter.cpts, n_users, cycle_It=cycle_It)
+    difference = 0.0
+    for t in range(frames):
+        posteriors = batched.step(gaze[t], gesture[t])
+        for user, net in enumerate(nets):
+            result = net.update(evidence_at(t, gaze[t, user], gesture[t, user]), visualize_inference=False)
+            difference = max(difference, max_difference(result, {name: posteriors[name][user] for name in TARGETS}))
+    return difference
+
+
+def unrolled_posteriors(twoTBN, gaze, gesture, last_observed):
+    """posteriors of every frame t (slice t + 1) given the observations of the frames up to last_observed[t]"""
+    frames = len(gaze)
+    dbn = gdyn.unroll2TBN(twoTBN, frames + 1)
+    ie = gum.LazyPropagation(dbn)
+    out = {name: np.empty((frames, dbn.variable(f"{name[:-1]}0").domainSize())) for name in TARGETS}
+    for t in range(frames):
+        evidence = {}
+        # frame s is observed on slice s + 1, slice 0 is the prior, like in JointModel
+        for s in range(min(last_observed[t], frames - 1) + 1):
+            evidence.update(evidence_at(s + 1, gaze[s], gesture[s])[f"t{s + 1}"])
+        ie.setEvidence(evidence)
+        ie.makeInference()
+        for name in TARGETS:
+            out[name][t] = ie.posterior(f"{name[:-1]}{t + 1}").toarray()
+    return out
+
+
+def check_smoothing(world, gaze, gesture, lag):
+    """largest difference of smooth() and fixed_lag_smooth() from LazyPropagation on the unrolled 2-TBN"""
+    net = GazeAndGestureNet(world_space=world)
+    model = JointModel(net.numpy_filter.cpts)
+    frames = len(gaze)
+    whole = unrolled_posteriors(net.twoTBN, gaze, gesture, [frames - 1] * frames)
+    lagged = unrolled_posteriors(net.twoTBN, gaze, gesture, [t + lag for t in range(frames)])
+    return {"forward-backward": max_difference(smooth(model, gaze, gesture, chunk_size=max(frames // 3, 1)), whole),
+            f"fixed lag {lag}": max_difference(fixed_lag_smooth(model, gaze, gesture, lag), lagged)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--frames", type=int, default=60, help="length of the traces of the filters")
+    parser.add_argument("--smoothing-frames", type=int, default=12, help="length of the trace for smoothing")
+    parser.add_argument("--users", type=int, default=3)
+    parser.add_argument("--lag", type=int, default=3)
+    parser.add_argument("--devices", type=int, nargs="*", default=[16], help="synthetic world spaces to add")
+    parser.add_argument("--tolerance", type=float, default=1e-12)
+    args = parser.parse_args()
+
+    worlds = [("default world space", curr_world_space.world)]
+    worlds += [(f"{n} devices", synthetic_world_space(n)) for n in args.devices]
+    checks = []
+    for world_name, world in worlds:
+        gaze, gesture = simulated_trace(world, args.frames)
+        for engine, difference in check_engines(world, gaze, gesture).items():
+            checks.append((world_name, f"{engine} vs LazyPropagation", difference))
+        for cycle_It in (False, True):
+            difference = check_batched(world, args.users, args.frames, cycle_It)
+            checks.append((world_name, f"batched vs nets{' (cycle_It)' if cycle_It else ''}", difference))
+        gaze, gesture = simulated_trace(world, args.smoothing_frames)
+        for method, difference in check_smoothing(world, gaze, gesture, args.lag).items():
+            checks.append((world_name, f"{method} vs LazyPropagation", difference))
+
+    print(f"{'world space':>20} {'check':>36} {'max difference':>15}")
+    failed = 0
+    for world_name, check, difference in checks:
+        ok = difference <= args.tolerance
+        failed += not ok
+        print(f"{world_name:>20} {check:>36} {difference:>15.1e} {'' if ok else 'FAILED'}")
+    if failed:
+        sys.exit(f"{failed} checks above the tolerance {args.tolerance:g}")
+    print(f"all checks within {args.tolerance:g}")
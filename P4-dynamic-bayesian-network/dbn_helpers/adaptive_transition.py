@@ -0,0 +1,132 @@
+import numpy as np
+from scipy.special import entr, rel_entr
+
+# adaptive transition model of the interaction I
+#
+# the first time the posterior of I is certain, the It CPT is sharpened once: every row raised to the power 3
+# and renormalized (the mean of a dirichlet with these weights). every later certainty episode sharpens the
+# original CPT once again, so the CPT stays at that level and changes once per session, which keeps the
+# repeated-evidence fast path of GazeAndGestureNet working.
+#
+# with cycle=True it is sharpened one level per time step instead, while the posterior stays certain about the
+# same interaction. after max_level sharpenings in a row it goes back to the original CPT and starts over, and
+# it also goes back when the posterior becomes certain about a different interaction. the CPT then changes on
+# every certain step, so those steps always run inference.
+#
+# the CPT is only ever one of max_level + 1 matrices, so they are computed once and the state of every user is
+# just a level index. the certainty criteria work on posteriors with any leading axes, e.g. (users, |I|) or
+# (time, |I|), and return the index of the certain interaction, or -1
+
+CRITERIA = ('threshold', 'z_score', 'kl_divergence', 'entropy', 'gini')
+
+
+def _first(mask):
+    """index of the first True along the last axis, -1 where there is none"""
+    return np.where(mask.any(axis=-1), mask.argmax(axis=-1), -1)
+
+
+def gini_coefficient(p):
+    """Gini coefficient along the last axis: 0 for a uniform distribution, (n - 1) / n when one value has all the mass"""
+    n = p.shape[-1]
+    ranks = np.arange(1, n + 1)
+    return 2 * (np.sort(p, axis=-1) * ranks).sum(axis=-1) / (n * p.sum(axis=-1)) - (n + 1) / n
+
+
+def certain_index(posteriors, approach='z_score', threshold=0.2, kl_threshold=0.4, entropy_threshold=1.0,
+                  gini_threshold=0.3, z_threshold=2.0):
+    """
+    Args:
+        posteriors (array): (..., |I|) posteriors of I
+        approach (str): one of CRITERIA
+            threshold     - first interaction above threshold times the mean probability
+            z_score       - first interaction with a z-score above z_threshold (typically z > 2 is considered an outlier)
+            kl_divergence - KL divergence from the uniform distribution above kl_threshold (nats)
+            entropy       - entropy below entropy_threshold (bits)
+            gini          - Gini coefficient above gini_threshold
+            for the last three the certain interaction is the most likely one
+    Returns:
+        (...) int array, index of the certain interaction or -1
+    """
+    p = np.asarray(posteriors, dtype=np.float64)
+    if approach == 'threshold':
+        return _first(p > threshold * p.mean(axis=-1, keepdims=True))
+    if approach == 'z_score':
+        with np.errstate(divide='ignore', invalid='ignore'):
+            z_scores = (p - p.mean(axis=-1, keepdims=True)) / p.std(axis=-1, keepdims=True)
+        return _first(z_scores > z_threshold)
+
+    if approach == 'kl_divergence':
+        certain = rel_entr(p, 1.0 / p.shape[-1]).sum(axis=-1) > kl_threshold
+    elif approach == 'entropy':
+        certain = entr(p).sum(axis=-1) / np.log(2) < entropy_threshold
+    elif approach == 'gini':
+        certain = gini_coefficient(p) > gini_threshold
+    else:
+        raise ValueError(f"unknown certainty criterion {approach}, expected one of {CRITERIA}")
+    return np.where(certain, p.argmax(axis=-1), -1)
+
+
+def sharpen(cpt, power=3):
+    """every row of a CPT raised to a power and renormalized"""
+    scaled = np.power(cpt, power)
+    return scaled / scaled.sum(axis=-1, keepdims=True)
+
+
+class AdaptiveTransition:
+    def __init__(self, cpt, n_users=1, max_level=5, power=3, approach='z_score', cycle=False, **criterion_args):
+        """
+        Args:
+            cpt (array): the original [I0, It] CPT
+            n_users (int): number of independent users, each with its own level
+            max_level (int): sharpenings in a row before going back to the original CPT (cycle=True)
+            power (int): see sharpen()
+            approach (str): certainty criterion, see certain_index()
+            cycle (bool): sharpen one level per certain step and cycle through the levels, default: sharpen once
+            criterion_args: thresholds passed to certain_index()
+        """
+        levels = [np.asarray(cpt, dtype=np.float64)]
+        for _ in range(max_level):
+            levels.append(sharpen(levels[-1], power))
+        # [level, I0, It]
+        self.levels = np.stack(levels)
+        self.n_users = n_users
+        self.max_level = max_level
+        self.approach = approach
+        self.cycle = cycle
+        self.criterion_args = criterion_args
+        self.level = np.zeros(n_users, dtype=np.int64)
+        self.certain = np.full(n_users, -1, dtype=np.int64)  # interaction the last certain posterior was about
+
+    def reset(self, users=None):
+        """back to the original CPT (users: an index array or boolean mask, default: all)"""
+        users = slice(None) if users is None else users
+        self.level[users] = 0
+        self.certain[users] = -1
+
+    def update(self, posteriors, active=None):
+        """
+        Args:
+            posteriors (array): (n_users, |I|) posteriors of I from the last time step
+            active (array of bool): (n_users,) users to adapt, default: all
+        Returns:
+            (n_users,) CPT levels for this time step, the CPTs are self.levels[level]
+        """
+        index = certain_index(posteriors, self.approach, **self.criterion_args)
+        certain = index != -1
+        if active is not None:
+            certain &= active
+        if not self.cycle:
+            # one sharpening of the original CPT per certainty episode, always the same level
+            self.level[certain] = min(1, self.max_level)
+            self.certain[certain] = index[certain]
+            return self.level
+        same = certain & ((self.certain == -1) | (self.certain == index))
+        restart = (same & (self.level >= self.max_level)) | (certain & ~same)
+        self.level[same & ~restart] += 1
+        self.level[restart] = 0
+        self.certain[certain] = index[certain]
+        return self.level
+
+    def cpts(self):
+        """(n_users, |I|, |I|) current CPT of every user"""
+        return self.levels[self.level]
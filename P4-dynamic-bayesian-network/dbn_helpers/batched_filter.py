@@ -0,0 +1,92 @@
+import numpy as np
+
+from dbn_helpers.adaptive_transition import AdaptiveTransition
+
+# forward filtering of N independent users (or rooms) at once, over the CPTs of one gaze and gesture 2-TBN
+#
+# the filtering step is the one of numpy_filter.py with a leading user axis: beliefs are (N, |I|), (N, |GA|)
+# and (N, |HA|) arrays and the observations are (N,) arrays of label indices (-1 = not observed), so one
+# step for all users is a few matrix products. the dynamic It CPT of GazeAndGestureNet.update is per user:
+# an AdaptiveTransition with one level per user, indexing precomputed CPTs
+
+
+class BatchedFilter:
+    def __init__(self, cpts, n_users, certainty_criterion='z_score', cycle_It=False):
+        """
+        Args:
+            cpts (dict): CPT arrays of the 2-TBN by variable name, e.g. GazeAndGestureNet().numpy_filter.cpts
+            n_users (int): number of independent belief states
+            certainty_criterion (str): when the posterior of I sharpens the It CPT, as in GazeAndGestureNet
+            cycle_It (bool): cycle through the sharpened It CPTs, as in GazeAndGestureNet
+        """
+        self.cpts = {name: np.asarray(cpt, dtype=np.float64) for name, cpt in cpts.items()}
+        self.n_users = n_users
+
+        self.prior_I = self.cpts['I0']
+        self.prior_GA = self.cpts['GA0']
+        self.prior_HA = self.cpts['HA0']
+        self.adaptive_It = AdaptiveTransition(self.cpts['It'], n_users, approach=certainty_criterion, cycle=cycle_It)
+        # [I0, level * It], so one matrix product gives a(I1) for every level, and each user takes its own
+        self.It_levels = self.adaptive_It.levels
+        self.trans_I = self.It_levels.transpose(1, 0, 2).reshape(len(self.prior_I), -1)
+        # [GA0, It * GAt] for one matrix product over all users: sum_GA0 b(GA0) P(GAt|GA0,It)
+        n_I, n_GA, n_HA = len(self.prior_I), len(self.prior_GA), len(self.prior_HA)
+        self.trans_GA = self.cpts['GAt'].transpose(1, 0, 2).reshape(n_GA, n_I * n_GA)
+        self.trans_HA = self.cpts['HAt'].transpose(1, 0, 2).reshape(n_HA, n_I * n_HA)
+        # [observation, GAt]: P(GOt=obs|GAt), with a row of ones at the end for "not observed" (index -1)
+        self.likelihood_GO = np.vstack([self.cpts['GOt'].T, np.ones(n_GA)])
+        self.likelihood_HO = np.vstack([self.cpts['HOt'].T, np.ones(n_HA)])
+
+        self.reset()
+
+    def reset(self, users=None):
+        """Put users (an index array or boolean mask, default: all) back to the prior, e.g. when they leave or join"""
+        if users is None:
+            users = slice(None)
+            n = self.n_users
+            self.belief_I = np.empty((n, len(self.prior_I)))
+            self.belief_GA = np.empty((n, len(self.prior_GA)))
+            self.belief_HA = np.empty((n, len(self.prior_HA)))
+            self.t = np.empty(n, dtype=np.int64)
+        # at t0 the soft evidence on the slice 0 variables is their prior
+        self.belief_I[users] = self.prior_I
+        self.belief_GA[users] = self.prior_GA
+        self.belief_HA[users] = self.prior_HA
+        self.t[users] = 0
+        self.adaptive_It.reset(None if isinstance(users, slice) else users)
+
+    def step(self, gaze, gesture):
+        """
+        Advance every user by one time step.
+
+        Args:
+            gaze (array of int): (N,) index of the observed interactable (GOt), -1 if not observed
+            gesture (array of int): (N,) index of the observed gesture (HOt), -1 if not observed
+        Returns:
+            dict of (N, n_values) arrays of normalized posteriors for 'I1', 'GA1', 'HA1'
+        """
+        # the dynamic It CPT of GazeAndGestureNet.update, for all users with t > 0 at once
+        It_level = self.adaptive_It.update(self.belief_I, active=self.t > 0)
+        n = self.n_users
+        n_I = len(self.prior_I)
+
+        # a(I1) = sum_I0 b(I0) P(I1|I0), with every user's It CPT
+        b_I = self.prior_I * self.belief_I
+        a = (b_I @ self.trans_I).reshape(n, len(self.It_levels), n_I)[np.arange(n), It_level]
+        # q(I1, X1) = sum_X0 b(X0) P(X1|X0,I1) * P(obs|X1)
+        q_GA = ((self.prior_GA * self.belief_GA) @ self.trans_GA).reshape(n, n_I, -1)
+        q_GA *= self.likelihood_GO[gaze][:, None, :]
+        q_HA = ((self.prior_HA * self.belief_HA) @ self.trans_HA).reshape(n, n_I, -1)
+        q_HA *= self.likelihood_HO[gesture][:, None, :]
+        m_GA = q_GA.sum(axis=2)
+        m_HA = q_HA.sum(axis=2)
+
+        p_I = a * m_GA * m_HA
+        p_GA = np.einsum('ni,nih->nh', a * m_HA, q_GA)
+        p_HA = np.einsum('ni,nih->nh', a * m_GA, q_HA)
+        self.belief_I = p_I / p_I.sum(axis=1, keepdims=True)
+        self.belief_GA = p_GA / p_GA.sum(axis=1, keepdims=True)
+        self.belief_HA = p_HA / p_HA.sum(axis=1, keepdims=True)
+        self.t += 1
+        return {'I1': self.belief_I, 'GA1': self.belief_GA, 'HA1': self.belief_HA}
+
@@ -1,135 +1,127 @@
+from functools import lru_cache, wraps
 import numpy as np
 import pyAgrum as gum
-from scipy.stats import dirichlet
-
-# quick start cpds for gaze and gesture 
-
-from world_space.curr_world_space import gestures, interactions, interactables, interactions_dict
-
-def I0_prior(weight=100, rvs = True):
-    alpha_I0 = np.ones(len(interactions)) * weight
-    # if rvs:
-    #     dirichlet_I0 = dirichlet.rvs(alpha_I0, size=1).flatten()
-    # else:
-    #     # deterministic dirichlet
-    #     dirichlet_I0 = dirichlet.mean(alpha_I0, size=1).flatten()
-    ### [TEMP] change to deterministic dirichlet to test
-    dirichlet_I0 = dirichlet.mean(alpha_I0).flatten()
-    return dirichlet_I0
-
-def GA0_prior(weight=100, rvs=True):
-    alpha_GA0 = np.ones(len(interactables)) * weight
-    # if rvs:
-    #     dirichlet_GA0 = dirichlet.rvs(alpha_GA0, size=1).flatten()
-    # else:
-    #     dirichlet_GA0 = dirichlet.mean(alpha_GA0, size=1).flatten()
-    ### [TEMP] change to deterministic dirichlet to test
-    dirichlet_GA0 = dirichlet.mean(alpha_GA0).flatten()
-    return dirichlet_GA0
-
-def HA0_prior(weight=100, rvs=True):
-    alpha_HA0 = np.ones(len(gestures)) * weight
-    # if rvs:
-    #     dirichlet_HA0 = dirichlet.rvs(alpha_HA0, size=1).flatten()
-    # else:
-    #     dirichlet_HA0 = dirichlet.mean(alpha_HA0, size=1).flatten()
-    ### [TEMP] change to deterministic dirichlet to test
-    dirichlet_HA0 = dirichlet.mean(alpha_HA0).flatten()
-    return dirichlet_HA0
-
-def cpd_GOt(w_GA_GO_match=5):
-    alpha_GO = np.ones((len(interactables), len(interactables)))
-    dirichlet_GO = np.ones(alpha_GO.shape)
-    np.fill_diagonal(alpha_GO, w_GA_GO_match)
-    for i in range(alpha_GO.shape[0]):
-        alpha_row = alpha_GO[i, :]
-        # dirichlet_GO[i, :] = dirichlet.rvs(alpha_row, size=1).flatten()
-        ### [TEMP] change to deterministic dirichlet to test
-        dirichlet_GO[i, :] = dirichlet.mean(alpha_row).flatten()
-    return dirichlet_GO
-
-
-def cpd_HOt(w_HA_HO_match=5, rvs=True):
-    alpha_HO = np.ones((len(gestures), len(gestures)))
-    dirichlet_HO = np.ones(alpha_HO.shape)
-    np.fill_diagonal(alpha_HO, w_HA_HO_match)
-    for i in range(alpha_HO.shape[0]):
-        alpha_row = alpha_HO[i, :]
-        # if rvs:
-        #     dirichlet_HO[i, :] = dirichlet.rvs(alpha_row, size=1).flatten()
-        # else:
-        #     dirichlet_HO[i, :] = dirichlet.mean(alpha_row).flatten()
-        ### [TEMP] change to deterministic dirichlet to test
-        dirichlet_HO[i, :] = dirichlet.mean(alpha_row).flatten()
-    return dirichlet_HO
-
-def cpd_It(w_given_I0=10):
-    alpha_It = np.ones((len(interactions), len(interactions)))*3
-    dirichlet_It = np.ones(alpha_It.shape)
-    np.fill_diagonal(alpha_It, w_given_I0)
-    for i in range(alpha_It.shape[0]):
-        alpha_row = alpha_It[i, :]
-        # dirichlet_It[i, :] = dirichlet.rvs(alpha_row, size=1).flatten()
-        ### [TEMP] change to deterministic dirichlet to test
-        dirichlet_It[i, :] = dirichlet.mean(alpha_row).flatten()
-    return dirichlet_It
-
-
-def cpd_GAt(w_given_GA0=10, w_given_It=10):
-    alpha_GAt_It = np.ones((len(interactions), len(interactables)))
-    alpha_GAt_GA0_It = np.ones((len(interactions), len(interactables), len(interactables)))
-    alpha_GAt_GA0 = np.ones((len(interactables), len(interactables)))
-    np.fill_diagonal(alpha_GAt_GA0, w_given_GA0)
-
-    for i in range(len(interactions)):
-        for j in range(len(interactables)):
-            if j == len(interactables):
-                continue
-            elif interactions[i] in interactions_dict[interactables[j]]:
-                alpha_GAt_It[i, j] = w_given_It
-
-    for i in range(len(interactions)):
-        for j in range(len(interactables)):
-            for k in range(len(interactables)):
-                # TODO: say in paper using chain rule to derive this cpd, with additional weight for adjusting mutual information between nodes
-                alpha_GAt_GA0_It[i, j, k] = alpha_GAt_It[i, k] * alpha_GAt_GA0[k, j]
-
-    # dirichlet_GAt_GA0_It = np.apply_along_axis(lambda row: dirichlet.rvs(row, size=1).flatten(), 2, alpha_GAt_GA0_It)
-    ### [TEMP] change to deterministic dirichlet to test
-    dirichlet_GAt_GA0_It = np.apply_along_axis(lambda row: dirichlet.mean(row).flatten(), 2, alpha_GAt_GA0_It)
-    return dirichlet_GAt_GA0_It
-
-
-def cpd_HAt(w_given_HA0=10, w_given_It=10, w_no_gesture_detected=100):
-    # TODO gpt will be queried as an interaction designer for "expert elicitation" when user enters a new environment
-    # placeholder for now (like HA0)
-    gpt_elicitation = np.array([[0., 0., 0., 0., 7., 0.], 
-                                [0., 7., 0., 0., 0., 0.], 
-                                [0., 0., 7., 0., 0., 0.], 
-                                [7., 0., 0., 0., 0., 0.], 
-                                [0., 0., 0., 7., 0., 0.], 
-                                [0., 7., 0., 0., 0., 0.], 
-                                [0., 0., 0., 7., 7., 0.], 
-                                [0., 0., 7., 0., 0., 0.], 
-                                [0., 0., 0., 0., 0., 7.]]).astype(float)
+
+# quick start cpds for gaze and gesture
+# every cpd is the mean of a dirichlet distribution per row, i.e. the row of alpha weights
+# divided by its sum, so whole alpha tensors are built with broadcasting and normalized at once.
+# results are memoized per (world space, weights), and returned as copies so callers can modify them.
+# every cpd takes an optional world_space (world_space/loader.py), the default is curr_world_space.world
+
+from world_space import curr_world_space
+
+
+# the weights GazeAndGestureNet builds its cpds with
+NET_WEIGHTS = {
+    'HOt': {'w_HA_HO_match': 5},
+    'GOt': {'w_GA_GO_match': 5},
+    'GAt': {'w_given_GA0': 3, 'w_given_It': 5},
+    'HAt': {'w_given_HA0': 5, 'w_given_It': 5},
+    'It': {'w_given_I0': 6},
+}
+
+
+def dirichlet_mean(alpha):
+    """mean of a dirichlet distribution along the last axis (scipy.stats.dirichlet.mean for every row)"""
+    alpha = np.asarray(alpha, dtype=np.float64)
+    return alpha / alpha.sum(axis=-1, keepdims=True)
+
+
+def match_alpha(n, w_match, w_other=1.0):
+    """(n, n) alpha matrix with w_match on the diagonal"""
+    alpha = np.full((n, n), w_other, dtype=np.float64)
+    np.fill_diagonal(alpha, w_match)
+    return alpha
+
+
+def chain_rule_cpd(alpha_given_It, alpha_given_prev):
+    """
+    P(Xt | X0, It) as a [It, X0, Xt] array, from alpha_given_It [It, Xt] and alpha_given_prev [Xt, X0]:
+    alpha[i, j, k] = alpha_given_It[i, k] * alpha_given_prev[k, j], normalized over Xt
+    """
+    # TODO: say in paper using chain rule to derive this cpd, with additional weight for adjusting mutual information between nodes
+    return dirichlet_mean(alpha_given_It[:, None, :] * alpha_given_prev.T[None, :, :])
+
+
+_memoized_functions = []
+
+
+def _memoized(function):
+    cached = lru_cache(maxsize=64)(function)
+    _memoized_functions.append(cached)
+
+    @wraps(function)
+    def wrapper(world_space, *args, **kwargs):
+        # WorldSpace is hashable, so the cache is per world space
+        return cached(world_space or curr_world_space.world, *args, **kwargs).copy()
+    return wrapper
+
+
+def clear_cpd_cache():
+    for cached in _memoized_functions:
+        cached.cache_clear()
+
+
+@_memoized
+def _uniform_prior(world_space, labels, weight):
+    return dirichlet_mean(np.ones(len(getattr(world_space, labels))) * weight)
+
+
+def I0_prior(weight=100, rvs = True, world_space=None):
+    ### [TEMP] deterministic dirichlet (mean) to test, rvs is not used
+    return _uniform_prior(world_space, 'interactions', weight)
+
+def GA0_prior(weight=100, rvs=True, world_space=None):
+    ### [TEMP] deterministic dirichlet (mean) to test, rvs is not used
+    return _uniform_prior(world_space, 'interactables', weight)
+
+def HA0_prior(weight=100, rvs=True, world_space=None):
+    ### [TEMP] deterministic dirichlet (mean) to test, rvs is not used
+    return _uniform_prior(world_space, 'gestures', weight)
+
+
+@_memoized
+def _match_cpd(world_space, labels, w_match, w_other):
+    return dirichlet_mean(match_alpha(len(getattr(world_space, labels)), w_match, w_other))
+
+
+def cpd_GOt(w_GA_GO_match=5, world_space=None):
+    return _match_cpd(world_space, 'interactables', w_GA_GO_match, 1.0)
+
+
+def cpd_HOt(w_HA_HO_match=5, rvs=True, world_space=None):
+    return _match_cpd(world_space, 'gestures', w_HA_HO_match, 1.0)
+
+def cpd_It(w_given_I0=10, world_space=None):
+    return _match_cpd(world_space, 'interactions', w_given_I0, 3.0)
+
+
+@_memoized
+def _cpd_GAt(world_space, w_given_GA0, w_given_It):
+    # the sparse [interaction, interactable] compatibility matrix is precomputed by the loader
+    alpha_GAt_It = np.where(world_space.compatibility.toarray(), w_given_It, 1.0)
+    alpha_GAt_GA0 = match_alpha(len(world_space.interactables), w_given_GA0)
+    return chain_rule_cpd(alpha_GAt_It, alpha_GAt_GA0)
+
+
+def cpd_GAt(w_given_GA0=10, w_given_It=10, world_space=None):
+    return _cpd_GAt(world_space, w_given_GA0, w_given_It)
+
+
+# TODO gpt will be queried as an interaction designer for "expert elicitation" when user enters a new environment
+# placeholder for now (like HA0): the "gpt_elicitation" of the world space file, interaction -> gestures that fit it,
+# as the sparse [interaction, gesture] matrix world_space.elicitation
+
+
+@_memoized
+def _cpd_HAt(world_space, w_given_HA0, w_given_It, w_no_gesture_detected):
     # episilon = 1
     # gpt_elicitation[gpt_elicitation == 0] = episilon
-    # alpha_HAt_It = gpt_elicitation
-    alpha_HAt_It = np.where(gpt_elicitation == 0, 1, w_given_It)
+    alpha_HAt_It = np.where(world_space.elicitation.toarray(), w_given_It, 1).astype(float)
     alpha_HAt_It[-1, -1] = w_no_gesture_detected
-    # alpha_HAt_It[-1, -1] = w_no_gesture_detected                
-    alpha_HAt_HA0 = np.ones((len(gestures), len(gestures)))
-    np.fill_diagonal(alpha_HAt_HA0, w_given_HA0)
-
-    alpha_HAt_HA0_It = np.ones((len(interactions), len(gestures), len(gestures)))
-
-    for i in range(len(interactions)):
-        for j in range(len(gestures)):
-            for k in range(len(gestures)):
-                alpha_HAt_HA0_It[i, j, k] = alpha_HAt_It[i, k] * alpha_HAt_HA0[k, j]
+    alpha_HAt_HA0 = match_alpha(len(world_space.gestures), w_given_HA0)
+    return chain_rule_cpd(alpha_HAt_It, alpha_HAt_HA0)
 
 
-    # dirichlet_HAt_HA0_It = np.apply_along_axis(lambda row: dirichlet.rvs(row, size=1).flatten(), 2, alpha_HAt_HA0_It)
-    ### [TEMP] change to deterministic dirichlet to test
-    dirichlet_HAt_HA0_It = np.apply_along_axis(lambda row: dirichlet.mean(row).flatten(), 2, alpha_HAt_HA0_It)
-    return dirichlet_HAt_HA0_It
+def cpd_HAt(w_given_HA0=10, w_given_It=10, w_no_gesture_detected=100, world_space=None):
+    return _cpd_HAt(world_space, w_given_HA0, w_given_It, w_no_gesture_detected)
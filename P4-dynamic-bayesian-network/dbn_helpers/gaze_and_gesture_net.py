@@ -1,15 +1,69 @@
+import logging
+import numpy as np
 import pyAgrum as gum
 import pyAgrum.lib.dynamicBN as gdyn
 import pyAgrum.lib.notebook as gnb
 import pyAgrum.lib.explain as expl
 
-from world_space.curr_world_space import interactables, interactions, interactions_dict, gestures
+from world_space import curr_world_space
 import dbn_helpers.gaze_and_gesture_cpds as cpds 
-import dbn_helpers.gaze_and_gesture_dynamic_cpds as dynamic_cpds
+from dbn_helpers.adaptive_transition import AdaptiveTransition
+from dbn_helpers.numpy_filter import NumpyFilter
+from dbn_helpers.particle_filter import ParticleFilter
+from dbn_helpers.posterior_result import PosteriorResult
+from dbn_helpers.posterior_history import PosteriorHistory
+
+# per-frame details are logged at DEBUG level, enable them with logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+# inference engines of update(): "NumPy" (dbn_helpers/numpy_filter.py), these of dbn_helpers/particle_filter.py
+# (every interaction enumerated, or sampled) and the pyAgrum engines below. pyAgrum's ImportanceSampling is left
+# out: on this network it gives wrong posteriors once GO1 is observed (GA1 off by 0.4 with pyAgrum 1.15, however
+# long it samples), while the other engines agree with exact inference
+PARTICLE_ENGINES = {"Sparse": {'n_particles': None}, "Particle": {}}
+PYAGRUM_ENGINES = {
+    "LazyPropagation": gum.LazyPropagation,
+    "ShaferShenoy": gum.ShaferShenoyInference,
+    "VariableElimination": gum.VariableElimination,
+    "LoopyBeliefPropagation": gum.LoopyBeliefPropagation,
+    "GibbsSampling": gum.GibbsSampling,
+    "MonteCarloSampling": gum.MonteCarloSampling,
+    "WeightedSampling": gum.WeightedSampling,
+}
+INFERENCE_ENGINES = ("NumPy",) + tuple(PARTICLE_ENGINES) + tuple(PYAGRUM_ENGINES)
+# pyAgrum's sampling engines only take hard evidence, the soft evidence on slice 0 is folded into the CPTs instead
+SAMPLING_ENGINES = ("GibbsSampling", "MonteCarloSampling", "WeightedSampling")
+# stopping rules of the approximate engines (LoopyBeliefPropagation and sampling), see pyAgrum's ApproximationScheme
+APPROXIMATION_SETTERS = {'epsilon': 'setEpsilon', 'min_epsilon_rate': 'setMinEpsilonRate', 'max_iter': 'setMaxIter',
+                         'max_time': 'setMaxTime'}
 
 
 class GazeAndGestureNet:
-    def __init__(self):
+    def __init__(self, world_space=None, history_horizon=3600, fast_path_tolerance=1e-9, certainty_criterion='z_score',
+                 approximation=None, cycle_It=False):
+        """
+            world_space:
+                WorldSpace (world_space/loader.py), defaults to curr_world_space.world
+            history_horizon:
+                number of most recent time steps kept in self.history (see posterior_history.py)
+            fast_path_tolerance:
+                once the same observations move no posterior by more than this in one step, the posteriors
+                are reused until the observations or a CPT change (None: always run inference)
+            certainty_criterion:
+                when the posterior of I counts as certain, which sharpens the It CPT, see adaptive_transition.py
+            approximation:
+                stopping rules of the approximate engines, e.g. {'epsilon': 1e-3, 'max_time': 0.01} (seconds),
+                keys from APPROXIMATION_SETTERS, default: pyAgrum's
+            cycle_It:
+                sharpen the It CPT one level per certain step and cycle through the levels instead of sharpening
+                it once, see adaptive_transition.py (the CPT then changes on most certain steps, which skips the
+                fast path)
+        """
+
+        self.world_space = world_space or curr_world_space.world
+        gestures = self.world_space.gestures
+        interactions = self.world_space.interactions
+        interactables = self.world_space.interactables
 
         # string constructors using CBTs we already have 
         prior_constructor = f"""HA0{{{'|'.join(gestures)}}}; I0{{{'|'.join(interactions)}}}; GA0{{{'|'.join(interactables)}}}"""
@@ -25,40 +79,82 @@ class GazeAndGestureNet:
 
         self.initialize_all_cpds()
 
+        # unroll the 2-TBN and build the inference engine once; every update only changes the
+        # evidence, and update_cpt() keeps the CPTs of the unrolled network in sync with the 2-TBN
+        self.dbn = gdyn.unroll2TBN(self.twoTBN, 2)
+        self.ie = gum.LazyPropagation(self.dbn)
+        self.ie.setTargets({'I1', 'GA1', 'HA1'})
+        # the other pyAgrum engines are built on first use, see _engine()
+        self.engines = {"LazyPropagation": self.ie}
+        self.approximation = dict(approximation or {})
+        # copy of the unrolled network for the sampling engines, with the slice 0 beliefs as CPTs
+        self.sampling_dbn = None
+        # the same filtering step with plain numpy (inference_engine="NumPy")
+        self.numpy_filter = NumpyFilter(self.twoTBN)
+        # ParticleFilters for the PARTICLE_ENGINES, built on first use with the CPTs of numpy_filter. they build
+        # GAt and GOt from the world space; update_cpt() records here which of the two differ from those
+        self.particle_filters = {}
+        self.unstructured_cpts = set()
+        self.target_labels = {name: list(self.dbn.variable(name).labels()) for name in ['I1', 'GA1', 'HA1']}
+
         self.one_slice_posteriors = {}
-        self.all_slices_posteriors = {}
+        # posteriors of the most recent time steps, in fixed-size arrays
+        self.history = PosteriorHistory(self.target_labels, history_horizon)
         self.network_observed_evidence = {}
 
+        # fast path for repeated evidence: with the same observations and CPTs the filter converges to a
+        # fixed point, which is served without inference once reached. update_cpt() bumps cpt_version
+        self.fast_path_tolerance = fast_path_tolerance
+        self.cpt_version = 0
+        self.previous_evidence_key = None
+        self.stationary_key = None
+        self.fast_path_counts = {'inference': 0, 'stationary': 0}
+
         self.originalIt_cpd = self.twoTBN.cpt("It")[:]
         self.originalGA_cpd = self.twoTBN.cpt("GAt")[:]
+        self.originalGO_cpd = self.twoTBN.cpt("GOt")[:]
         self.originalHA_cpd = self.twoTBN.cpt("HAt")[:]
-        self.prior_certain_action_index = -1
-        self.It_cpd_update_count = 0
-        self.It_skewed_index_prior = -1
+        # the sharpened It CPTs are precomputed, adapting only switches between them
+        self.adaptive_It = AdaptiveTransition(self.originalIt_cpd, approach=certainty_criterion, cycle=cycle_It)
 
 
     def update(self, input_evidence_one_time_slice, visualize_inference=True, inference_engine="LazyPropagation"):
         """
             evidence_one_time_slice: 
-                dictionary, e.g.: {'t0': {'GO0': 'music', 'HO0': 'tap'}}
+                dictionary, e.g.: {'t0': {'GO0': 'music', 'HO0': 'tap'}}, or with label indices
+                {'t0': {'GO0': 2, 'HO0': 1}}, see WorldSpace.interactable_index and gesture_index
+            returns:
+                PosteriorResult with the posteriors of 'I1', 'GA1' and 'HA1' as numpy arrays
+            inference_engine:
+                "NumPy" (dbn_helpers/numpy_filter.py, fastest for small world spaces), "Sparse" (exact) and
+                "Particle" (sampled) of dbn_helpers/particle_filter.py for many interactables, or one of
+                PYAGRUM_ENGINES: "LazyPropagation", "ShaferShenoy" and "VariableElimination" are exact,
+                "LoopyBeliefPropagation" converges to the exact posteriors on this singly connected network, the
+                sampling engines are approximate (both stop as set by approximation in __init__) and only take
+                labels or label indices as observations. benchmarks/benchmark_engines.py compares them
         """
         t = int(list(input_evidence_one_time_slice.keys())[0][1:])
-        # dynamic unroll 2-TBN
-        # TODO store original cpd if dynamically updated cpd
-        dbn = gdyn.unroll2TBN(self.twoTBN, 2)
+        # the 2-TBN is unrolled once in __init__, reuse it and its inference engine
+        dbn = self.dbn
 
-        if inference_engine == "LazyPropagation":
-            ie = gum.LazyPropagation(dbn)
-        else:
-            #TODO
-            pass
+        if inference_engine not in INFERENCE_ENGINES:
+            raise ValueError(f"unknown inference engine {inference_engine}, expected one of {INFERENCE_ENGINES}")
+        if inference_engine in PARTICLE_ENGINES and self.unstructured_cpts:
+            # checked before the step changes any state, so the net can go on with another engine
+            raise ValueError(f"the {inference_engine} engine builds GAt and GOt from the world space, but "
+                             f"update_cpt() changed {', '.join(sorted(self.unstructured_cpts))}: restore the "
+                             f"original CPT or use an exact engine such as NumPy")
 
         # add observed evidence to the 2-TBN
         evidence_this_step = list(input_evidence_one_time_slice.values())[0]
         evidence_types = list(evidence_this_step.keys())
         evidence_obs = list(evidence_this_step.values())
         for ev_i in range(len(evidence_types)):
-            self.network_observed_evidence[f"{evidence_types[ev_i][:2]}1"] = evidence_obs[ev_i]   
+            observation = evidence_obs[ev_i]
+            if isinstance(observation, np.integer):
+                # pyAgrum takes python ints as label indices, but not numpy ints
+                observation = int(observation)
+            self.network_observed_evidence[f"{evidence_types[ev_i][:2]}1"] = observation
         
         if t == 0:
             self.network_observed_evidence['I0'] = dbn.cpt('I0').toarray()
@@ -78,63 +174,26 @@ class GazeAndGestureNet:
             # put priors in update network_observed_evidence 
             self.network_observed_evidence.update(prior_from_posterior)
     
-            # dynamically update cpd for I
-            
-            previous_posteriors_I = prior_from_posterior['I0']
-            It_skewed_index = dynamic_cpds.if_certain_twoTBN_prior(previous_posteriors_I)
-            if (It_skewed_index != -1):
-                if(self.prior_certain_action_index == -1 or self.It_skewed_index_prior == It_skewed_index):
-                    if(self.It_cpd_update_count < 5):
-                        scaled_It_cpd = dynamic_cpds.scale_cpd(self.twoTBN.cpt('It')[:])
-                        print("original cpd: ", self.twoTBN.cpt('It')[:])
-                        print("scaled cpd: ", scaled_It_cpd)
-                        self.update_cpt('It', scaled_It_cpd)
-                        self.It_cpd_update_count += 1
-                    else:
-                        self.It_cpd_update_count = 0
-                        self.update_cpt('It', self.originalIt_cpd) 
-                self.prior_certain_action_index = It_skewed_index
-                
-
-
-
-            # if t > 1:
-            #     print("one slice looks like this: ", self.one_slice_posteriors.get('I1', {}))
-            #     # update dynamic cpds
-            #     self.update_dynamic_cpds()
-
-            #     #TODO the cpd should go back to the original cpd if the distribution shifts
-
-
+            # dynamically update cpd for I: sharpen it while I stays certain about the same interaction
+            previous_level = int(self.adaptive_It.level[0])
+            level = int(self.adaptive_It.update(prior_from_posterior['I0'][None])[0])
+            if level != previous_level:
+                logger.debug("It cpd level %d -> %d", previous_level, level)
+                self.update_cpt('It', self.adaptive_It.levels[level])
+
+        # observations and CPTs this step; the same key as a step that did not change the posteriors means
+        # they are at their fixed point, and stay there
+        evidence_key = (self._observation_key(), self.cpt_version) if t > 0 else None
+        if evidence_key is not None and evidence_key == self.stationary_key:
+            # the posteriors of the last step are the posteriors of this step
+            self.fast_path_counts['stationary'] += 1
+        else:
+            self.fast_path_counts['inference'] += 1
+            previous_posteriors = dict(self.one_slice_posteriors)
             # one_slice_posteriors should always be posteriors from last time slice, clear when taken, to store new posterior
             self.one_slice_posteriors.clear()
-        
-        # set all evidence in inference engine
-        # network_observed_evidence stores the evidence for each time step, alo use for visualization
-        ie.setEvidence(self.network_observed_evidence)
-
-        # exclude priors and observable values from target
-        nodes_w_evidences = ie.softEvidenceNodes().union(ie.hardEvidenceNodes())
-        # exclude observable nodes from target
-        network_inference_targets = set(ie.targets()).difference(nodes_w_evidences)
-
-        
-        targets_to_infer = {dbn.idFromName('GA1'), dbn.idFromName('HA1'), dbn.idFromName('I1')}
-        #TODO fix assertion here
-        # assert targets_to_infer == network_inference_targets,"""
-        #   f"t{t}: inference targets are not correctly set\n
-        #   currently setting {sorted(network_inference_targets)}"""
-        
-        ie.setTargets(network_inference_targets)
-        # run junction-tree-based inference
-        ie.makeInference()
-        print("makinginference")
-
-        # get and store posteriors to be prior for the next time step
-        for var in network_inference_targets:
-            target_name = dbn.variable(var).name()
-            self.one_slice_posteriors[target_name] = ie.posterior(target_name).tolist()
-            self.all_slices_posteriors[f"t{t}"] = self.one_slice_posteriors
+            self._infer(inference_engine)
+            self._check_stationary(evidence_key, previous_posteriors)
 
         if visualize_inference:
             # visualize inference at this tim step
@@ -143,46 +202,158 @@ class GazeAndGestureNet:
         # clear the evidence dictionary as it is just used for visualization at this time step
         self.network_observed_evidence.clear()
         # self.update_cpt('It', self.originalIt_cpd )
-        print(f"t{t} posteriors: {self.one_slice_posteriors}")
-        return f"t{t} posteriors: {self.one_slice_posteriors}"
+        result = PosteriorResult(t, self.one_slice_posteriors, self.target_labels)
+        self.history.append(result)
+        logger.debug("%s", result)
+        return result
+
+
+    def _infer(self, inference_engine):
+        """one filtering step on self.network_observed_evidence, posteriors go to self.one_slice_posteriors"""
+        dbn = self.dbn
+        if inference_engine == "NumPy":
+            # exact forward step on the CPT arrays, no graph machinery
+            for target_name, posterior in self.numpy_filter.infer(self.network_observed_evidence).items():
+                self.one_slice_posteriors[target_name] = posterior
+        elif inference_engine in PARTICLE_ENGINES:
+            if inference_engine not in self.particle_filters:
+                self.particle_filters[inference_engine] = ParticleFilter(self.world_space, self.numpy_filter.cpts,
+                                                                         **PARTICLE_ENGINES[inference_engine])
+            particle_filter = self.particle_filters[inference_engine]
+            for target_name, posterior in particle_filter.infer(self.network_observed_evidence).items():
+                self.one_slice_posteriors[target_name] = posterior
+        else:
+            ie = self._engine(inference_engine)
+            evidence = self.network_observed_evidence
+            if inference_engine in SAMPLING_ENGINES:
+                evidence = self._fold_soft_evidence(evidence)
+            # set all evidence in inference engine
+            # network_observed_evidence stores the evidence for each time step, alo use for visualization
+            # drop evidence from the last time step that is not observed anymore, change the rest in place
+            for node in ie.softEvidenceNodes().union(ie.hardEvidenceNodes()):
+                if dbn.variable(node).name() not in evidence:
+                    ie.eraseEvidence(node)
+            ie.updateEvidence(evidence)
+
+            # targets are set once in __init__: the latent variables of the second slice
+            network_inference_targets = ie.targets()
+
+            # run junction-tree-based inference
+            ie.makeInference()
+
+            # get and store posteriors to be prior for the next time step
+            for var in network_inference_targets:
+                target_name = dbn.variable(var).name()
+                self.one_slice_posteriors[target_name] = ie.posterior(target_name).toarray()
+
+    def _engine(self, name):
+        """the pyAgrum engine called name; all but the sampling engines are built once, like self.ie"""
+        if name in SAMPLING_ENGINES:
+            # built for every step: they sample from scratch anyway, and the CPTs of sampling_dbn change
+            # every step
+            if self.sampling_dbn is None:
+                self.sampling_dbn = gum.BayesNet(self.dbn)
+            return self._new_engine(name, self.sampling_dbn)
+        if name not in self.engines:
+            self.engines[name] = self._new_engine(name, self.dbn)
+        return self.engines[name]
+
+    def _new_engine(self, name, bn):
+        ie = PYAGRUM_ENGINES[name](bn)
+        ie.setTargets({'I1', 'GA1', 'HA1'})
+        if hasattr(ie, 'setEpsilon'):
+            for setting, value in self.approximation.items():
+                getattr(ie, APPROXIMATION_SETTERS[setting])(value)
+        return ie
+
+    def _fold_soft_evidence(self, evidence):
+        """
+        for the sampling engines: the soft evidence on the slice 0 variables times their prior becomes their CPT in
+        self.sampling_dbn (the same posterior), returns the remaining hard evidence
+        """
+        for name in ('I0', 'GA0', 'HA0'):
+            belief = self.dbn.cpt(name).toarray() * evidence.get(name, 1.0)
+            self.sampling_dbn.cpt(name).fillWith((belief / belief.sum()).tolist())
+        hard_evidence = {}
+        for name, value in evidence.items():
+            if name in ('I0', 'GA0', 'HA0'):
+                continue
+            if not isinstance(value, (str, int)):
+                raise ValueError(f"the sampling engines only take a label or label index as evidence on {name}")
+            hard_evidence[name] = value
+        return hard_evidence
+
+    def _observation_key(self):
+        """hashable form of the observed evidence (GO1, HO1) of this step"""
+        key = []
+        for name in ('GO1', 'HO1'):
+            value = self.network_observed_evidence.get(name)
+            if value is not None and not isinstance(value, (str, int)):
+                # a likelihood vector
+                value = tuple(float(v) for v in value)
+            key.append(value)
+        return tuple(key)
+
+    def _check_stationary(self, evidence_key, previous_posteriors):
+        """remember evidence_key as stationary if it repeated and did not move the posteriors"""
+        stationary = (self.fast_path_tolerance is not None and evidence_key is not None
+                      and evidence_key == self.previous_evidence_key
+                      and previous_posteriors.keys() == self.one_slice_posteriors.keys()
+                      and all(np.abs(self.one_slice_posteriors[name] - posterior).max() <= self.fast_path_tolerance
+                              for name, posterior in previous_posteriors.items()))
+        self.stationary_key = evidence_key if stationary else None
+        self.previous_evidence_key = evidence_key
 
 
     def initialize_all_cpds(self):
-        cpd_I0 = cpds.I0_prior()
+        world_space = self.world_space
+        cpd_I0 = cpds.I0_prior(world_space=world_space)
         self.add_cpt('I0', cpd_I0)
 
-        cpd_GA0 = cpds.GA0_prior()
+        cpd_GA0 = cpds.GA0_prior(world_space=world_space)
         self.add_cpt('GA0', cpd_GA0)
 
-        cpd_HA0 = cpds.HA0_prior()
+        cpd_HA0 = cpds.HA0_prior(world_space=world_space)
         self.add_cpt('HA0', cpd_HA0)
 
-        cpd_HOt = cpds.cpd_HOt(w_HA_HO_match=5)
+        cpd_HOt = cpds.cpd_HOt(**cpds.NET_WEIGHTS['HOt'], world_space=world_space)
         self.add_cpt('HOt', cpd_HOt)
 
-        cpd_GOt = cpds.cpd_GOt(w_GA_GO_match=5) 
+        cpd_GOt = cpds.cpd_GOt(**cpds.NET_WEIGHTS['GOt'], world_space=world_space)
         self.add_cpt('GOt', cpd_GOt)
 
-        cpd_GAt = cpds.cpd_GAt(w_given_GA0=3, w_given_It=5)
+        cpd_GAt = cpds.cpd_GAt(**cpds.NET_WEIGHTS['GAt'], world_space=world_space)
         self.add_cpt('GAt', cpd_GAt)
         
-        cpd_HAt = cpds.cpd_HAt(w_given_HA0=5, w_given_It=5)
+        cpd_HAt = cpds.cpd_HAt(**cpds.NET_WEIGHTS['HAt'], world_space=world_space)
         self.add_cpt('HAt', cpd_HAt)
 
-        cpd_It = cpds.cpd_It(w_given_I0=6)
+        cpd_It = cpds.cpd_It(**cpds.NET_WEIGHTS['It'], world_space=world_space)
         self.add_cpt('It', cpd_It)
 
 
 
-    def update_dynamic_cpds(self):
-        previous_posteriors_I = self.one_slice_posteriors.get('I1', [])
-        if len(previous_posteriors_I) > 0:
-            cpd_It = dynamic_cpds.dynamic_cpd_It(previous_posteriors_I, 'kl_divergence')
-            self.update_cpt('It', cpd_It)
-
-
     def update_cpt(self, var, cpd):
-        self.twoTBN.cpt(var)[:] = cpd
+        self.cpt_version += 1
+        # fillWith copies in C++, cpt[:] = cpd sets one entry at a time in python (ms for larger world spaces).
+        # the flattened array is in the order of cpt(var)[:], parents first
+        values = np.asarray(cpd, dtype=np.float64).ravel().tolist()
+        self.twoTBN.cpt(var).fillWith(values)
+        # the unrolled network has its own copy of the CPT, named after the slice (It -> I1)
+        self.dbn.cpt(f"{var[:-1]}1" if var.endswith('t') else var).fillWith(values)
+        self.numpy_filter.set_cpt(var, cpd)
+        if var in ('GAt', 'GOt'):
+            # the particle filters can not take these, update() refuses their engines until the original CPT is back
+            original = self.originalGA_cpd if var == 'GAt' else self.originalGO_cpd
+            if np.array_equal(np.asarray(cpd, dtype=np.float64), original):
+                self.unstructured_cpts.discard(var)
+            else:
+                self.unstructured_cpts.add(var)
+        else:
+            for particle_filter in self.particle_filters.values():
+                particle_filter.set_cpt(var, cpd)
+        if self.sampling_dbn is not None and var.endswith('t'):
+            self.sampling_dbn.cpt(f"{var[:-1]}1").fillWith(values)
 
     def add_cpt(self, var, cpd):
         self.twoTBN.cpt(var)[:] = cpd
@@ -0,0 +1,293 @@
+import logging
+import multiprocessing as mp
+import threading
+import time
+import numpy as np
+
+from dbn_helpers.posterior_result import PosteriorResult
+
+# run GazeAndGestureNet.update off the UI thread, at its own rate, so the 60 FPS UI loop never waits for inference
+#
+#   UI thread (60 FPS)                         inference thread / process (rate Hz)
+#   worker.submit(gaze, gesture) --evidence--> dbn.update(...) every 1/rate s
+#   worker.latest()            <-posteriors--- PosteriorResult
+#
+# both directions go through a single-slot mailbox: the writer replaces the slot, the reader takes the
+# newest item, and nobody ever blocks on the other side. intermediate items are simply overwritten.
+#
+# InferenceWorker runs on a thread and is the simplest to use, but pyAgrum and numpy hold the GIL for part
+# of every step, so a slow step still takes time away from the UI. InferenceProcess runs the network in a
+# separate process with the mailboxes in shared memory, so the UI frame rate does not depend on the network size
+
+logger = logging.getLogger(__name__)
+
+
+class Mailbox:
+    """Single-slot mailbox for one writer thread and any number of readers, without locks.
+
+    put() swaps in a new (version, item) tuple and get() reads it. Both are a single reference
+    assignment / read, which is atomic in CPython, so a reader always sees a complete pair.
+    """
+
+    def __init__(self, item=None):
+        self._slot = (0, item)
+
+    def put(self, item):
+        self._slot = (self._slot[0] + 1, item)
+
+    def get(self):
+        """(version, item) of the newest item, version is 0 until the first put()"""
+        return self._slot
+
+
+class SharedMailbox:
+    """Single-slot mailbox of a fixed-size numeric array in shared memory, for one writer and readers in other processes.
+
+    Lock-free with a sequence counter in front of the data (a seqlock): the writer makes the counter
+    odd while it writes and even when it is done, a reader copies the data and retries if the counter
+    was odd or changed in the meantime.
+    """
+
+    def __init__(self, size, typecode='d', context=mp):
+        """
+        Args:
+            size (int): number of values in the slot
+            typecode (str): array typecode of the values and the counter, 'd' (float64) or 'q' (int64)
+            context: multiprocessing context of the processes that share the mailbox
+        """
+        self.raw = context.RawArray(typecode, size + 1)
+        self.dtype = np.float64 if typecode == 'd' else np.int64
+        self._buffer = None
+
+    @property
+    def buffer(self):
+        # the numpy view is created lazily, so it is also created in the process the mailbox is passed to
+        if self._buffer is None:
+            self._buffer = np.frombuffer(self.raw, dtype=self.dtype)
+        return self._buffer
+
+    def __getstate__(self):
+        return {'raw': self.raw, 'dtype': self.dtype, '_buffer': None}
+
+    def put(self, values):
+        buffer = self.buffer
+        sequence = buffer[0]
+        buffer[0] = sequence + 1
+        buffer[1:] = values
+        buffer[0] = sequence + 2
+
+    def get(self):
+        """(version, copy of the values), version is 0 until the first put()"""
+        buffer = self.buffer
+        while True:
+            sequence = buffer[0]
+            if not sequence % 2:
+                values = buffer[1:].copy()
+                if buffer[0] == sequence:
+                    return int(sequence) // 2, values
+            # the writer is in the middle of a put(): give up the CPU instead of spinning, the writer may
+            # need it to finish (on one core it always does)
+            time.sleep(0)
+
+
+def run_inference(dbn, rate, inference_engine, evidence, publish, stop_event, stats):
+    """
+    Step the network at a fixed rate on the newest evidence until stop_event is set.
+
+    Args:
+        dbn (GazeAndGestureNet): the network
+        rate (float): time steps per second
+        inference_engine (str): passed to GazeAndGestureNet.update
+        evidence (Mailbox or SharedMailbox): (gaze, gesture) label indices or labels
+        publish (callable): called with the PosteriorResult of every step
+        stop_event (threading.Event or multiprocessing.Event)
+        stats: writable sequence of [steps, seconds of the last step, skipped steps]
+    """
+    period = 1.0 / rate
+    next_step = time.perf_counter()
+    while not stop_event.is_set():
+        version, observations = evidence.get()
+        if version:
+            gaze, gesture = observations
+            t = int(stats[0])
+            start = time.perf_counter()
+            try:
+                result = dbn.update({f"t{t}": {f"GO{t}": gaze, f"HO{t}": gesture}},
+                                    visualize_inference=False, inference_engine=inference_engine)
+            except Exception:
+                logger.exception("DBN update failed at t%d, stopping inference", t)
+                return
+            stats[1] = time.perf_counter() - start
+            publish(result)
+            stats[0] = t + 1
+
+        # keep a fixed schedule; if a step took longer than the period, drop the missed steps
+        # instead of running several in a row to catch up
+        next_step += period
+        now = time.perf_counter()
+        if next_step < now:
+            missed = int((now - next_step) / period) + 1
+            stats[2] += missed
+            next_step += missed * period
+        stop_event.wait(next_step - now)
+    logger.info("Inference stopped after %d steps, %d skipped, %s", int(stats[0]), int(stats[2]), dbn.fast_path_counts)
+
+
+class InferenceWorker:
+    def __init__(self, dbn, rate=60, inference_engine="NumPy"):
+        """
+        Args:
+            dbn (GazeAndGestureNet): the network, only this worker may call dbn.update once it is started
+            rate (float): DBN time steps per second. every step uses the newest submitted evidence,
+                so at a rate below the UI frame rate observations shorter than one step can be missed
+            inference_engine (str): passed to GazeAndGestureNet.update
+        """
+        self.dbn = dbn
+        self.rate = rate
+        self.inference_engine = inference_engine
+        self.evidence = Mailbox()
+        self.posteriors = Mailbox()
+        self.stats = [0, 0.0, 0]
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=run_inference, name="dbn-inference", daemon=True,
+                                        args=(dbn, rate, inference_engine, self.evidence, self.posteriors.put,
+                                              self._stop_event, self.stats))
+
+    @property
+    def t(self):
+        """number of steps done"""
+        return int(self.stats[0])
+
+    @property
+    def step_time(self):
+        """seconds the last dbn.update took"""
+        return self.stats[1]
+
+    @property
+    def skipped_steps(self):
+        """steps dropped because inference fell behind the rate"""
+        return int(self.stats[2])
+
+    @property
+    def history(self):
+        return self.dbn.history
+
+    def submit(self, gaze, gesture):
+        """Hand the current observations (labels or label indices) to the worker, never blocks"""
+        self.evidence.put((gaze, gesture))
+
+    def latest(self):
+        """(version, PosteriorResult) of the newest step, (0, None) before the first one"""
+        return self.posteriors.get()
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=1.0):
+        self._stop_event.set()
+        self._thread.join(timeout)
+
+    def is_alive(self):
+        return self._thread.is_alive()
+
+
+def _inference_process(world_space, history_horizon, rate, inference_engine, evidence, posteriors, stats,
+                       ready_event, stop_event, history_queue):
+    from dbn_helpers.gaze_and_gesture_net import GazeAndGestureNet
+
+    dbn = GazeAndGestureNet(world_space=world_space, history_horizon=history_horizon)
+    names = list(dbn.target_labels)
+    ready_event.set()
+
+    def publish(result):
+        posteriors.put(np.concatenate([[result.t]] + [result[name] for name in names]))
+
+    run_inference(dbn, rate, inference_engine, evidence, publish, stop_event, stats)
+    history_queue.put(dbn.history)
+
+
+class InferenceProcess:
+    def __init__(self, world_space=None, rate=60, inference_engine="NumPy", history_horizon=3600,
+                 start_method="spawn"):
+        """
+        Same interface as InferenceWorker, but the GazeAndGestureNet is created and updated in a separate process.
+        Evidence must be given as label indices (WorldSpace.interactable_index / gesture_index).
+
+        Args:
+            world_space (WorldSpace): passed to GazeAndGestureNet, defaults to curr_world_space.world
+            rate (float): DBN time steps per second
+            inference_engine (str): passed to GazeAndGestureNet.update
+            history_horizon (int): passed to GazeAndGestureNet, self.history holds its history after stop()
+            start_method (str): multiprocessing start method. "spawn" starts a fresh interpreter, which is safe
+                once the UI and camera threads run, but re-imports the main script: guard it with
+                if __name__ == "__main__". "fork" starts faster, but only fork before any other thread runs
+        """
+        from world_space import curr_world_space
+
+        world_space = world_space or curr_world_space.world
+        self.rate = rate
+        self.inference_engine = inference_engine
+        # the order of GazeAndGestureNet.target_labels
+        self.target_labels = {'I1': world_space.interactions, 'GA1': world_space.interactables,
+                              'HA1': world_space.gestures}
+        self.history = None
+
+        context = mp.get_context(start_method)
+        self.evidence = SharedMailbox(2, 'q', context)
+        self.posteriors = SharedMailbox(1 + sum(len(labels) for labels in self.target_labels.values()), context=context)
+        self.stats = context.RawArray('d', 3)
+        self._ready_event = context.Event()
+        self._stop_event = context.Event()
+        self._history_queue = context.Queue()
+        self._latest = (0, None)
+        self._process = context.Process(target=_inference_process, name="dbn-inference", daemon=True,
+                                        args=(world_space, history_horizon, rate, inference_engine, self.evidence,
+                                              self.posteriors, self.stats, self._ready_event, self._stop_event,
+                                              self._history_queue))
+
+    t = InferenceWorker.t
+    step_time = InferenceWorker.step_time
+    skipped_steps = InferenceWorker.skipped_steps
+
+    def submit(self, gaze, gesture):
+        """Hand the current observations (label indices) to the worker, never blocks"""
+        self.evidence.put((gaze, gesture))
+
+    def latest(self):
+        """(version, PosteriorResult) of the newest step, (0, None) before the first one"""
+        version, values = self.posteriors.get()
+        if version != self._latest[0]:
+            posteriors, start = {}, 1
+            for name, labels in self.target_labels.items():
+                posteriors[name] = values[start:start + len(labels)]
+                start += len(labels)
+            self._latest = (version, PosteriorResult(int(values[0]), posteriors, self.target_labels))
+        return self._latest
+
+    def start(self, timeout=60.0):
+        """start the process and wait until it has built the network, RuntimeError if it dies or takes too long"""
+        self._process.start()
+        deadline = time.monotonic() + timeout
+        # short waits, so a child that dies while building the network is noticed
+        while not self._ready_event.wait(0.1):
+            if not self._process.is_alive():
+                raise RuntimeError(f"The inference process exited with code {self._process.exitcode} "
+                                   f"before it built the network")
+            if time.monotonic() > deadline:
+                self._process.terminate()
+                self._process.join()
+                raise RuntimeError(f"The inference process did not build the network within {timeout} s")
+        return self
+
+    def stop(self, timeout=5.0):
+        """stop the process and fetch the posterior history of the session into self.history"""
+        self._stop_event.set()
+        try:
+            self.history = self._history_queue.get(timeout=timeout)
+        except Exception:
+            logger.warning("No posterior history received from the inference process")
+        self._process.join(timeout)
+
+    def is_alive(self):
+        return self._process.is_alive()
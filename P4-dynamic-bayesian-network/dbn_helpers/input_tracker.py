@@ -6,21 +6,26 @@ class InputTracker:
         self.last_gesture = None
         self.last_hovered_sprite = None
         
-        # Create a log file with timestamp in filename
-        log_dir = "logs"
-        if not os.path.exists(log_dir):
-            os.makedirs(log_dir)
+        # Log file with timestamp in filename, created on the first event, so processes that only
+        # import the tracker (the inference process, benchmarks) leave no empty logs behind
+        self.log_dir = "logs"
         timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        self.log_filename = os.path.join(log_dir, f"interaction_log_{timestamp}.txt")
-        
-        # Write header to log file
+        self.log_filename = os.path.join(self.log_dir, f"interaction_log_{timestamp}.txt")
+        self.log_started = False
+
+    def start_log(self):
+        """Create the log file and write its header"""
+        if not os.path.exists(self.log_dir):
+            os.makedirs(self.log_dir)
         with open(self.log_filename, 'w') as f:
             f.write("Timestamp, Event Type, Value, Details\n")
-        
+        self.log_started = True
         print(f"Logging interactions to: {self.log_filename}")
-        
+
     def log_event(self, event_type, value, details=""):
         """Log an event to both console and file"""
+        if not self.log_started:
+            self.start_log()
         timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
         log_line = f"{timestamp}, {event_type}, {value}, {details}"
         
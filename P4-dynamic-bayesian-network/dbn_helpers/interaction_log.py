@@ -0,0 +1,46 @@
+from array import array
+from datetime import datetime
+import numpy as np
+
+# read the logs written by input_tracker.py back into evidence arrays, e.g. for smoothing.py
+#
+#   Timestamp, Event Type, Value, Details
+#   2025-05-01 14:03:12.016, GESTURE, None,
+#   2025-05-01 14:03:12.016, GAZE, Lamp, ID: 3
+#
+# track_inputs() logs the gesture (when gesture detection runs) and then the gaze once per UI frame, so every
+# GAZE line ends a frame. the file is read line by line into typed arrays, so long sessions stay small in memory
+
+
+def read_interaction_log(path, world_space=None):
+    """
+    Args:
+        path (str): log file of InputTracker
+        world_space (WorldSpace): maps the labels to indices, defaults to curr_world_space.world
+    Returns:
+        timestamps (float64 seconds since the epoch), gaze and gesture (int16 label indices, -1 = not observed
+        or not in the world space), one entry per frame
+    """
+    if world_space is None:
+        from world_space import curr_world_space
+        world_space = curr_world_space.world
+    interactable_index = world_space.interactable_index
+    gesture_index = world_space.gesture_index
+
+    timestamps, gaze, gesture = array('d'), array('h'), array('h')
+    current_gesture = -1
+    with open(path) as f:
+        next(f, None)  # header
+        for line in f:
+            fields = line.rstrip("\n").split(", ", 3)
+            if len(fields) < 3:
+                continue
+            timestamp, event_type, value = fields[:3]
+            if event_type == "GESTURE":
+                current_gesture = gesture_index.get(value, -1)
+            elif event_type == "GAZE":
+                timestamps.append(datetime.fromisoformat(timestamp).timestamp())
+                gaze.append(interactable_index.get(value, -1))
+                gesture.append(current_gesture)
+    return np.frombuffer(timestamps, dtype=np.float64), np.frombuffer(gaze, dtype=np.int16), \
+        np.frombuffer(gesture, dtype=np.int16)
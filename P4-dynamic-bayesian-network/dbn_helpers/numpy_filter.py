@@ -0,0 +1,80 @@
+import numpy as np
+
+# exact forward filtering for the gaze and gesture 2-TBN with plain numpy
+#
+# the structure is fixed: I0->It, GA0->GAt, HA0->HAt, It->GAt, It->HAt, GAt->GOt, HAt->HOt.
+# with (soft) evidence on the slice 0 variables and GOt / HOt observed, the posterior of slice 1 is
+#
+#   P(I1, GA1, HA1) ~ a(I1) * sum_GA0 b(GA0) P(GA1|GA0,I1) L_GO(GA1) * sum_HA0 b(HA0) P(HA1|HA0,I1) L_HO(HA1)
+#   a(I1) = sum_I0 b(I0) P(I1|I0)
+#
+# where b(X0) = P(X0) * soft evidence on X0 (as pyAgrum does it), and L_GO(GA1) = P(GO1=obs|GA1).
+# the observation likelihoods are folded into the transition tensors up front, one tensor per
+# observable value, so a step is three small matrix products and a few element-wise products
+
+
+class NumpyFilter:
+    def __init__(self, twoTBN):
+        """
+        Args:
+            twoTBN (gum.BayesNet): the 2-TBN of GazeAndGestureNet, CPTs are copied from it
+        """
+        self.labels = {name: list(twoTBN.variable(name).labels()) for name in twoTBN.names()}
+        # label -> index, so string evidence costs one dict lookup
+        self.label_index = {name: {label: i for i, label in enumerate(labels)} for name, labels in self.labels.items()}
+        self.cpts = {name: np.array(twoTBN.cpt(name)[:], dtype=np.float64) for name in twoTBN.names()}
+        self._precompute()
+
+    def set_cpt(self, var, cpd):
+        """replace the CPT of a 2-TBN variable (same layout as BayesNet.cpt(var)[:])"""
+        self.cpts[var] = np.array(cpd, dtype=np.float64)
+        self._precompute(var)
+
+    def _precompute(self, var=None):
+        """recompute what depends on the CPT of var (default: everything), so switching the It CPT is free"""
+        self.prior_I = self.cpts['I0']
+        self.prior_GA = self.cpts['GA0']
+        self.prior_HA = self.cpts['HA0']
+        # cpt(v)[:] lists the parents first and the variable last: [I0, It], [It, GA0, GAt], [GAt, GOt]
+        self.trans_I = self.cpts['It']
+        # [obs, It, GA0, GAt]: P(GAt|GA0,It) * P(GOt=obs|GAt)
+        if var in (None, 'GAt', 'GOt'):
+            self.trans_obs_GA = np.einsum('igh,ho->oigh', self.cpts['GAt'], self.cpts['GOt'])
+        if var in (None, 'HAt', 'HOt'):
+            self.trans_obs_HA = np.einsum('igh,ho->oigh', self.cpts['HAt'], self.cpts['HOt'])
+
+    def _transition(self, trans_obs, cpt, cpt_obs, observation, observable):
+        """P(X1|X0,I1) times the likelihood of the observation, for a label index, a label, a likelihood vector or None"""
+        if observation is None:
+            return cpt
+        if isinstance(observation, (int, np.integer)):
+            return trans_obs[observation]
+        if isinstance(observation, str):
+            return trans_obs[self.label_index[observable][observation]]
+        return cpt * (cpt_obs @ np.asarray(observation, dtype=np.float64))
+
+    def infer(self, evidence):
+        """
+        Args:
+            evidence (dict): soft evidence (likelihood vectors) for 'I0', 'GA0', 'HA0' and label indices,
+                labels (or likelihood vectors) for 'GO1', 'HO1', like GazeAndGestureNet passes to pyAgrum
+        Returns:
+            dict of normalized posterior arrays for 'I1', 'GA1', 'HA1'
+        """
+        b_I = self.prior_I * evidence.get('I0', 1.0)
+        b_GA = self.prior_GA * evidence.get('GA0', 1.0)
+        b_HA = self.prior_HA * evidence.get('HA0', 1.0)
+
+        trans_GA = self._transition(self.trans_obs_GA, self.cpts['GAt'], self.cpts['GOt'], evidence.get('GO1'), 'GOt')
+        trans_HA = self._transition(self.trans_obs_HA, self.cpts['HAt'], self.cpts['HOt'], evidence.get('HO1'), 'HOt')
+
+        a = b_I @ self.trans_I              # (I1,)
+        q_GA = b_GA @ trans_GA              # (I1, GA1): sum over GA0
+        q_HA = b_HA @ trans_HA              # (I1, HA1)
+        m_GA = q_GA.sum(axis=1)
+        m_HA = q_HA.sum(axis=1)
+
+        p_I = a * m_GA * m_HA
+        p_GA = (a * m_HA) @ q_GA
+        p_HA = (a * m_GA) @ q_HA
+        return {'I1': p_I / p_I.sum(), 'GA1': p_GA / p_GA.sum(), 'HA1': p_HA / p_HA.sum()}
@@ -0,0 +1,219 @@
+import numpy as np
+
+from world_space import curr_world_space
+import dbn_helpers.gaze_and_gesture_cpds as cpds
+from dbn_helpers.adaptive_transition import AdaptiveTransition
+
+# Rao-Blackwellised particle filter for world spaces with many interactables
+#
+# the filtering step is the one of numpy_filter.py, but P(GAt|GA0,It) is never built: with |I| interactions and
+# |GA| interactables it has |I|*|GA|^2 entries, e.g. 50 million for 256 devices. it is the cpd_GAt chain rule
+#
+#   P(GAt=k | GA0=j, It=i) = c(i,k) s(k,j) / Z(i,j)     c(i,k) = w_given_It if device k offers i, else 1
+#                                                       s(k,j) = w_given_GA0 if k == j, else 1
+#   Z(i,j) = C(i) + (w_given_GA0 - 1) c(i,j)            C(i) = sum_k c(i,k) = |GA| + (w_given_It - 1) n(i)
+#
+# so sum_GA0 b(GA0) P(GAt=k|GA0,i) = c(i,k) (B(i) + (w_given_GA0 - 1) b(k) / Z(i,k)), B(i) = sum_j b(j) / Z(i,j),
+# where Z(i,.) takes only two values. what the step needs of it, m_GA(i) = sum_k q_GA(i,k) for every interaction
+# and sum_i mass(i) q_GA(i,k), are sparse matrix-vector products with the compatibility matrix: O(nnz + |I| + |GA|)
+#
+# the interaction I1 is sampled, the rest is exact given I1 (Rao-Blackwellised):
+#   a(I1) = sum_I0 b(I0) P(I1|I0) and the gesture part m_HA(I1) are exact for every interaction (|I|^2 and
+#   |I|*|HA|^2, small), particles are drawn from a(I1) m_HA(I1) by systematic resampling, and the sampled
+#   interactions get their exact gaze part q_GA(I1, GA1). the particle weights are m_GA(I1) = sum q_GA.
+# the number of particles follows the effective sample size (ESS) of the weights: the next step uses as many
+# particles as it takes to reach target_ess. with n_particles=None every interaction is enumerated instead of
+# sampled, which is the exact step
+
+
+def systematic_resample(weights, n, rng):
+    """n sorted indices drawn from normalized weights with a single uniform offset (systematic resampling)"""
+    positions = (rng.random() + np.arange(n)) / n
+    return np.minimum(np.searchsorted(np.cumsum(weights), positions), len(weights) - 1)
+
+
+def effective_sample_size(weights, counts=None):
+    """1 / sum(w^2) of the normalized weights, counts: how many particles share each weight"""
+    counts = np.ones_like(weights) if counts is None else counts
+    return (counts * weights).sum() ** 2 / (counts * weights ** 2).sum()
+
+
+class ParticleFilter:
+    def __init__(self, world_space=None, cpts=None, n_particles=256, target_ess=128, min_particles=32,
+                 max_particles=4096, certainty_criterion='z_score', cycle_It=False, seed=None):
+        """
+        Args:
+            world_space (WorldSpace): defaults to curr_world_space.world
+            cpts (dict): CPT arrays of 'I0', 'GA0', 'HA0', 'It', 'HAt' and 'HOt', e.g. GazeAndGestureNet().numpy_filter.cpts
+                (GAt and GOt are ignored), default: built like GazeAndGestureNet (cpds.NET_WEIGHTS)
+            n_particles (int): particles of the first step, None: enumerate every interaction (exact)
+            target_ess (float): effective sample size the number of particles is adapted to, None: fixed
+            min_particles, max_particles (int): bounds of the adapted number of particles
+            certainty_criterion (str): when the posterior of I sharpens the It CPT in step(), as in GazeAndGestureNet
+            cycle_It (bool): cycle through the sharpened It CPTs, as in GazeAndGestureNet
+            seed (int): of the random generator
+        """
+        self.world_space = world_space or curr_world_space.world
+        world_space = self.world_space
+        if cpts is None:
+            cpts = {'I0': cpds.I0_prior(world_space=world_space), 'GA0': cpds.GA0_prior(world_space=world_space),
+                    'HA0': cpds.HA0_prior(world_space=world_space),
+                    'It': cpds.cpd_It(**cpds.NET_WEIGHTS['It'], world_space=world_space),
+                    'HAt': cpds.cpd_HAt(**cpds.NET_WEIGHTS['HAt'], world_space=world_space),
+                    'HOt': cpds.cpd_HOt(**cpds.NET_WEIGHTS['HOt'], world_space=world_space)}
+        self.cpts = {name: np.array(cpts[name], dtype=np.float64) for name in ('I0', 'GA0', 'HA0', 'It', 'HAt', 'HOt')}
+        self.label_index = {'GOt': world_space.interactable_index, 'HOt': world_space.gesture_index}
+
+        # the gaze part from the sparse compatibility matrix and the weights of cpd_GAt and cpd_GOt
+        self.compatibility = world_space.compatibility.tocsr()
+        self.w_given_GA0 = cpds.NET_WEIGHTS['GAt']['w_given_GA0']
+        self.w_given_It = cpds.NET_WEIGHTS['GAt']['w_given_It']
+        self.w_GA_GO_match = cpds.NET_WEIGHTS['GOt']['w_GA_GO_match']
+        self.n_GA = len(world_space.interactables)
+
+        self.n_particles = n_particles
+        self.target_ess = target_ess
+        self.min_particles = min_particles
+        self.max_particles = max_particles
+        self.ess = None
+        self.rng = np.random.default_rng(seed)
+
+        # step(): the filter of GazeAndGestureNet.update for one user, for world spaces too large for the net
+        self.adaptive_It = AdaptiveTransition(self.cpts['It'], approach=certainty_criterion, cycle=cycle_It)
+        self.reset()
+
+    def set_cpt(self, var, cpd):
+        """replace the CPT of a 2-TBN variable (same layout as BayesNet.cpt(var)[:])"""
+        if var not in self.cpts:
+            raise ValueError(f"the particle filter builds {var} from the world space, it can not be replaced")
+        self.cpts[var] = np.array(cpd, dtype=np.float64)
+
+    def reset(self):
+        """back to the prior, the next step() is t0"""
+        self.belief_I = self.cpts['I0'].copy()
+        self.belief_GA = self.cpts['GA0'].copy()
+        self.belief_HA = self.cpts['HA0'].copy()
+        self.t = 0
+        self.adaptive_It.reset()
+        self.cpts['It'] = self.adaptive_It.levels[0]
+
+    def step(self, gaze, gesture):
+        """
+        Args:
+            gaze (int): index of the observed interactable (GOt), -1 if not observed
+            gesture (int): index of the observed gesture (HOt), -1 if not observed
+        Returns:
+            dict of normalized posterior arrays for 'I1', 'GA1', 'HA1'
+        """
+        if self.t > 0:
+            # the dynamic It CPT of GazeAndGestureNet.update
+            level = int(self.adaptive_It.update(self.belief_I[None])[0])
+            self.cpts['It'] = self.adaptive_It.levels[level]
+        evidence = {'I0': self.belief_I, 'GA0': self.belief_GA, 'HA0': self.belief_HA}
+        if gaze >= 0:
+            evidence['GO1'] = int(gaze)
+        if gesture >= 0:
+            evidence['HO1'] = int(gesture)
+        posteriors = self.infer(evidence)
+        self.belief_I, self.belief_GA, self.belief_HA = posteriors['I1'], posteriors['GA1'], posteriors['HA1']
+        self.t += 1
+        return posteriors
+
+    def _observation(self, observation, observable):
+        """label index, or likelihood vector over the observed values, or None"""
+        if isinstance(observation, str):
+            return self.label_index[observable][observation]
+        if observation is None or isinstance(observation, (int, np.integer)):
+            return observation
+        return np.asarray(observation, dtype=np.float64)
+
+    def _likelihood_GO(self, observation):
+        """P(GOt=obs|GAt) from cpd_GOt: w_GA_GO_match on the diagonal, 1 elsewhere, normalized"""
+        w = self.w_GA_GO_match
+        if observation is None:
+            return np.ones(self.n_GA)
+        if isinstance(observation, (int, np.integer)):
+            likelihood = np.ones(self.n_GA)
+            likelihood[observation] = w
+        else:
+            likelihood = observation.sum() + (w - 1) * observation
+        return likelihood / (self.n_GA + w - 1)
+
+    def _likelihood_HO(self, observation):
+        if observation is None:
+            return 1.0
+        if isinstance(observation, (int, np.integer)):
+            return self.cpts['HOt'][:, observation]
+        return self.cpts['HOt'] @ observation
+
+    def gaze_part(self, compatibility, b_GA, likelihood_GO, mass):
+        """
+        Args:
+            compatibility (sparse matrix): (U, |GA|) rows of self.compatibility of the interactions I1
+            b_GA (array): (|GA|,) belief of GA0 (prior times soft evidence)
+            likelihood_GO (array): (|GA|,) P(GOt=obs|GAt)
+            mass (array): (U,) weight of each interaction
+        Returns:
+            m_GA (U,) = sum_GA1 q_GA(I1, GA1) and p_GA (|GA|,) = sum_I1 mass(I1) q_GA(I1, GA1),
+            with q_GA(I1, GA1) = sum_GA0 b(GA0) P(GA1|GA0,I1) P(GOt=obs|GA1)
+        """
+        w_GA0, w_It = self.w_given_GA0, self.w_given_It
+        # Z(i,j) for the devices j that do not (Z0) and do (Z1) offer interaction i
+        C = self.n_GA + (w_It - 1) * np.asarray(compatibility.sum(axis=1)).ravel()
+        Z0 = C + (w_GA0 - 1)
+        Z1 = C + (w_GA0 - 1) * w_It
+        offered_b = compatibility @ b_GA
+        B = (b_GA.sum() - offered_b) / Z0 + offered_b / Z1
+        # the difference of c(i,k) / Z(i,k) where device k offers i
+        offered_over_Z = w_It / Z1 - 1 / Z0
+        L_b = likelihood_GO * b_GA
+        m_GA = (B * likelihood_GO.sum() + (w_GA0 - 1) * L_b.sum() / Z0
+                + (w_It - 1) * B * (compatibility @ likelihood_GO)
+                + (w_GA0 - 1) * offered_over_Z * (compatibility @ L_b))
+        p_GA = likelihood_GO * (mass @ B + (w_GA0 - 1) * b_GA * (mass @ (1 / Z0))
+                                + compatibility.T @ (mass * (w_It - 1) * B)
+                                + (w_GA0 - 1) * b_GA * (compatibility.T @ (mass * offered_over_Z)))
+        return m_GA, p_GA
+
+    def infer(self, evidence):
+        """
+        Args:
+            evidence (dict): soft evidence (likelihood vectors) for 'I0', 'GA0', 'HA0' and label indices,
+                labels (or likelihood vectors) for 'GO1', 'HO1', like GazeAndGestureNet passes to pyAgrum
+        Returns:
+            dict of normalized posterior arrays for 'I1', 'GA1', 'HA1'
+        """
+        b_I = self.cpts['I0'] * evidence.get('I0', 1.0)
+        b_GA = self.cpts['GA0'] * evidence.get('GA0', 1.0)
+        b_HA = self.cpts['HA0'] * evidence.get('HA0', 1.0)
+        likelihood_GO = self._likelihood_GO(self._observation(evidence.get('GO1'), 'GOt'))
+        likelihood_HO = self._likelihood_HO(self._observation(evidence.get('HO1'), 'HOt'))
+
+        a = b_I @ self.cpts['It']                       # (I1,)
+        q_HA = (b_HA @ self.cpts['HAt']) * likelihood_HO  # (I1, HA1), the gestures are few: every interaction
+        m_HA = q_HA.sum(axis=1)
+        proposal = a * m_HA
+
+        if self.n_particles is None:
+            # every interaction, weighted by its exact proposal probability
+            interactions = slice(None)
+            mass = proposal / proposal.sum()
+            compatibility = self.compatibility
+        else:
+            particles = systematic_resample(proposal / proposal.sum(), self.n_particles, self.rng)
+            interactions, counts = np.unique(particles, return_counts=True)
+            mass = counts / self.n_particles
+            compatibility = self.compatibility[interactions]
+
+        m_GA, p_GA = self.gaze_part(compatibility, b_GA, likelihood_GO, mass)
+
+        if self.n_particles is not None:
+            self.ess = effective_sample_size(m_GA, counts)
+            if self.target_ess is not None:
+                wanted = int(np.ceil(self.n_particles * self.target_ess / self.ess))
+                self.n_particles = min(max(wanted, self.min_particles), self.max_particles)
+
+        p_I = np.zeros(len(a))
+        p_I[interactions] = mass * m_GA
+        p_HA = (mass * m_GA / m_HA[interactions]) @ q_HA[interactions]
+        return {'I1': p_I / p_I.sum(), 'GA1': p_GA / p_GA.sum(), 'HA1': p_HA / p_HA.sum()}
@@ -0,0 +1,72 @@
+import time
+import numpy as np
+
+
+class PosteriorHistory:
+    """Posteriors of the last `horizon` time steps in preallocated numpy arrays.
+
+    Every variable gets a (2 * horizon, n_values) array. Each step is written twice, at i and
+    i + horizon, so the last `horizon` steps are always one contiguous slice: append() is O(1)
+    and window() returns a view without copying, e.g. for plotting I1 over the last few seconds.
+    """
+
+    def __init__(self, labels, horizon=3600):
+        """
+        Args:
+            labels (dict): variable name (e.g. 'I1') -> list of labels, see GazeAndGestureNet.target_labels
+            horizon (int): number of most recent time steps to keep
+        """
+        self.labels = labels
+        self.horizon = horizon
+        self.data = {name: np.zeros((2 * horizon, len(values))) for name, values in labels.items()}
+        self.t = np.zeros(2 * horizon, dtype=np.int64)
+        self.timestamps = np.zeros(2 * horizon)
+        self.index = 0  # position the next step is written to
+        self.count = 0  # number of steps ever appended
+
+    def __len__(self):
+        return min(self.count, self.horizon)
+
+    def append(self, result, timestamp=None):
+        """Store a PosteriorResult (or any mapping of variable -> posterior with a .t attribute)."""
+        i, j = self.index, self.index + self.horizon
+        for name, data in self.data.items():
+            data[i] = data[j] = result[name]
+        self.t[i] = self.t[j] = result.t
+        self.timestamps[i] = self.timestamps[j] = time.time() if timestamp is None else timestamp
+        self.index = (i + 1) % self.horizon
+        self.count += 1
+
+    def _slice(self, n):
+        n = len(self) if n is None else min(n, len(self))
+        end = self.index + self.horizon
+        return slice(end - n, end)
+
+    def window(self, name, n=None):
+        """The last n (default: all stored) posteriors of a variable, oldest first, as a (n, n_values) view."""
+        return self.data[name][self._slice(n)]
+
+    def times(self, n=None):
+        """Time indices of the last n steps (a view)."""
+        return self.t[self._slice(n)]
+
+    def save_npz(self, path):
+        """Write the stored steps to .npz: one array per variable, plus 't', 'timestamp' and the labels."""
+        arrays = {name: self.window(name) for name in self.data}
+        arrays.update({f"labels_{name}": np.array(values) for name, values in self.labels.items()})
+        np.savez(path, t=self.times(), timestamp=self.timestamps[self._slice(None)], **arrays)
+
+    def to_dataframe(self):
+        """The stored steps as a pandas DataFrame with one column per variable value ('I1=Brighten', ...)."""
+        import pandas as pd
+
+        columns = {'t': self.times(), 'timestamp': self.timestamps[self._slice(None)]}
+        for name, values in self.labels.items():
+            window = self.window(name)
+            for k, label in enumerate(values):
+                columns[f"{name}={label}"] = window[:, k]
+        return pd.DataFrame(columns)
+
+    def save_parquet(self, path):
+        """Write the stored steps to a Parquet file (needs pandas and pyarrow)."""
+        self.to_dataframe().to_parquet(path, index=False)
@@ -0,0 +1,56 @@
+import numpy as np
+
+
+class PosteriorResult:
+    """Posteriors of one time step, as returned by GazeAndGestureNet.update.
+
+    Behaves like a read-only dict of numpy arrays keyed by variable (result['I1']), and adds
+    the most likely label and the entropy of every variable. Nothing is formatted unless the
+    result is printed, so it is cheap to create every frame.
+    """
+
+    def __init__(self, t, posteriors, labels):
+        """
+        Args:
+            t (int): time index of the update
+            posteriors (dict): variable name (e.g. 'I1') -> posterior probabilities
+            labels (dict): variable name -> list of labels in the order of the probabilities
+        """
+        self.t = t
+        self.posteriors = {name: np.asarray(p, dtype=np.float64) for name, p in posteriors.items()}
+        self.labels = labels
+
+    def __getitem__(self, name):
+        return self.posteriors[name]
+
+    def __contains__(self, name):
+        return name in self.posteriors
+
+    def __iter__(self):
+        return iter(self.posteriors)
+
+    def __len__(self):
+        return len(self.posteriors)
+
+    def keys(self):
+        return self.posteriors.keys()
+
+    def items(self):
+        return self.posteriors.items()
+
+    def argmax(self, name):
+        """Index of the most likely value of a variable."""
+        return int(np.argmax(self.posteriors[name]))
+
+    def most_likely(self, name):
+        """Label of the most likely value of a variable, e.g. result.most_likely('I1') -> 'Brighten'."""
+        return self.labels[name][self.argmax(name)]
+
+    def entropy(self, name):
+        """Shannon entropy of a variable's posterior in bits (0 = certain, log2(n) = uniform)."""
+        p = self.posteriors[name]
+        p = p[p > 0]
+        return float(-(p * np.log2(p)).sum())
+
+    def __repr__(self):
+        return f"t{self.t} posteriors: {({name: p.tolist() for name, p in self.posteriors.items()})}"
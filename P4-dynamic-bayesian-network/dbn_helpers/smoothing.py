@@ -0,0 +1,166 @@
+import numpy as np
+
+# offline smoothing of a whole recorded session, and fixed-lag smoothing for near-real-time decisions
+#
+# the 2-TBN is treated as a hidden Markov model over the joint state x = (I, GA, HA), K = |I| |GA| |HA| states
+# (216 for the default world space), with
+#
+#   P(x1|x0) = P(I1|I0) P(GA1|GA0,I1) P(HA1|HA0,I1)     a dense K x K matrix
+#   P(obs|x1) = P(GO1|GA1) P(HO1|HA1)                  one K vector per (gaze, gesture) pair, precomputed
+#
+# so one forward or backward step is a vector-matrix product, O(K^2), and a session of T frames O(T K^2).
+# unlike GazeAndGestureNet.update, which passes on the marginals of I, GA and HA as soft evidence (a factored
+# approximation), this is exact inference in the 2-TBN. the CPTs are fixed: the dynamic It CPT is not applied.
+#
+# smooth() keeps memory bounded with checkpoints: the forward pass stores the forward message only at the
+# start of every chunk of chunk_size frames, the backward pass recomputes one chunk of forward messages at a
+# time. memory is O(T / chunk_size * K + chunk_size * K) plus the output, which can be a np.memmap
+
+
+class JointModel:
+    def __init__(self, cpts):
+        """
+        Args:
+            cpts (dict): CPT arrays of the 2-TBN by variable name, e.g. GazeAndGestureNet().numpy_filter.cpts
+        """
+        cpts = {name: np.asarray(cpt, dtype=np.float64) for name, cpt in cpts.items()}
+        self.shape = (len(cpts['I0']), len(cpts['GA0']), len(cpts['HA0']))
+        self.n_states = int(np.prod(self.shape))
+        # P(I0) P(GA0) P(HA0), flattened in the order (I, GA, HA)
+        self.prior = np.einsum('i,g,h->igh', cpts['I0'], cpts['GA0'], cpts['HA0']).ravel()
+        # [x0, x1]; cpt(v)[:] lists the parents first: It [I0, It], GAt [It, GA0, GAt], HAt [It, HA0, HAt]
+        self.transition = np.einsum('ij,jgk,jhl->ighjkl', cpts['It'], cpts['GAt'], cpts['HAt']).reshape(
+            self.n_states, self.n_states)
+        # [gaze, gesture, x]: P(GO=gaze|GA) P(HO=gesture|HA), the last gaze / gesture index (-1) is "not observed"
+        likelihood_GO = np.hstack([cpts['GOt'], np.ones((self.shape[1], 1))])
+        likelihood_HO = np.hstack([cpts['HOt'], np.ones((self.shape[2], 1))])
+        self.emission = np.einsum('i,go,hp->opigh', np.ones(self.shape[0]), likelihood_GO, likelihood_HO).reshape(
+            likelihood_GO.shape[1], likelihood_HO.shape[1], self.n_states)
+
+    def forward(self, message, gaze, gesture):
+        """next normalized forward message (filtered distribution) from the last one"""
+        message = (message @ self.transition) * self.emission[gaze, gesture]
+        return message / message.sum()
+
+    def backward(self, message, gaze, gesture):
+        """backward message of the frame before, from the one of a frame and that frame's observations"""
+        message = self.transition @ (self.emission[gaze, gesture] * message)
+        return message / message.sum()
+
+    def marginals(self, joint):
+        """(n, K) joint distributions -> dict of (n, |X|) marginals for 'I1', 'GA1', 'HA1'"""
+        joint = joint.reshape((-1,) + self.shape)
+        return {'I1': joint.sum(axis=(2, 3)), 'GA1': joint.sum(axis=(1, 3)), 'HA1': joint.sum(axis=(1, 2))}
+
+
+def _output(model, n_frames, out):
+    if out is None:
+        out = {name: np.empty((n_frames, size)) for name, size in zip(['I1', 'GA1', 'HA1'], model.shape)}
+    return out
+
+
+def smooth(model, gaze, gesture, chunk_size=4096, out=None):
+    """
+    Forward-backward smoothing: P(x_t | all observations of the session) for every frame t.
+
+    Args:
+        model (JointModel)
+        gaze (array of int): (T,) observed interactable indices, -1 = not observed
+        gesture (array of int): (T,) observed gesture indices, -1 = not observed
+        chunk_size (int): frames per chunk, see the comment at the top
+        out (dict): optional (T, |X|) arrays for 'I1', 'GA1', 'HA1' to write to, e.g. np.lib.format.open_memmap
+    Returns:
+        dict of (T, |X|) arrays of smoothed marginals
+    """
+    n_frames = len(gaze)
+    out = _output(model, n_frames, out)
+    starts = range(0, n_frames, chunk_size)
+
+    # forward pass, keeping the forward message before every chunk
+    checkpoints = np.empty((len(starts), model.n_states))
+    message = model.prior
+    for t in range(n_frames):
+        if t % chunk_size == 0:
+            checkpoints[t // chunk_size] = message
+        message = model.forward(message, gaze[t], gesture[t])
+
+    # backward pass, one chunk at a time from the end
+    backward = np.ones(model.n_states)
+    forward = np.empty((chunk_size, model.n_states))
+    for k in reversed(range(len(starts))):
+        start, end = starts[k], min(starts[k] + chunk_size, n_frames)
+        message = checkpoints[k]
+        for t in range(start, end):
+            message = forward[t - start] = model.forward(message, gaze[t], gesture[t])
+        joint = np.empty((end - start, model.n_states))
+        for t in reversed(range(start, end)):
+            joint[t - start] = forward[t - start] * backward
+            backward = model.backward(backward, gaze[t], gesture[t])
+        joint /= joint.sum(axis=1, keepdims=True)
+        for name, marginal in model.marginals(joint).items():
+            out[name][start:end] = marginal
+    return out
+
+
+class FixedLagSmoother:
+    """P(x_{t-lag} | observations up to t), one frame at a time, with O(lag K) memory and O(lag K^2) per frame."""
+
+    def __init__(self, model, lag):
+        self.model = model
+        self.lag = lag
+        self.forward_messages = np.empty((lag + 1, model.n_states))
+        self.observations = np.empty((lag + 1, 2), dtype=np.int64)
+        self.message = model.prior
+        self.t = 0
+
+    def step(self, gaze, gesture):
+        """
+        Add the observations of frame t.
+
+        Returns:
+            (t - lag, dict of marginals for 'I1', 'GA1', 'HA1') or None for the first lag frames
+        """
+        model, slot = self.model, self.t % (self.lag + 1)
+        self.message = model.forward(self.message, gaze, gesture)
+        self.forward_messages[slot] = self.message
+        self.observations[slot] = gaze, gesture
+        self.t += 1
+        if self.t <= self.lag:
+            return None
+        return self.t - 1 - self.lag, self._smoothed(self.t - 1 - self.lag)
+
+    def _smoothed(self, frame):
+        """marginals of a buffered frame given all observations added so far"""
+        backward = np.ones(self.model.n_states)
+        for t in range(self.t - 1, frame, -1):
+            gaze, gesture = self.observations[t % (self.lag + 1)]
+            backward = self.model.backward(backward, gaze, gesture)
+        joint = self.forward_messages[frame % (self.lag + 1)] * backward
+        return {name: marginal[0] for name, marginal in self.model.marginals(joint / joint.sum()).items()}
+
+    def flush(self):
+        """marginals of the last (up to lag) frames that step() has not returned yet, given all observations"""
+        return [(frame, self._smoothed(frame)) for frame in range(max(self.t - self.lag, 0), self.t)]
+
+
+def fixed_lag_smooth(model, gaze, gesture, lag, out=None):
+    """
+    Fixed-lag smoothing of a whole session: frame t gets P(x_t | observations up to t + lag), the
+    last frames get all observations. lag=0 is exact filtering in the joint model.
+
+    Args and returns like smooth()
+    """
+    out = _output(model, len(gaze), out)
+    smoother = FixedLagSmoother(model, lag)
+
+    def write(frame, marginals):
+        for name, marginal in marginals.items():
+            out[name][frame] = marginal
+
+    for t in range(len(gaze)):
+        result = smoother.step(gaze[t], gesture[t])
+        if result is not None:
+            write(*result)
+    for result in smoother.flush():
+        write(*result)
+    return out
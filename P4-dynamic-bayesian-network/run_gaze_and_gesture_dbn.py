@@ -1,11 +1,17 @@
+import logging
 from ui.ui_window import UIWindow
 from dbn_helpers import *
 from dbn_helpers.input_tracker import tracker  # Import the tracker object
 from dbn_helpers.gaze_and_gesture_net import GazeAndGestureNet
+from dbn_helpers.inference_worker import InferenceProcess, InferenceWorker
 import numpy as np
-from world_space.curr_world_space import interactions
+from world_space.curr_world_space import interactions, world
 from ui.bar_plot import BarPlot, BarPlotManager
 
+# set level=logging.DEBUG to log the inputs and posteriors of every frame
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s: %(message)s")
+logger = logging.getLogger(__name__)
+
 ## disregard 
 # Create a simplified UI window without the default plot
 class DBNUIWindow(UIWindow):
@@ -30,33 +36,9 @@ class DBNUIWindow(UIWindow):
             self._update = new_update
 
 
-# create the UI window, and gaze and gesture detectors
-window = DBNUIWindow(width=800, height=600, title="CMIS DBN Demo")
-# create the DBN
-dbn = GazeAndGestureNet()
-t = 0
-# Add our input tracker to keep track of gaze and gestures detections per frame
-window.add_update_callback(track_inputs)
-
-# Create our own bar plot for intentions
-intentions_plot = BarPlot(
-    x=50,  # Move it more to the left
-    y=300,  # Position it higher
-    width=700,  # Make it wider to allow more space for labels
-    height=200,  # Make it taller
-    max_value=1.0,
-    num_bars=len(interactions),
-    bar_labels=interactions  # Use the interaction labels from world space
-)
-intentions_plot.set_title("Intention Probabilities")
-
-# Add the plot to the manager
-window.bar_plot_manager.add_plot("intentions", intentions_plot)
-
-
-# Function to process inputs every frame
+# Function to process inputs every frame: hand the inputs to the inference worker and show its newest posteriors
 def process_inputs_every_frame(window):
-    global t
+    global shown_version
     # Get current values from the tracker
     current_gesture = tracker.last_gesture
     current_gaze = tracker.last_hovered_sprite
@@ -65,31 +47,64 @@ def process_inputs_every_frame(window):
     gesture_value = current_gesture if current_gesture else "None"
     gaze_target = current_gaze.name if current_gaze else "None"
 
-    print(f"Gesture: {gesture_value}, Gaze: {gaze_target}")
-    update_dict = {f"t{t}": {f"GO{t}": gaze_target, f"HO{t}": gesture_value}}
-    posteriors_this_frame = dbn.update(update_dict, visualize_inference=False, inference_engine="LazyPropagation")
-    
-    # Check if posteriors_this_frame is a dictionary or a string
-    if posteriors_this_frame and isinstance(posteriors_this_frame, dict) and 'I1' in posteriors_this_frame:
-        i1_values = posteriors_this_frame['I1']
-        window.bar_plot_manager.update_plot_values("intentions", i1_values)
-    elif posteriors_this_frame and isinstance(posteriors_this_frame, str):
-        print(f"Received string posteriors: {posteriors_this_frame}")
-        # Check if it's a string representation of the posteriors we can parse
-        if "I1" in posteriors_this_frame and "[" in posteriors_this_frame and "]" in posteriors_this_frame:
-            try:
-                # Try to extract I1 values from the string output
-                i1_start = posteriors_this_frame.find("'I1': [") + 6
-                i1_end = posteriors_this_frame.find("]", i1_start) + 1
-                i1_str = posteriors_this_frame[i1_start:i1_end]
-                i1_values = eval(i1_str)  # Parse the list
-                window.bar_plot_manager.update_plot_values("intentions", i1_values)
-            except Exception as e:
-                print(f"Error parsing posteriors: {e}")
-    
-    t += 1
-# Add our per-frame processing function to the update callbacks
-window.add_update_callback(process_inputs_every_frame)
+    logger.debug("Gesture: %s, Gaze: %s", gesture_value, gaze_target)
+    # pass label indices, the filter then needs no string lookups
+    worker.submit(world.interactable_index[gaze_target], world.gesture_index[gesture_value])
+
+    # posteriors['I1'] is a numpy array in the order of interactions
+    version, posteriors = worker.latest()
+    if version != shown_version:
+        window.bar_plot_manager.update_plot_values("intentions", posteriors['I1'])
+        shown_version = version
+
+
+# the inference process is spawned, which imports this script again: only the main process runs the demo
+if __name__ == "__main__":
+    # create the DBN and its inference worker, which runs the DBN time steps independent of the 60 FPS UI.
+    # the NumPy engine gives the posteriors of LazyPropagation, the engine before, about 30x faster
+    inference_rate = 60  # DBN time steps per second
+    # True: run the DBN in a separate (spawned) process, so the UI keeps 60 FPS however large the network is
+    # False: run it on a thread; it shares the GIL with the UI, which for large networks is slower than
+    # inference in the UI loop was (46 vs 50 FPS at 64 devices with LazyPropagation)
+    use_inference_process = True
+    if use_inference_process:
+        # started before the window, so the UI does not wait for the network to be built
+        worker = InferenceProcess(world, rate=inference_rate, inference_engine="NumPy").start()
+    else:
+        worker = InferenceWorker(GazeAndGestureNet(), rate=inference_rate, inference_engine="NumPy").start()
+    shown_version = 0
+
+    # create the UI window, and gaze and gesture detectors
+    window = DBNUIWindow(width=800, height=600, title="CMIS DBN Demo")
+    # Add our input tracker to keep track of gaze and gestures detections per frame
+    window.add_update_callback(track_inputs)
+
+    # Create our own bar plot for intentions
+    intentions_plot = BarPlot(
+        x=50,  # Move it more to the left
+        y=300,  # Position it higher
+        width=700,  # Make it wider to allow more space for labels
+        height=200,  # Make it taller
+        max_value=1.0,
+        num_bars=len(interactions),
+        bar_labels=interactions  # Use the interaction labels from world space
+    )
+    intentions_plot.set_title("Intention Probabilities")
+
+    # Add the plot to the manager
+    window.bar_plot_manager.add_plot("intentions", intentions_plot)
+    # Add our per-frame processing function to the update callbacks
+    window.add_update_callback(process_inputs_every_frame)
+
+    # Run the window
+    window.run()
+    worker.stop()
+    logger.info("Inference: %d steps, last step %.2f ms, %d steps skipped", worker.t, 1000 * worker.step_time, worker.skipped_steps)
 
-# Run the window
-window.run()
+    # Save the posteriors of the session next to the interaction log for offline analysis
+    if worker.history is None:
+        logger.warning("No posterior history from the inference worker, nothing saved")
+    else:
+        history_filename = tracker.log_filename.replace(".txt", "_posteriors.npz")
+        worker.history.save_npz(history_filename)
+        logger.info("Saved the posteriors of the last %d frames to %s", len(worker.history), history_filename)
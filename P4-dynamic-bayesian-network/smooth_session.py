@@ -0,0 +1,52 @@
+import argparse
+import logging
+import os
+import time
+import numpy as np
+
+from dbn_helpers.gaze_and_gesture_net import GazeAndGestureNet
+from dbn_helpers.interaction_log import read_interaction_log
+from dbn_helpers.smoothing import JointModel, fixed_lag_smooth, smooth
+
+# Smoothed posteriors of a recorded session, for analysis after a study:
+#
+#   python smooth_session.py logs/interaction_log_<time>.txt --lag 30
+#
+# writes logs/interaction_log_<time>_smoothed/ with one .npy per variable and method (smoothed_I1.npy, lag30_I1.npy,
+# ...) next to timestamps.npy, gaze.npy and gesture.npy. The .npy files are written through np.memmap, so
+# sessions of any length only need the memory of one chunk; load them with np.load(path, mmap_mode='r')
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s: %(message)s")
+logger = logging.getLogger(__name__)
+
+
+def open_outputs(directory, prefix, model, n_frames):
+    return {name: np.lib.format.open_memmap(os.path.join(directory, f"{prefix}_{name}.npy"), mode='w+',
+                                            shape=(n_frames, size))
+            for name, size in zip(['I1', 'GA1', 'HA1'], model.shape)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("log", help="interaction log written by the demo (dbn_helpers/input_tracker.py)")
+    parser.add_argument("--lag", type=int, nargs="*", default=[], help="also run fixed-lag smoothing with these lags (frames)")
+    parser.add_argument("--chunk-size", type=int, default=4096, help="frames per chunk of the forward-backward pass")
+    args = parser.parse_args()
+
+    timestamps, gaze, gesture = read_interaction_log(args.log)
+    directory = os.path.splitext(args.log)[0] + "_smoothed"
+    os.makedirs(directory, exist_ok=True)
+    np.save(os.path.join(directory, "timestamps.npy"), timestamps)
+    np.save(os.path.join(directory, "gaze.npy"), gaze)
+    np.save(os.path.join(directory, "gesture.npy"), gesture)
+    logger.info("%d frames in %s", len(gaze), args.log)
+
+    model = JointModel(GazeAndGestureNet().numpy_filter.cpts)
+    start = time.perf_counter()
+    smooth(model, gaze, gesture, args.chunk_size, out=open_outputs(directory, "smoothed", model, len(gaze)))
+    logger.info("Smoothed in %.1f s", time.perf_counter() - start)
+    for lag in args.lag:
+        start = time.perf_counter()
+        fixed_lag_smooth(model, gaze, gesture, lag, out=open_outputs(directory, f"lag{lag}", model, len(gaze)))
+        logger.info("Fixed-lag smoothing with a lag of %d frames in %.1f s", lag, time.perf_counter() - start)
+    logger.info("Wrote %s", directory)
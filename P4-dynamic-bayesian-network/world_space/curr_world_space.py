@@ -1,7 +1,10 @@
-gestures = ["slide left", "slide up", "press down", "slide right",  "slide down", "None"]
-interactions_dict = {"Lamp": ["Dimmen", "Brighten"], 
-"Webcam": ["Turn on/off", "Rotate left", "Rotate right"],
-"Speaker": ["Play/pause", "Increase volume", "Decrease volume"],
-"None": ["None"]}   
-interactables = ["Lamp", "Webcam", "Speaker", "None"]
-interactions = ["Dimmen", "Brighten", "Turn on/off", "Rotate left", "Rotate right", "Increase volume", "Decrease volume", "Play/pause", "None"]
+import os
+from world_space.loader import load_world_space
+
+# the world space is defined in curr_world_space.json (or any other .json / .yaml, see loader.py)
+world = load_world_space(os.path.join(os.path.dirname(os.path.abspath(__file__)), "curr_world_space.json"))
+
+gestures = world.gestures
+interactions_dict = world.interactions_dict
+interactables = world.interactables
+interactions = world.interactions
@@ -0,0 +1,118 @@
+import json
+from pathlib import Path
+import numpy as np
+from scipy import sparse
+
+# world spaces (gestures, interactable devices and the interactions they offer) defined in JSON or YAML:
+#
+#   gestures:        [slide left, slide up, ..., None]
+#   interactables:   {Lamp: [Dimmen, Brighten], ..., None: [None]}     device -> its interactions
+#   interactions:    [Dimmen, Brighten, ...]                           optional, order of the I variable
+#                                                                      (default: in the order of the devices)
+#   gpt_elicitation: {Dimmen: [slide down], ...}                       interaction -> fitting gestures
+#
+# the loader precomputes label <-> index maps and sparse interaction x device and interaction x gesture
+# matrices once, so the network can be built and filtered with integer indices only.
+# see curr_world_space.json for the default world space
+
+
+def compatibility_matrix(interactions, interactables, interactions_dict):
+    """sparse [interaction, interactable] boolean matrix, True where the device offers the interaction"""
+    index = {interaction: i for i, interaction in enumerate(interactions)}
+    rows, cols = [], []
+    for j, interactable in enumerate(interactables):
+        for interaction in interactions_dict.get(interactable, []):
+            if interaction in index:
+                rows.append(index[interaction])
+                cols.append(j)
+    return sparse.csr_matrix((np.ones(len(rows), dtype=bool), (rows, cols)),
+                             shape=(len(interactions), len(interactables)))
+
+
+class WorldSpace:
+    def __init__(self, gestures, interactions_dict, interactions=None, gpt_elicitation=None, name=None):
+        """
+        Args:
+            gestures (list): gesture labels, "None" for no gesture
+            interactions_dict (dict): interactable -> list of its interactions, in the order of the GA variable
+            interactions (list): interaction labels in the order of the I variable (default: in the order of the devices)
+            gpt_elicitation (dict): interaction -> list of gestures that fit it
+            name (str): e.g. the file the world space was loaded from
+        """
+        self.name = name
+        self.gestures = list(gestures)
+        self.interactions_dict = {device: list(actions) for device, actions in interactions_dict.items()}
+        self.interactables = list(self.interactions_dict)
+        if interactions is None:
+            interactions = [i for actions in self.interactions_dict.values() for i in actions if i]
+            interactions = list(dict.fromkeys(interactions))  # unique, in order
+        self.interactions = list(interactions)
+        self.gpt_elicitation = {k: list(v) for k, v in (gpt_elicitation or {}).items()}
+
+        # label -> index maps
+        self.gesture_index = {label: i for i, label in enumerate(self.gestures)}
+        self.interactable_index = {label: i for i, label in enumerate(self.interactables)}
+        self.interaction_index = {label: i for i, label in enumerate(self.interactions)}
+
+        # sparse [interaction, interactable] and [interaction, gesture] matrices
+        self.compatibility = compatibility_matrix(self.interactions, self.interactables, self.interactions_dict)
+        self.elicitation = compatibility_matrix(self.interactions, self.gestures, self._gestures_by_interaction())
+
+        # hashable identity, for memoizing cpds per world space
+        self.key = (tuple(self.gestures), tuple(self.interactions),
+                    tuple((k, tuple(v)) for k, v in self.interactions_dict.items()),
+                    tuple((k, tuple(v)) for k, v in self.gpt_elicitation.items()))
+
+    def _gestures_by_interaction(self):
+        # compatibility_matrix expects column label -> row labels, i.e. gesture -> interactions
+        by_gesture = {}
+        for interaction, gestures in self.gpt_elicitation.items():
+            for gesture in gestures:
+                by_gesture.setdefault(gesture, []).append(interaction)
+        return by_gesture
+
+    def __eq__(self, other):
+        return isinstance(other, WorldSpace) and self.key == other.key
+
+    def __hash__(self):
+        return hash(self.key)
+
+    def __repr__(self):
+        return (f"WorldSpace({self.name or ''}: {len(self.interactables)} interactables, "
+                f"{len(self.interactions)} interactions, {len(self.gestures)} gestures)")
+
+    def evidence_indices(self, gaze=None, gesture=None):
+        """labels -> indices, e.g. ('Lamp', 'slide up') -> {'GO1': 0, 'HO1': 1}, for GazeAndGestureNet.update"""
+        evidence = {}
+        if gaze is not None:
+            evidence['GO1'] = self.interactable_index[gaze]
+        if gesture is not None:
+            evidence['HO1'] = self.gesture_index[gesture]
+        return evidence
+
+    def to_dict(self):
+        return {"gestures": self.gestures, "interactables": self.interactions_dict,
+                "interactions": self.interactions, "gpt_elicitation": self.gpt_elicitation}
+
+
+def load_world_space(path):
+    """load a WorldSpace from a .json or .yaml/.yml file"""
+    path = Path(path)
+    with open(path) as f:
+        if path.suffix in (".yaml", ".yml"):
+            import yaml  # pip install pyyaml
+            data = yaml.safe_load(f)
+        else:
+            data = json.load(f)
+    return WorldSpace(data["gestures"], data["interactables"], data.get("interactions"),
+                      data.get("gpt_elicitation"), name=str(path))
+
+
+def save_world_space(world_space, path):
+    path = Path(path)
+    with open(path, 'w') as f:
+        if path.suffix in (".yaml", ".yml"):
+            import yaml
+            yaml.safe_dump(world_space.to_dict(), f, sort_keys=False, allow_unicode=True)
+        else:
+            json.dump(world_space.to_dict(), f, indent=1)